@@ -0,0 +1,116 @@
+"""
+Render throughput of the feedback reports: the old per-row loop (iterrows, a regex compiled per
+call, one template fill per row) against the columnar engine in report_render.py.
+
+Both must produce the same subjects and (once the loop's bodies are stripped of indentation
+like the compiled template) the same bodies; the script prints rows/s of each and the cost of
+wrapping the bodies into mail messages.
+
+Usage (from the script folder):
+    python benchmarks/bench_render.py                 # 100k rows
+    python benchmarks/bench_render.py --rows 1000000
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_transport import build_message
+from report_render import REPORT_TEMPLATE, SUBJECT_TEMPLATE, clean_report_rows, render_reports
+
+
+def make_rows(n, seed=0):
+    """
+    A workbook-like frame of `n` rows with some invalid emails, missing users and counts.
+    """
+    rng = np.random.default_rng(seed)
+    users = np.array([f"User {i}" for i in range(max(n // 20, 1))], dtype=object)
+    df = pd.DataFrame({
+        "User": users[rng.integers(0, len(users), n)],
+        "userEmail": [f"user{i}@example.com" for i in rng.integers(0, len(users), n)],
+        "Like": rng.integers(0, 11, n).astype("float64"),
+        "dislike": rng.integers(0, 6, n).astype("float64"),
+        "comment": rng.choice(["Great session", "Needs more examples", None], n),
+        "week": [f"WW{w:02d}" for w in rng.integers(1, 53, n)],
+        "year": rng.choice([2024, 2025], n),
+        "tools": rng.choice(["PrimeTime", "Fusion Compiler", "VCS", "Verdi"], n),
+    })
+    df.loc[rng.random(n) < 0.01, "userEmail"] = "not-an-email"
+    df.loc[rng.random(n) < 0.01, "User"] = None
+    df.loc[rng.random(n) < 0.02, "Like"] = np.nan
+    return df
+
+
+def legacy_render(df):
+    """
+    The loop the script used to run, without printing.
+    """
+    subjects, bodies = [], []
+    for index, row in df.iterrows():
+        user, email, likes, dislikes = row['User'], row['userEmail'], row['Like'], row['dislike']
+        if re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', str(email)) is None:
+            continue
+        if pd.isna(user) or pd.isna(email):
+            continue
+        try:
+            likes = float(likes) if not pd.isna(likes) else 0
+            dislikes = float(dislikes) if not pd.isna(dislikes) else 0
+        except (ValueError, TypeError):
+            likes = dislikes = 0
+        year = str(row['year']) if not pd.isna(row['year']) else "N/A"
+        like_color = "background-color:#FF4C4C; color:white;" if likes < 5 else \
+            "background-color:#4CAF50; color:white;" if likes > 5 else ""
+        fields = dict(user=user, likes=likes, dislikes=dislikes, week=row['week'], year=year,
+                      tool=row['tools'], like_color=like_color, comment=row['comment'])
+        subjects.append(SUBJECT_TEMPLATE.format(**fields))
+        bodies.append(REPORT_TEMPLATE.format(**fields))
+    return subjects, bodies
+
+
+def columnar_render(df):
+    rows, _, _ = clean_report_rows(df)
+    subjects, bodies = [], []
+    for _, batch_subjects, batch_bodies in render_reports(rows):
+        subjects.extend(batch_subjects)
+        bodies.extend(batch_bodies)
+    return subjects, bodies
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = make_rows(args.rows)
+    legacy, legacy_seconds = timed(legacy_render, df)
+    columnar, columnar_seconds = timed(columnar_render, df)
+    legacy = legacy[0], [re.sub(r"\n[ \t]+", "\n", body) for body in legacy[1]]
+    if legacy != columnar:
+        sys.exit("Columnar rendering differs from the per-row loop")
+
+    reports = len(columnar[1])
+    print(f"{args.rows:,} rows, {reports:,} reports")
+    print(f"per-row loop  {legacy_seconds:8.2f}s  {args.rows / legacy_seconds:>10,.0f} rows/s")
+    print(f"columnar      {columnar_seconds:8.2f}s  {args.rows / columnar_seconds:>10,.0f} rows/s"
+          f"  ({legacy_seconds / columnar_seconds:.1f}x)")
+
+    sample = min(reports, 10_000)
+    _, seconds = timed(lambda: [build_message("a@example.com", "b@example.com", s, b)
+                                for s, b in zip(columnar[0][:sample], columnar[1][:sample])])
+    print(f"mail messages {seconds * reports / sample:8.2f}s  {sample / seconds:>10,.0f} messages/s (estimated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,129 @@
+import argparse
+import itertools
 import pandas as pd
-import win32com.client as win32
-import re
 import os
+import time
 
-def validate_email(email):
-    """Basic email validation"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+from mail_transport import TRANSPORTS, build_message, make_transport
+from newsletter_assets import CACHE_DIR, build_newsletter
+from report_render import REQUIRED_COLUMNS, clean_report_rows, render_digests, render_reports
+from report_pipeline import CHUNK_ROWS, read_workbook_chunks, run_pipeline
+from send_journal import STATES, SendJournal, report_key
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send the weekly feedback report to every user of the workbook.")
     # Configuration - File path to your Excel file
-    file_path = r"C:\Users\sanirudh\Downloads\Book.xlsx"
+    parser.add_argument("--file", default=r"C:\Users\sanirudh\Downloads\Book.xlsx", help="Excel file with one row per user and tool")
+    parser.add_argument("--digest", choices=("recipient", "week"),
+                        help="one report per recipient (or per recipient and week/year) covering all their tools, instead of one per row")
+    parser.add_argument("--journal", metavar="PATH",
+                        help="SQLite send journal; rerunning with the same journal skips reports already sent")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="stream the workbook in chunks and read, render and send concurrently (flat memory for very large workbooks)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="pipeline: workbook rows per chunk")
+    parser.add_argument("--newsletter", metavar="HTML",
+                        help="send this newsletter page (images optimized and embedded inline) to every recipient instead of the reports")
+    parser.add_argument("--subject", default="Knowledge Initiative Newsletter", help="newsletter: mail subject")
+    parser.add_argument("--newsletter-cache", default=CACHE_DIR, help="newsletter: folder for the optimized images")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="outlook",
+                        help="outlook (COM, Windows only), smtp (pooled connections) or spool (.eml files)")
+    parser.add_argument("--send", action="store_true", help="outlook: send directly instead of displaying each mail")
+    parser.add_argument("--sender", default=os.environ.get("REPORT_SENDER", "knowledge-initiative@synopsys.com"))
+    parser.add_argument("--smtp-host", default=os.environ.get("SMTP_HOST", "localhost"))
+    parser.add_argument("--smtp-port", type=int, default=int(os.environ.get("SMTP_PORT", "25")))
+    parser.add_argument("--smtp-user", default=os.environ.get("SMTP_USER"), help="login; the password is read from SMTP_PASSWORD")
+    parser.add_argument("--starttls", action="store_true")
+    parser.add_argument("--workers", type=int, default=8, help="smtp: concurrent connections")
+    parser.add_argument("--rate", type=float, default=0, help="smtp: max messages per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3, help="smtp: retries of transient failures")
+    parser.add_argument("--spool-dir", default="outbox", help="spool: directory for the .eml files")
+    args = parser.parse_args(argv)
+    if args.pipeline and args.digest:
+        parser.error("--digest needs the whole workbook and cannot be combined with --pipeline")
+    if args.newsletter and args.digest:
+        parser.error("--newsletter sends one page to every recipient and cannot be combined with --digest")
+    return args
+
+def open_transport(args):
+    if args.transport == "outlook":
+        return make_transport("outlook", display=not args.send)
+    if args.transport == "smtp":
+        return make_transport(
+            "smtp", host=args.smtp_host, port=args.smtp_port, username=args.smtp_user,
+            password=os.environ.get("SMTP_PASSWORD"), starttls=args.starttls,
+            workers=args.workers, rate=args.rate, retries=args.retries,
+        )
+    return make_transport("spool", directory=args.spool_dir)
+
+def render_messages(args, rows, journal, seen, newsletter=None):
+    """
+    Mail messages for the cleaned `rows` (one per row, digests, or `newsletter` once per
+    recipient), leaving out the reports the journal has as sent and those whose key is in `seen`
+    (already rendered in this run, e.g. a duplicate row). Each message gets its journal key as
+    `journal_key`. Returns the messages and the number of reports left out.
+    """
+    images = ()
+    if newsletter is not None:
+        # Newsletter recipients not seen yet in this run (pipeline chunks share `seen`)
+        emails = [email for email in dict.fromkeys(rows["email"]) if email not in seen]
+        seen.update(emails)
+        batches = [(emails, [args.subject] * len(emails), [newsletter.html] * len(emails))]
+        images = newsletter.images
+    elif args.digest:
+        batches = render_digests(rows, by_period=args.digest == "week")
+    else:
+        batches = render_reports(rows)
+    messages = []
+    already_sent = 0
+    for emails, subjects, bodies in batches:
+        if journal is None:
+            messages.extend(build_message(args.sender, email, subject, html_body, images)
+                            for email, subject, html_body in zip(emails, subjects, bodies))
+            continue
+        batch_keys = [report_key(*report) for report in zip(emails, subjects, bodies)]
+        sent = journal.sent_keys(batch_keys)
+        rendered = []
+        for email, subject, html_body, key in zip(emails, subjects, bodies, batch_keys):
+            if key in sent or key in seen:
+                already_sent += 1
+                continue
+            seen.add(key)
+            message = build_message(args.sender, email, subject, html_body, images)
+            message.journal_key = key
+            messages.append(message)
+            rendered.append((key, email, subject))
+        journal.mark_many(rendered, "rendered")
+    return messages, already_sent
+
+def check_columns(df):
+    """Raise ValueError if required columns are missing"""
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {missing_columns}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    file_path = args.file
     
     # Error handling and validation
     try:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"Excel file not found: {file_path}")
         
-        df = pd.read_excel(file_path)
-        
-        # Check if required columns exist
-        required_columns = ['User', 'userEmail', 'Like', 'dislike', 'comment', 'week', 'year', 'tools']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            raise ValueError(f"Missing required columns: {missing_columns}")
-        
-        print(f"Successfully loaded {len(df)} rows from Excel file")
+        if args.pipeline:
+            # Stream the workbook: only the first chunk is read here
+            chunks = read_workbook_chunks(file_path, args.chunk_rows)
+            df = next(chunks)
+            check_columns(df)
+            chunks = itertools.chain([df], chunks)
+            print(f"Streaming rows from Excel file in chunks of {args.chunk_rows}")
+        else:
+            df = pd.read_excel(file_path)
+            
+            # Check if required columns exist
+            check_columns(df)
+            
+            print(f"Successfully loaded {len(df)} rows from Excel file")
         
     except FileNotFoundError as e:
         print(f"Error: {e}")
@@ -40,184 +137,95 @@ def main():
         print(f"Unexpected error loading Excel file: {e}")
         return
 
-    # Start Outlook with error handling
+    newsletter = None
+    if args.newsletter:
+        # Optimize and encode the newsletter images once for the whole run
+        try:
+            newsletter = build_newsletter(args.newsletter, args.newsletter_cache)
+        except (OSError, ImportError) as e:
+            print(f"Error preparing newsletter {args.newsletter}: {e}")
+            return
+        print("\n".join(newsletter.report_lines()))
+
+    # Open the mail transport with error handling
     try:
-        outlook = win32.Dispatch('Outlook.Application')
-        print("Successfully connected to Outlook")
+        transport = open_transport(args)
+        print(f"Using the {transport.name} mail transport")
     except Exception as e:
-        print(f"Error connecting to Outlook: {e}")
-        print("Make sure Microsoft Outlook is installed and running")
+        print(f"Error opening the {args.transport} mail transport: {e}")
+        if args.transport == "outlook":
+            print("Make sure Microsoft Outlook is installed and running")
         return
 
-    # Process each row and send emails
-    success_count = 0
-    error_count = 0
-    
-    for index, row in df.iterrows():
-        try:
-            user = row['User']
-            email = row['userEmail']
-            likes = row['Like']
-            dislikes = row['dislike']
-            comment = row['comment']
-            week = row['week']
-            year = row['year']
-            tool = row['tools']
-            
-            # Validate email address
-            if not validate_email(str(email)):
-                print(f"Warning: Invalid email address for {user}: {email}")
-                error_count += 1
-                continue
-            
-            # Handle NaN or empty values
-            if pd.isna(user) or pd.isna(email):
-                print(f"Warning: Missing user name or email for row {index + 1}")
-                error_count += 1
-                continue
-            
-            # Convert numeric values safely
-            try:
-                likes = float(likes) if not pd.isna(likes) else 0
-                dislikes = float(dislikes) if not pd.isna(dislikes) else 0
-            except (ValueError, TypeError):
-                print(f"Warning: Invalid numeric values for {user}")
-                likes = 0
-                dislikes = 0
-            
-            # Handle year as string
-            year = str(year) if not pd.isna(year) else "N/A"
-
-            # Conditional color for Like
-            if likes < 5:
-                like_color = "background-color:#FF4C4C; color:white;"  # red
-            elif likes > 5:
-                like_color = "background-color:#4CAF50; color:white;"  # green
+    journal = SendJournal(args.journal) if args.journal else None
+    seen = set()  # journal keys (and newsletter recipients) rendered in this run
+    totals = {"rows": 0, "messages": 0, "errors": 0, "already_sent": 0, "sent": 0, "failed": 0}
+
+    def render(chunk):
+        # Clean, validate and render the reports of `chunk` column-wise, a batch at a time
+        rows, warnings, skipped = clean_report_rows(chunk)
+        for _, warning in warnings:
+            print(warning)
+        messages, already_sent = render_messages(args, rows, journal, seen, newsletter)
+        totals["rows"] += len(rows)
+        totals["messages"] += len(messages)
+        totals["errors"] += skipped
+        totals["already_sent"] += already_sent
+        return messages
+
+    # Outlook without --send only opens each mail for review: nothing is delivered yet
+    displayed_only = transport.name == "outlook" and not args.send
+
+    def report(result):
+        if result.ok:
+            print(f"Email {'created' if displayed_only else 'sent'} for {result.message['To']}")
+        else:
+            print(f"Error sending to {result.message['To']} after {result.attempts} attempt(s): {result.error}")
+        if journal is not None:
+            # Displayed drafts are not recorded as sent, so a rerun still sends them
+            state = ("displayed" if displayed_only else "sent") if result.ok else "failed"
+            journal.mark(result.message.journal_key, state, error=None if result.ok else str(result.error))
+
+    def deliver(messages):
+        # The SMTP transport sends concurrently over pooled connections
+        if journal is not None:
+            journal.mark_many([(message.journal_key, None, None) for message in messages], "queued")
+        results = transport.send_many(messages, on_result=report)
+        ok = sum(r.ok for r in results)
+        totals["sent"] += ok
+        totals["failed"] += len(results) - ok
+
+    start = time.perf_counter()
+    try:
+        with transport:
+            if args.pipeline:
+                # Read, render and send concurrently with bounded queues in between
+                run_pipeline(("read", "rows", chunks, len),
+                             [("render", "rows", render, len), ("send", "messages", deliver, len)])
             else:
-                like_color = ""  # no color
+                messages = render(df)
+                print(f"Rendered {len(messages)} reports in {time.perf_counter() - start:.2f}s")
+                start = time.perf_counter()
+                deliver(messages)
+    finally:
+        if journal is not None:
+            journal_counts = journal.counts()
+            journal.close()
+    elapsed = time.perf_counter() - start
+
+    if totals["already_sent"]:
+        print(f"Skipped {totals['already_sent']} reports already sent (or duplicated) according to {args.journal}")
+    if args.digest:
+        print(f"Digest by {args.digest}: {totals['rows']} rows in, {totals['messages']} messages out"
+              f" ({totals['rows'] / max(totals['messages'], 1):.1f} rows per message)")
+    success_count = totals["sent"]
+    error_count = totals["errors"] + totals["failed"]
 
-            # Create Outlook mail
-            mail = outlook.CreateItem(0)
-            mail.To = email
-            mail.Subject = f"Demo Mail - Feedback Report - {week}, {year} ({tool})"
-            
-            # HTML Body - Outlook Classic Compatible
-            html_body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f8f9fa;">
-                <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa;">
-                    <tr>
-                        <td align="center">
-                            <table width="600" cellpadding="0" cellspacing="0" border="0" style="background-color: white; border: 1px solid #ddd;">
-                                
-                                <!-- Header -->
-                                <tr>
-                                    <td style="background-color: #667eea; padding: 30px; text-align: center;">
-                                        <h1 style="color: white; margin: 0; font-size: 24px; font-weight: bold; font-family: Arial, sans-serif;">Weekly Feedback Report</h1>
-                                        <p style="color: white; margin: 10px 0 0 0; font-size: 14px; font-family: Arial, sans-serif;">Performance Analytics Dashboard</p>
-                                    </td>
-                                </tr>
-                                
-                                <!-- Content -->
-                                <tr>
-                                    <td style="padding: 30px;">
-                                        <h2 style="color: #333; margin: 0 0 20px 0; font-size: 18px; font-family: Arial, sans-serif;">Dear {user},</h2>
-                                        
-                                        <p style="color: #666; line-height: 1.5; margin: 0 0 25px 0; font-family: Arial, sans-serif;">
-                                            We hope this message finds you well. Please find below your comprehensive feedback report for the specified period. This report contains valuable insights into your performance metrics and areas for continued excellence.
-                                        </p>
-                                        
-                                        <!-- Performance Summary -->
-                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa; margin: 20px 0;">
-                                            <tr>
-                                                <td style="padding: 20px;">
-                                                    <h3 style="color: #333; margin: 0 0 15px 0; font-size: 16px; font-family: Arial, sans-serif;">Performance Summary</h3>
-                                                    
-                                                    <table width="100%" cellpadding="10" cellspacing="0" border="0">
-                                                        <tr>
-                                                            <td width="33%" style="text-align: center; vertical-align: top;">
-                                                                <div style="font-size: 24px; font-weight: bold; color: #667eea; font-family: Arial, sans-serif;">{likes}</div>
-                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Likes</div>
-                                                            </td>
-                                                            <td width="33%" style="text-align: center; vertical-align: top;">
-                                                                <div style="font-size: 24px; font-weight: bold; color: #dc3545; font-family: Arial, sans-serif;">{dislikes}</div>
-                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Dislikes</div>
-                                                            </td>
-                                                            <td width="34%" style="text-align: center; vertical-align: top;">
-                                                                <div style="font-size: 24px; font-weight: bold; color: #28a745; font-family: Arial, sans-serif;">{week}</div>
-                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Reporting Period</div>
-                                                            </td>
-                                                        </tr>
-                                                    </table>
-                                                </td>
-                                            </tr>
-                                        </table>
-                                        
-                                        <!-- Detailed Report Table -->
-                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="margin: 25px 0; border: 1px solid #ddd;">
-                                            <tr style="background-color: #f8f9fa;">
-                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="40%">Metric</td>
-                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="60%">Value</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Tool</td>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-family: Arial, sans-serif;">{tool}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Period</td>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-family: Arial, sans-serif;">{week}, {year}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Likes</td>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; text-align: center; font-weight: bold; font-family: Arial, sans-serif; {like_color}">{likes}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Dislikes</td>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; text-align: center; font-weight: bold; color: #dc3545; font-family: Arial, sans-serif;">{dislikes}</td>
-                                            </tr>
-                                            <tr>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Comments</td>
-                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-style: italic; font-family: Arial, sans-serif;">{comment}</td>
-                                            </tr>
-                                        </table>
-                                        
-                                        <p style="color: #666; line-height: 1.5; margin: 25px 0 0 0; font-family: Arial, sans-serif;">
-                                            Thank you for your continued dedication and hard work. Should you have any questions about this report or would like to discuss your performance in detail, please don't hesitate to reach out.
-                                        </p>
-                                    </td>
-                                </tr>
-                                
-                                <!-- Footer -->
-                                <tr>
-                                    <td style="background-color: #f8f9fa; padding: 20px; text-align: center; border-top: 1px solid #ddd;">
-                                        <p style="color: #6c757d; margin: 0; font-size: 14px; font-family: Arial, sans-serif;">
-                                            Best regards,<br>
-                                            <strong style="color: #495057;">knowledge-initiative@synopsys.com</strong>
-                                        </p>
-                                        <p style="color: #adb5bd; margin: 10px 0 0 0; font-size: 12px; font-family: Arial, sans-serif;">
-                                            This is an automated report. Please do not reply to this email.
-                                        </p>
-                                    </td>
-                                </tr>
-                            </table>
-                        </td>
-                    </tr>
-                </table>
-            </body>
-            </html>
-            """
-
-            mail.HTMLBody = html_body
-            mail.Display()  # Change to mail.Send() to directly send emails
-            success_count += 1
-            print(f"Email created for {user} ({email})")
-            
-        except Exception as e:
-            print(f"Error processing row {index + 1} for user {user}: {e}")
-            error_count += 1
-            continue
-    
     print(f"\nSummary: {success_count} emails processed successfully, {error_count} errors")
+    if totals["messages"]:
+        print(f"Delivery took {elapsed:.2f}s ({totals['messages'] / max(elapsed, 1e-9):.1f} messages/s)")
+    if journal is not None:
+        print(f"Send journal {args.journal}: " + ", ".join(f"{journal_counts.get(state, 0)} {state}" for state in STATES))
 
 if __name__ == "__main__":
     main()
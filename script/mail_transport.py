@@ -0,0 +1,371 @@
+"""
+Mail transports for the report scripts.
+
+Every transport sends `email.message.Message` objects (see build_message):
+
+    OutlookTransport  Outlook over COM (Windows only); shows each mail or sends it directly
+    SmtpTransport     any SMTP server, through a pool of persistent connections used by
+                      concurrent workers, with rate limiting and retry with backoff
+    SpoolTransport    writes every message as an .eml file (dry runs, or pick-up directories)
+
+Use `make_transport(name, **options)` to build one from command-line settings.
+"""
+import os
+import queue
+import random
+import re
+import smtplib
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+TRANSPORTS = ("outlook", "smtp", "spool")
+
+
+def build_message(sender, to, subject, html_body, images=()):
+    """
+    An HTML mail ready for any transport. Built from the email.mime classes, which store headers
+    as given, instead of EmailMessage, whose header parsing made building a report mail cost
+    more than rendering it. `images` (newsletter_assets.InlineImage) are attached inline for
+    the cid: references of the HTML; their parts are encoded once and shared between messages.
+    """
+    message = MIMEMultipart("alternative")
+    if sender:
+        message["From"] = sender
+    message["To"] = to
+    # Non-ASCII subjects (tool names, say) need RFC 2047 encoding, which EmailMessage did itself
+    message["Subject"] = subject if subject.isascii() else Header(subject, "utf-8")
+    message.attach(MIMEText("This report is best viewed in an HTML capable mail client.", "plain", "utf-8"))
+    html_part = MIMEText(html_body, "html", "utf-8")
+    if images:
+        related = MIMEMultipart("related")
+        related.attach(html_part)
+        for image in images:
+            related.attach(image.part())
+        html_part = related
+    message.attach(html_part)
+    return message
+
+
+def html_part(message):
+    """
+    The HTML body of a message built by build_message.
+    """
+    for part in message.walk():
+        if part.get_content_type() == "text/html":
+            return part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8")
+    return message.get_payload(decode=True).decode(message.get_content_charset() or "utf-8")
+
+
+class SendResult:
+    """
+    Outcome of one message: `ok`, the number of `attempts` and the last `error` if it failed.
+    """
+
+    def __init__(self, message, ok, attempts, error=None):
+        self.message = message
+        self.ok = ok
+        self.attempts = attempts
+        self.error = error
+
+
+class Transport:
+    """
+    Base class: `send` delivers one message, `send_many` a batch (sequentially unless the
+    transport supports concurrency) and reports each outcome to `on_result`.
+    """
+
+    name = None
+
+    def send(self, message):
+        raise NotImplementedError
+
+    def send_many(self, messages, on_result=None):
+        results = []
+        for message in messages:
+            try:
+                self.send(message)
+                result = SendResult(message, True, 1)
+            except Exception as e:
+                result = SendResult(message, False, 1, e)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+        return results
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def inline_images(message):
+    """
+    (content id, filename, bytes) of every inline image of a message.
+    """
+    for part in message.walk():
+        if part.get_content_maintype() == "image" and part["Content-ID"]:
+            yield part["Content-ID"].strip("<>"), part.get_filename(), part.get_payload(decode=True)
+
+
+class OutlookTransport(Transport):
+    """
+    Creates one Outlook mail item per message over COM. With `display` (the default, as the
+    script always did) each mail is opened for review instead of being sent. Inline images are
+    written to a temporary folder once per run and attached with their content id.
+    """
+
+    name = "outlook"
+
+    # MAPI property of an attachment's content id (PR_ATTACH_CONTENT_ID)
+    CONTENT_ID_PROPERTY = "http://schemas.microsoft.com/mapi/proptag/0x3712001F"
+
+    def __init__(self, display=True):
+        import win32com.client as win32  # Windows only: pip install pywin32
+
+        self.display = display
+        self._outlook = win32.Dispatch("Outlook.Application")
+        self._image_dir = None
+        self._image_paths = {}  # content id -> file
+
+    def _image_path(self, cid, filename, data):
+        if cid not in self._image_paths:
+            if self._image_dir is None:
+                self._image_dir = tempfile.TemporaryDirectory(prefix="report_images_")
+            path = os.path.join(self._image_dir.name, f"{len(self._image_paths)}_{filename or 'image'}")
+            with open(path, "wb") as fh:
+                fh.write(data)
+            self._image_paths[cid] = path
+        return self._image_paths[cid]
+
+    def send(self, message):
+        mail = self._outlook.CreateItem(0)
+        mail.To = message["To"]
+        mail.Subject = str(message["Subject"])
+        mail.HTMLBody = html_part(message)
+        for cid, filename, data in inline_images(message):
+            attachment = mail.Attachments.Add(self._image_path(cid, filename, data))
+            attachment.PropertyAccessor.SetProperty(self.CONTENT_ID_PROPERTY, cid)
+        if self.display:
+            mail.Display()
+        else:
+            mail.Send()
+
+    def close(self):
+        if self._image_dir is not None and not self.display:
+            self._image_dir.cleanup()
+
+
+class SpoolTransport(Transport):
+    """
+    Writes each message to `directory` as <run>_<n>_<recipient>.eml, e.g. for a dry run or an
+    SMTP pick-up folder. <run> (start time and a random suffix) differs between runs, so a rerun
+    into the same folder never replaces files not picked up yet; a name that exists anyway is
+    an error, not an overwrite.
+    """
+
+    name = "spool"
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._run = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self._counter += 1
+            number = self._counter
+        recipient = re.sub(r"[^A-Za-z0-9@._-]", "_", str(message["To"]))
+        path = os.path.join(self.directory, f"{self._run}_{number:06d}_{recipient}.eml")
+        # Written under a temporary name, then linked into place: pick-up services only ever see
+        # whole files, and unlike a rename the link fails if the name is taken
+        with open(path + ".tmp", "xb") as fh:
+            fh.write(message.as_bytes())
+        try:
+            os.link(path + ".tmp", path)
+        finally:
+            os.remove(path + ".tmp")
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all workers: at most `rate` messages per second on average, in bursts
+    of at most `burst`. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_transient(error):
+    """
+    Whether retrying may help: dropped connections, timeouts and 4xx replies are transient,
+    5xx replies (bad address, message refused) are not.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class SmtpTransport(Transport):
+    """
+    Sends through an SMTP server with a pool of `workers` persistent connections, each used by
+    one worker thread, so the connection and login cost is paid once per worker and not per
+    message. Sends are throttled to `rate` messages per second (0 = unlimited) and transient
+    failures are retried up to `retries` times with exponential backoff starting at `backoff` s.
+    A failed login stops the pool: the remaining messages fail with that error without connecting.
+    """
+
+    name = "smtp"
+
+    def __init__(self, host="localhost", port=25, username=None, password=None, starttls=False,
+                 use_ssl=False, timeout=30, workers=4, rate=0, retries=3, backoff=0.5):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(rate)
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._lock = threading.Lock()
+        self._auth_error = None
+
+    def _connect(self):
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        connection = smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                connection.starttls()
+            if self.username:
+                connection.login(self.username, self.password or "")
+        except smtplib.SMTPAuthenticationError as e:
+            # Wrong credentials fail every login: stop the pool instead of logging in per message
+            self._auth_error = e
+            connection.close()
+            raise
+        except Exception:
+            connection.close()
+            raise
+        with self._lock:
+            self._opened.append(connection)
+        return connection
+
+    def _discard(self, connection):
+        with self._lock:
+            if connection in self._opened:
+                self._opened.remove(connection)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def _deliver(self, message):
+        attempt = 0
+        while True:
+            if self._auth_error is not None:
+                return SendResult(message, False, attempt, self._auth_error)
+            attempt += 1
+            self.limiter.acquire()
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = None
+            try:
+                if connection is None:
+                    connection = self._connect()
+                connection.send_message(message)
+                self._idle.put(connection)
+                return SendResult(message, True, attempt)
+            except Exception as e:
+                if connection is not None:
+                    if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                        self._discard(connection)
+                    else:
+                        # The server answered: the connection is still usable after a reset
+                        try:
+                            connection.rset()
+                            self._idle.put(connection)
+                        except Exception:
+                            self._discard(connection)
+                if attempt > self.retries or not is_transient(e):
+                    return SendResult(message, False, attempt, e)
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random() / 2))
+
+    def send(self, message):
+        result = self._deliver(message)
+        if not result.ok:
+            raise result.error
+
+    def send_many(self, messages, on_result=None):
+        def deliver(message):
+            result = self._deliver(message)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="smtp") as pool:
+            return list(pool.map(deliver, messages))
+
+    def close(self):
+        with self._lock:
+            connections, self._opened = self._opened, []
+        for connection in connections:
+            try:
+                connection.quit()
+            except Exception:
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+        self._idle = queue.LifoQueue()
+
+
+def make_transport(name, **options):
+    """
+    Build the transport called `name` ("outlook", "smtp" or "spool"); options are passed to its
+    constructor (display / host, port, workers, rate, ... / directory).
+    """
+    if name == "outlook":
+        return OutlookTransport(**options)
+    if name == "smtp":
+        return SmtpTransport(**options)
+    if name == "spool":
+        return SpoolTransport(**options)
+    raise ValueError(f"Unknown transport {name!r}, expected one of {TRANSPORTS}")
@@ -0,0 +1,355 @@
+"""
+Newsletter asset pipeline: turns a newsletter HTML page (see the Newsletter folder) into a mail
+body with small, inline images.
+
+Every <img> of the page is resized to the size it is displayed at (its inline width/height,
+max-width and object-fit, or the width of the nearest enclosing element with a pixel width)
+and recompressed: photos become JPEG, everything else the smaller of an optimized truecolor
+and a 256-color palette PNG; an image whose original is already smaller is kept as it is.
+Optimized images are cached on disk by content hash, so a page is only processed once, and are
+embedded as CID inline attachments that are encoded once per run and shared by every message
+(see mail_transport.build_message).
+
+Usage:
+    python newsletter_assets.py ../Newsletter/newsLetter_Outlook_Compatible.html
+    python newsletter_assets.py ../Newsletter/new/newsletter_1.html --scale 2 --eml preview.eml
+
+prints the bytes saved per image; with --eml a sample message is written as well.
+"""
+import argparse
+import hashlib
+import io
+import os
+import re
+from html.parser import HTMLParser
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: pip install Pillow
+    Image = ImageOps = None
+
+# Display width of images without any width of their own or of an enclosing element
+DEFAULT_DISPLAY_WIDTH = 600
+
+# Images with more colors than this (and no transparency) are photos and become JPEG
+PHOTO_COLORS = 16384
+JPEG_QUALITY = 85
+
+CACHE_DIR = ".newsletter_cache"
+
+# Bump when the optimization changes, so cached images are rebuilt
+_CACHE_VERSION = 2
+
+# Elements without an end tag
+_VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def _style(value):
+    declarations = (item.split(":", 1) for item in (value or "").split(";") if ":" in item)
+    return {name.strip().lower(): setting.strip().lower() for name, setting in declarations}
+
+
+def _pixels(value):
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(px)?", (value or "").strip())
+    return round(float(match.group(1))) if match else None
+
+
+def display_box(attrs, container_width=None):
+    """
+    (width, height, fit) an <img> with these attributes is displayed at: width and height in
+    CSS pixels (height None when it follows the aspect ratio), fit "cover" for object-fit:cover.
+    """
+    style = _style(attrs.get("style"))
+    width = _pixels(style.get("width")) or _pixels(attrs.get("width"))
+    height = _pixels(style.get("height")) or _pixels(attrs.get("height"))
+    max_width = _pixels(style.get("max-width"))
+    if width is None:
+        width = max_width or container_width or DEFAULT_DISPLAY_WIDTH
+    elif max_width:
+        width = min(width, max_width)
+    if container_width:
+        width = min(width, container_width)
+    fit = "cover" if style.get("object-fit") == "cover" and height else "contain"
+    return width, height, fit
+
+
+class _ImageTag:
+    def __init__(self, start, text, attrs, box):
+        self.start = start
+        self.text = text
+        self.attrs = attrs
+        self.box = box
+
+
+class _ImageFinder(HTMLParser):
+    """
+    Collects the <img> tags of a page with their offsets and display box, tracking the pixel
+    width of the enclosing elements.
+    """
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.images = []
+        self._stack = []  # (tag, pixel width or None)
+        self._line_offsets = [0]
+        for line in html.splitlines(keepends=True):
+            self._line_offsets.append(self._line_offsets[-1] + len(line))
+        self.feed(html)
+        self.close()
+
+    def _container_width(self):
+        for _, width in reversed(self._stack):
+            if width:
+                return width
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "img":
+            line, column = self.getpos()
+            self.images.append(_ImageTag(self._line_offsets[line - 1] + column, self.get_starttag_text(), attrs,
+                                         display_box(attrs, self._container_width())))
+        elif tag not in _VOID:
+            style = _style(attrs.get("style"))
+            width = _pixels(style.get("width")) or _pixels(style.get("max-width")) or _pixels(attrs.get("width"))
+            self._stack.append((tag, width))
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                break
+
+
+def optimize_image(data, width, height=None, fit="contain", scale=1):
+    """
+    `data` (an image file) resized to `width` x `height` CSS pixels times `scale` (never
+    enlarged; height None keeps the aspect ratio, fit "cover" crops to fill the box) and
+    recompressed. Returns (bytes, subtype, (width, height) in pixels).
+    """
+    if Image is None:
+        raise ImportError("Optimizing newsletter images requires Pillow: pip install Pillow")
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    if has_alpha and image.getchannel("A").getextrema()[0] == 255:
+        image, has_alpha = image.convert("RGB"), False
+    # Judged before resizing: resampling blends new colors into any image
+    photo = not has_alpha and image.getcolors(PHOTO_COLORS) is None
+
+    target_width = width * scale
+    if fit == "cover" and height:
+        target_height = height * scale
+        # Largest box of the display aspect ratio that needs no enlarging
+        shrink = min(1.0, image.width / target_width, image.height / target_height)
+        size = (max(1, round(target_width * shrink)), max(1, round(target_height * shrink)))
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+    else:
+        target_height = height * scale if height else image.height
+        image.thumbnail((target_width, target_height), Image.LANCZOS)
+
+    if photo:
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return output.getvalue(), "jpeg", image.size
+
+    # Graphics and screenshots: the smaller of a truecolor and a 256-color palette PNG
+    colors = image.getcolors(256)
+    method = Image.Quantize.FASTOCTREE if has_alpha else Image.Quantize.MEDIANCUT
+    candidates = [image.quantize(colors=len(colors) if colors else 256, method=method, dither=Image.Dither.NONE)]
+    if colors is None:
+        candidates.append(image)
+    encoded = []
+    for candidate in candidates:
+        output = io.BytesIO()
+        candidate.save(output, "PNG", optimize=True)
+        encoded.append(output.getvalue())
+    return min(encoded, key=len), "png", image.size
+
+
+class InlineImage:
+    """
+    An optimized image embedded in the newsletter as cid:`cid`.
+    """
+
+    def __init__(self, cid, data, subtype, filename):
+        self.cid = cid
+        self.data = data
+        self.subtype = subtype
+        self.filename = filename
+        self._part = None
+
+    def part(self):
+        """
+        The MIME part of the image, encoded once and shared by every message of the run.
+        """
+        if self._part is None:
+            from email.mime.image import MIMEImage
+
+            part = MIMEImage(self.data, self.subtype)
+            part["Content-ID"] = f"<{self.cid}>"
+            part.add_header("Content-Disposition", "inline", filename=self.filename)
+            self._part = part
+        return self._part
+
+
+class AssetReport:
+    """
+    What optimizing one <img> of the page did.
+    """
+
+    def __init__(self, src, original_bytes, original_size, optimized_bytes=None, size=None, cached=False,
+                 kept_original=False, error=None):
+        self.src = src
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.optimized_bytes = optimized_bytes
+        self.size = size
+        self.cached = cached
+        self.kept_original = kept_original
+        self.error = error
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - self.optimized_bytes if self.optimized_bytes is not None else 0
+
+
+class Newsletter:
+    """
+    A newsletter ready to send: `html` refers to `images` by cid, `assets` reports each <img>.
+    """
+
+    def __init__(self, path, html, images, assets):
+        self.path = path
+        self.html = html
+        self.images = images
+        self.assets = assets
+
+    def message_bytes(self):
+        """
+        Approximate size of one message: the HTML plus the base64-encoded images.
+        """
+        return len(self.html.encode("utf-8")) + sum(len(image.data) * 4 // 3 for image in self.images)
+
+    def report_lines(self):
+        lines = [f"{'image':<40} {'original':>18} {'optimized':>18} {'saved':>14}"]
+        for asset in self.assets:
+            if asset.error:
+                lines.append(f"{asset.src:<40} {asset.error}")
+                continue
+            original = f"{asset.original_size[0]}x{asset.original_size[1]} {asset.original_bytes / 1024:.0f}KB"
+            optimized = f"{asset.size[0]}x{asset.size[1]} {asset.optimized_bytes / 1024:.0f}KB"
+            percent = asset.saved_bytes / max(asset.original_bytes, 1)
+            lines.append(f"{asset.src:<40} {original:>18} {optimized:>18} {asset.saved_bytes / 1024:>7.0f}KB {percent:>4.0%}"
+                         + (" (kept original)" if asset.kept_original else " (cached)" if asset.cached else ""))
+        total = sum(asset.original_bytes for asset in self.assets if not asset.error)
+        saved = sum(asset.saved_bytes for asset in self.assets)
+        lines.append(f"Total: {total / 1024:.0f}KB of images -> {(total - saved) / 1024:.0f}KB "
+                     f"({saved / max(total, 1):.0%} saved), {len(self.images)} inline attachments, "
+                     f"about {self.message_bytes() / 1024:.0f}KB per message")
+        return lines
+
+
+def _resolve(src, directory):
+    # Relative to the page first, then to each folder above it (pages in a subfolder often share
+    # the media folder of the main page)
+    if re.match(r"^(?:[a-z][a-z0-9+.-]*:|//)", src, re.IGNORECASE):
+        return None
+    while True:
+        path = os.path.join(directory, src)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _cached(cache_dir, source, width, height, fit, scale):
+    key = hashlib.sha256(source + repr((width, height, fit, scale, JPEG_QUALITY, _CACHE_VERSION)).encode()).hexdigest()
+    for subtype in ("png", "jpeg"):
+        path = os.path.join(cache_dir, f"{key}.{subtype}")
+        if os.path.exists(path):
+            with open(path, "rb") as fh:
+                data = fh.read()
+            with Image.open(io.BytesIO(data)) as image:
+                return data, subtype, image.size, True
+    data, subtype, size = optimize_image(source, width, height, fit, scale)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{key}.{subtype}")
+    with open(path + ".tmp", "wb") as fh:
+        fh.write(data)
+    os.replace(path + ".tmp", path)
+    return data, subtype, size, False
+
+
+def build_newsletter(path, cache_dir=CACHE_DIR, scale=1):
+    """
+    Load the newsletter page at `path`, optimize its images (through the cache in `cache_dir`)
+    and point them at inline attachments. With `scale` > 1 images keep `scale` times their
+    display size for high-density screens and get a width attribute, which Outlook needs to
+    show them at display size.
+    """
+    if Image is None:
+        raise ImportError("Optimizing newsletter images requires Pillow: pip install Pillow")
+    with open(path, encoding="utf-8") as fh:
+        html = fh.read()
+    directory = os.path.dirname(os.path.abspath(path))
+    images = {}  # content hash -> InlineImage
+    assets = []
+    pieces, position = [], 0
+    for tag in _ImageFinder(html).images:
+        src = tag.attrs.get("src", "")
+        source_path = _resolve(src, directory)
+        if source_path is None:
+            assets.append(AssetReport(src, 0, None, error="not found, left as is"))
+            continue
+        with open(source_path, "rb") as fh:
+            source = fh.read()
+        with Image.open(io.BytesIO(source)) as original:
+            original_size, original_format = original.size, (original.format or "").lower()
+        width, height, fit = tag.box
+        data, subtype, size, cached = _cached(cache_dir, source, width, height, fit, scale)
+        display_width = round(size[0] / scale)
+        kept = len(data) >= len(source) and original_format in ("png", "jpeg", "gif")
+        if kept:
+            # The original is smaller and at least as sharp; the page scales it down
+            data, subtype, size = source, original_format, original_size
+            display_width = min(width, original_size[0])
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        if digest not in images:
+            name = os.path.splitext(os.path.basename(source_path))[0]
+            images[digest] = InlineImage(f"{digest}@newsletter", data, subtype, f"{name}.{'jpg' if subtype == 'jpeg' else 'png'}")
+        assets.append(AssetReport(src, len(source), original_size, len(data), size, cached, kept))
+
+        new_tag = re.sub(r"""(\ssrc\s*=\s*)(["']?)[^"'\s>]*\2""", lambda m: f"{m.group(1)}\"cid:{images[digest].cid}\"",
+                         tag.text, count=1)
+        if scale > 1 and "width" not in tag.attrs:
+            new_tag = new_tag[:4] + f' width="{display_width}"' + new_tag[4:]
+        pieces += [html[position:tag.start], new_tag]
+        position = tag.start + len(tag.text)
+    pieces.append(html[position:])
+    return Newsletter(path, "".join(pieces), list(images.values()), assets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("html", help="newsletter page")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--scale", type=int, default=1, help="keep images at this multiple of their display size")
+    parser.add_argument("--eml", help="also write a sample message to this file")
+    args = parser.parse_args()
+
+    newsletter = build_newsletter(args.html, args.cache_dir, args.scale)
+    print("\n".join(newsletter.report_lines()))
+    if args.eml:
+        from mail_transport import build_message
+
+        message = build_message(None, "preview@example.com", "Newsletter preview", newsletter.html, images=newsletter.images)
+        with open(args.eml, "wb") as fh:
+            fh.write(message.as_bytes())
+        print(f"Sample message written to {args.eml} ({os.path.getsize(args.eml) / 1024:.0f}KB)")
+
+
+if __name__ == "__main__":
+    main()
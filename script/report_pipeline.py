@@ -0,0 +1,200 @@
+"""
+Streaming pipeline for very large recipient workbooks.
+
+Instead of loading the whole workbook and then rendering and sending in turn, the workbook is
+read in chunks and every stage (read, render, send) runs in its own thread, connected to the
+next by a bounded queue. A slow stage (usually sending) blocks the stages before it once its
+queue is full, so at most a few chunks are in memory whatever the size of the workbook, and
+rendering overlaps with network sends.
+"""
+import queue
+import threading
+import time
+
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+# Workbook rows per chunk
+CHUNK_ROWS = 2000
+
+# Items (chunks or message batches) waiting between two stages
+QUEUE_SIZE = 2
+
+# Seconds between two progress lines
+PROGRESS_SECONDS = 2.0
+
+_DONE = object()
+
+
+def _cell_value(value):
+    # As pd.read_excel: empty cells are parsed as missing, whole floats become ints
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_workbook_chunks(path, chunk_size=CHUNK_ROWS):
+    """
+    Yield the first sheet of the workbook at `path` as DataFrames of up to `chunk_size` rows,
+    parsed like pd.read_excel but read row by row (openpyxl read-only mode), so only one chunk is
+    in memory at a time. The index continues across chunks like one pd.read_excel frame; column
+    dtypes are inferred per chunk. An empty sheet gives one frame without columns, a sheet with
+    only a header row one frame without rows.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        # The first sheet, as pd.read_excel reads it, whichever sheet was active when saved
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            yield pd.DataFrame()
+            return
+        header = [f"Unnamed: {i}" if name is None else str(name) for i, name in enumerate(header)]
+        start, chunk = 0, []
+        for row in rows:
+            chunk.append([_cell_value(value) for value in row])
+            if len(chunk) == chunk_size:
+                yield _parse_chunk(chunk, header, start)
+                start, chunk = start + len(chunk), []
+        if chunk or not start:
+            yield _parse_chunk(chunk, header, start)
+    finally:
+        workbook.close()
+
+
+def _parse_chunk(chunk, header, start):
+    if not chunk:
+        return pd.DataFrame(columns=header)
+    frame = TextParser(chunk, names=header, header=None).read()
+    frame.index = frame.index + start
+    return frame
+
+
+class StageStats:
+    """
+    Items and units (rows, messages) a stage has finished, and its busy time.
+    """
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.units = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, units, busy):
+        with self._lock:
+            self.items += 1
+            self.units += units
+            self.busy += busy
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(source, stages, queue_size=QUEUE_SIZE, progress_seconds=PROGRESS_SECONDS, on_progress=print):
+    """
+    Run a pipeline and return the StageStats of every stage.
+
+    `source` is (name, unit, iterable, size) and every entry of `stages` (name, unit, function,
+    size): each function gets the items of the stage before and returns the item for the next
+    one (the result of the last stage is dropped), `size(item)` counts the units of an item.
+    Every stage runs in its own thread with queues of at most `queue_size` items in between.
+    Every `progress_seconds` a line with each stage's recent throughput and the queue depths is
+    passed to `on_progress`. If a stage raises, the pipeline stops and the error is re-raised.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    stats = [StageStats(name, unit) for name, unit, _, _ in [source] + list(stages)]
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        _, _, iterable, size = source
+        try:
+            iterator = iter(iterable)
+            while True:
+                started = time.perf_counter()
+                item = next(iterator, _DONE)
+                if item is _DONE:
+                    break
+                stats[0].add(size(item), time.perf_counter() - started)
+                if not _put(queues[0], item, stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(queues[0], _DONE, stop)
+
+    def work(i):
+        _, _, function, size = stages[i]
+        try:
+            while True:
+                item = _get(queues[i], stop)
+                if item is _DONE:
+                    break
+                started = time.perf_counter()
+                result = function(item)
+                stats[i + 1].add(size(item), time.perf_counter() - started)
+                if i + 1 < len(stages) and not _put(queues[i + 1], result, stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if i + 1 < len(stages):
+                _put(queues[i + 1], _DONE, stop)
+
+    threads = [threading.Thread(target=read, name=f"pipeline-{source[0]}", daemon=True)]
+    threads += [threading.Thread(target=work, args=(i,), name=f"pipeline-{stage[0]}", daemon=True)
+                for i, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+
+    started = last_time = time.perf_counter()
+    last_units = [0] * len(stats)
+    try:
+        # The last stage finishes last: it only stops after everything before it did
+        while threads[-1].is_alive():
+            threads[-1].join(progress_seconds)
+            if not threads[-1].is_alive():
+                break
+            now = time.perf_counter()
+            parts = []
+            for i, stage in enumerate(stats):
+                rate = (stage.units - last_units[i]) / max(now - last_time, 1e-9)
+                last_units[i] = stage.units
+                parts.append(f"{stage.name} {stage.units:,} {stage.unit} ({rate:,.0f}/s)")
+                if i < len(queues):
+                    parts.append(f"queue {queues[i].qsize()}/{queue_size}")
+            last_time = now
+            on_progress(f"[{now - started:6.1f}s] " + " | ".join(parts))
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return stats
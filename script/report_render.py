@@ -0,0 +1,405 @@
+"""
+Columnar rendering of the weekly feedback reports.
+
+The report columns of the whole workbook are cleaned and validated in one vectorized pass
+(`clean_report_rows`), and the report template, compiled once, is filled from column arrays a
+batch at a time (`render_reports`), instead of building a Series and an f-string per row.
+"""
+import itertools
+import re
+import string
+
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = ['User', 'userEmail', 'Like', 'dislike', 'comment', 'week', 'year', 'tools']
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Like cell style: red below 5 likes, green above, plain at exactly 5
+LIKE_LOW_COLOR = "background-color:#FF4C4C; color:white;"  # red
+LIKE_HIGH_COLOR = "background-color:#4CAF50; color:white;"  # green
+LIKE_THRESHOLD = 5
+
+# Reports rendered per batch
+RENDER_BATCH_SIZE = 5000
+
+_INDENT = re.compile(r"\n[ \t]+")
+
+SUBJECT_TEMPLATE = "Demo Mail - Feedback Report - {week}, {year} ({tool})"
+
+# HTML Body - Outlook Classic Compatible
+REPORT_TEMPLATE = """
+            <html>
+            <body style="font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f8f9fa;">
+                <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa;">
+                    <tr>
+                        <td align="center">
+                            <table width="600" cellpadding="0" cellspacing="0" border="0" style="background-color: white; border: 1px solid #ddd;">
+                                
+                                <!-- Header -->
+                                <tr>
+                                    <td style="background-color: #667eea; padding: 30px; text-align: center;">
+                                        <h1 style="color: white; margin: 0; font-size: 24px; font-weight: bold; font-family: Arial, sans-serif;">Weekly Feedback Report</h1>
+                                        <p style="color: white; margin: 10px 0 0 0; font-size: 14px; font-family: Arial, sans-serif;">Performance Analytics Dashboard</p>
+                                    </td>
+                                </tr>
+                                
+                                <!-- Content -->
+                                <tr>
+                                    <td style="padding: 30px;">
+                                        <h2 style="color: #333; margin: 0 0 20px 0; font-size: 18px; font-family: Arial, sans-serif;">Dear {user},</h2>
+                                        
+                                        <p style="color: #666; line-height: 1.5; margin: 0 0 25px 0; font-family: Arial, sans-serif;">
+                                            We hope this message finds you well. Please find below your comprehensive feedback report for the specified period. This report contains valuable insights into your performance metrics and areas for continued excellence.
+                                        </p>
+                                        
+                                        <!-- Performance Summary -->
+                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa; margin: 20px 0;">
+                                            <tr>
+                                                <td style="padding: 20px;">
+                                                    <h3 style="color: #333; margin: 0 0 15px 0; font-size: 16px; font-family: Arial, sans-serif;">Performance Summary</h3>
+                                                    
+                                                    <table width="100%" cellpadding="10" cellspacing="0" border="0">
+                                                        <tr>
+                                                            <td width="33%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #667eea; font-family: Arial, sans-serif;">{likes}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Likes</div>
+                                                            </td>
+                                                            <td width="33%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #dc3545; font-family: Arial, sans-serif;">{dislikes}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Dislikes</div>
+                                                            </td>
+                                                            <td width="34%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #28a745; font-family: Arial, sans-serif;">{week}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Reporting Period</div>
+                                                            </td>
+                                                        </tr>
+                                                    </table>
+                                                </td>
+                                            </tr>
+                                        </table>
+                                        
+                                        <!-- Detailed Report Table -->
+                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="margin: 25px 0; border: 1px solid #ddd;">
+                                            <tr style="background-color: #f8f9fa;">
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="40%">Metric</td>
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="60%">Value</td>
+                                            </tr>
+                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Tool</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-family: Arial, sans-serif;">{tool}</td>
+                                            </tr>
+                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Period</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-family: Arial, sans-serif;">{week}, {year}</td>
+                                            </tr>
+                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Likes</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; text-align: center; font-weight: bold; font-family: Arial, sans-serif; {like_color}">{likes}</td>
+                                            </tr>
+                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Dislikes</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; text-align: center; font-weight: bold; color: #dc3545; font-family: Arial, sans-serif;">{dislikes}</td>
+                                            </tr>
+                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;">Comments</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; color: #333; font-style: italic; font-family: Arial, sans-serif;">{comment}</td>
+                                            </tr>
+                                        </table>
+                                        
+                                        <p style="color: #666; line-height: 1.5; margin: 25px 0 0 0; font-family: Arial, sans-serif;">
+                                            Thank you for your continued dedication and hard work. Should you have any questions about this report or would like to discuss your performance in detail, please don't hesitate to reach out.
+                                        </p>
+                                    </td>
+                                </tr>
+                                
+                                <!-- Footer -->
+                                <tr>
+                                    <td style="background-color: #f8f9fa; padding: 20px; text-align: center; border-top: 1px solid #ddd;">
+                                        <p style="color: #6c757d; margin: 0; font-size: 14px; font-family: Arial, sans-serif;">
+                                            Best regards,<br>
+                                            <strong style="color: #495057;">knowledge-initiative@synopsys.com</strong>
+                                        </p>
+                                        <p style="color: #adb5bd; margin: 10px 0 0 0; font-size: 12px; font-family: Arial, sans-serif;">
+                                            This is an automated report. Please do not reply to this email.
+                                        </p>
+                                    </td>
+                                </tr>
+                            </table>
+                        </td>
+                    </tr>
+                </table>
+            </body>
+            </html>
+            """
+
+
+DIGEST_SUBJECT_TEMPLATE = "Demo Mail - Feedback Report - {period} ({tool_count_label})"
+
+# One table row per tool of a digest
+DIGEST_ROW_TEMPLATE = """                                            <tr>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; font-family: Arial, sans-serif; color: #333;">{tool}</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; font-family: Arial, sans-serif; color: #333;">{week}, {year}</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; font-family: Arial, sans-serif; text-align: center; font-weight: bold; {like_color}">{likes}</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; font-family: Arial, sans-serif; text-align: center; font-weight: bold; color: #dc3545;">{dislikes}</td>
+                                                <td style="padding: 12px 15px; border-bottom: 1px solid #ddd; font-family: Arial, sans-serif; color: #333; font-style: italic;">{comment}</td>
+                                            </tr>"""
+
+# HTML Body of a digest: every row of one recipient (and period) in a single report
+DIGEST_TEMPLATE = """
+            <html>
+            <body style="font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f8f9fa;">
+                <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa;">
+                    <tr>
+                        <td align="center">
+                            <table width="600" cellpadding="0" cellspacing="0" border="0" style="background-color: white; border: 1px solid #ddd;">
+                                
+                                <!-- Header -->
+                                <tr>
+                                    <td style="background-color: #667eea; padding: 30px; text-align: center;">
+                                        <h1 style="color: white; margin: 0; font-size: 24px; font-weight: bold; font-family: Arial, sans-serif;">Weekly Feedback Report</h1>
+                                        <p style="color: white; margin: 10px 0 0 0; font-size: 14px; font-family: Arial, sans-serif;">Performance Analytics Dashboard</p>
+                                    </td>
+                                </tr>
+                                
+                                <!-- Content -->
+                                <tr>
+                                    <td style="padding: 30px;">
+                                        <h2 style="color: #333; margin: 0 0 20px 0; font-size: 18px; font-family: Arial, sans-serif;">Dear {user},</h2>
+                                        
+                                        <p style="color: #666; line-height: 1.5; margin: 0 0 25px 0; font-family: Arial, sans-serif;">
+                                            We hope this message finds you well. Please find below your comprehensive feedback report for the specified period. This report contains valuable insights into your performance metrics and areas for continued excellence.
+                                        </p>
+                                        
+                                        <!-- Performance Summary -->
+                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="background-color: #f8f9fa; margin: 20px 0;">
+                                            <tr>
+                                                <td style="padding: 20px;">
+                                                    <h3 style="color: #333; margin: 0 0 15px 0; font-size: 16px; font-family: Arial, sans-serif;">Performance Summary</h3>
+                                                    
+                                                    <table width="100%" cellpadding="10" cellspacing="0" border="0">
+                                                        <tr>
+                                                            <td width="33%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #667eea; font-family: Arial, sans-serif;">{total_likes}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Total Likes</div>
+                                                            </td>
+                                                            <td width="33%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #dc3545; font-family: Arial, sans-serif;">{total_dislikes}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Total Dislikes</div>
+                                                            </td>
+                                                            <td width="34%" style="text-align: center; vertical-align: top;">
+                                                                <div style="font-size: 24px; font-weight: bold; color: #28a745; font-family: Arial, sans-serif;">{tool_count}</div>
+                                                                <div style="font-size: 12px; color: #666; font-family: Arial, sans-serif;">Tools</div>
+                                                            </td>
+                                                        </tr>
+                                                    </table>
+                                                </td>
+                                            </tr>
+                                        </table>
+                                        
+                                        <!-- Per-Tool Report Table -->
+                                        <table width="100%" cellpadding="0" cellspacing="0" border="0" style="margin: 25px 0; border: 1px solid #ddd;">
+                                            <tr style="background-color: #f8f9fa;">
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="25%">Tool</td>
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="15%">Period</td>
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif; text-align: center;" width="12%">Likes</td>
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif; text-align: center;" width="12%">Dislikes</td>
+                                                <td style="padding: 15px; border-bottom: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" width="36%">Comments</td>
+                                            </tr>
+{tool_rows}
+                                            <tr style="background-color: #f8f9fa;">
+                                                <td style="padding: 12px 15px; border-top: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;" colspan="2">Total</td>
+                                                <td style="padding: 12px 15px; border-top: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif; text-align: center;">{total_likes}</td>
+                                                <td style="padding: 12px 15px; border-top: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif; text-align: center; color: #dc3545;">{total_dislikes}</td>
+                                                <td style="padding: 12px 15px; border-top: 2px solid #ddd; color: #495057; font-weight: bold; font-family: Arial, sans-serif;"></td>
+                                            </tr>
+                                        </table>
+                                        
+                                        <p style="color: #666; line-height: 1.5; margin: 25px 0 0 0; font-family: Arial, sans-serif;">
+                                            Thank you for your continued dedication and hard work. Should you have any questions about this report or would like to discuss your performance in detail, please don't hesitate to reach out.
+                                        </p>
+                                    </td>
+                                </tr>
+                                
+                                <!-- Footer -->
+                                <tr>
+                                    <td style="background-color: #f8f9fa; padding: 20px; text-align: center; border-top: 1px solid #ddd;">
+                                        <p style="color: #6c757d; margin: 0; font-size: 14px; font-family: Arial, sans-serif;">
+                                            Best regards,<br>
+                                            <strong style="color: #495057;">knowledge-initiative@synopsys.com</strong>
+                                        </p>
+                                        <p style="color: #adb5bd; margin: 10px 0 0 0; font-size: 12px; font-family: Arial, sans-serif;">
+                                            This is an automated report. Please do not reply to this email.
+                                        </p>
+                                    </td>
+                                </tr>
+                            </table>
+                        </td>
+                    </tr>
+                </table>
+            </body>
+            </html>
+            """
+
+class ReportTemplate:
+    """
+    A template with plain {field} placeholders, compiled once into its literal chunks so that
+    `render` only joins chunks and field values (str.format would scan the whole template again
+    for every report). With `compact` the indentation at the start of each template line is
+    dropped (HTML ignores it), which almost halves the size of every report body.
+    """
+
+    def __init__(self, text, compact=False):
+        self.fields = []
+        self._pieces = []  # literal strings and field names, in template order
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if compact:
+                literal = _INDENT.sub("\n", literal)
+            if literal:
+                self._pieces.append(literal)
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise ValueError(f"Unsupported placeholder {{{field}}}: only plain {{name}} fields are allowed")
+            if field not in self.fields:
+                self.fields.append(field)
+            self._pieces.append(_Field(field))
+
+    def render(self, columns):
+        """
+        One rendered string per row of `columns` (a mapping of field name to list of strings).
+        """
+        sequences = [columns[piece] if isinstance(piece, _Field) else itertools.repeat(piece)
+                     for piece in self._pieces]
+        return list(map("".join, zip(*sequences)))
+
+
+class _Field(str):
+    """
+    A field name among the literal chunks of a compiled template.
+    """
+
+
+SUBJECT = ReportTemplate(SUBJECT_TEMPLATE)
+REPORT = ReportTemplate(REPORT_TEMPLATE, compact=True)
+DIGEST_SUBJECT = ReportTemplate(DIGEST_SUBJECT_TEMPLATE)
+DIGEST_ROW = ReportTemplate(DIGEST_ROW_TEMPLATE, compact=True)
+DIGEST = ReportTemplate(DIGEST_TEMPLATE, compact=True)
+
+
+def as_text(values):
+    """
+    str() of every value, as the per-row f-strings formatted them (missing values become "nan").
+    """
+    return list(map(str, values.to_numpy(dtype=object)))
+
+
+def clean_report_rows(df):
+    """
+    Validate and format the report columns of `df` for all rows at once.
+
+    Returns (rows, warnings, skipped): `rows` holds one text column per template field plus
+    `email`, and the Like/dislike counts as numbers, for every row that gets a report, `warnings` lists (row index, message) in row
+    order, and `skipped` counts the rows left out for an invalid email or a missing user.
+    Like/dislike values that are not numbers are reported and count as 0, missing ones count
+    as 0 silently.
+    """
+    email = pd.Series(as_text(df['userEmail']), index=df.index)
+    valid_email = email.str.match(EMAIL_PATTERN.pattern).to_numpy(dtype=bool)
+    missing_user = valid_email & df['User'].isna().to_numpy()
+    keep = valid_email & ~missing_user
+
+    likes = pd.to_numeric(df['Like'], errors="coerce").astype("float64")
+    dislikes = pd.to_numeric(df['dislike'], errors="coerce").astype("float64")
+    bad_numbers = ((likes.isna() & df['Like'].notna()) | (dislikes.isna() & df['dislike'].notna())).to_numpy()
+    # Missing counts and both counts of a row with an invalid one are replaced by the integer 0
+    likes_zero = bad_numbers | likes.isna().to_numpy()
+    dislikes_zero = bad_numbers | dislikes.isna().to_numpy()
+    likes_value = np.where(likes_zero, 0.0, likes.to_numpy())
+    dislikes_value = np.where(dislikes_zero, 0.0, dislikes.to_numpy())
+
+    users = pd.Series(as_text(df['User']), index=df.index)
+    messages = pd.Series(pd.NA, index=df.index, dtype=object)
+    invalid = ~valid_email
+    messages[invalid] = "Warning: Invalid email address for " + users[invalid] + ": " + email[invalid]
+    messages[missing_user] = [f"Warning: Missing user name or email for row {index + 1}" for index in df.index[missing_user]]
+    flagged = keep & bad_numbers
+    messages[flagged] = "Warning: Invalid numeric values for " + users[flagged]
+    warnings = list(messages.dropna().items())
+
+    kept = df[keep]
+    likes_zero, dislikes_zero = likes_zero[keep], dislikes_zero[keep]
+    likes_value, dislikes_value = likes_value[keep], dislikes_value[keep]
+    rows = pd.DataFrame({
+        "email": email[keep],
+        "user": users[keep],
+        "likes": np.where(likes_zero, "0", as_text(likes[keep])),
+        "dislikes": np.where(dislikes_zero, "0", as_text(dislikes[keep])),
+        "like_color": like_colors(likes_value),
+        "comment": as_text(kept['comment']),
+        "week": as_text(kept['week']),
+        "year": np.where(kept['year'].isna(), "N/A", as_text(kept['year'])),
+        "tool": as_text(kept['tools']),
+        "likes_value": likes_value,
+        "dislikes_value": dislikes_value,
+    }, index=kept.index)
+    return rows, warnings, int(invalid.sum() + missing_user.sum())
+
+
+def render_reports(rows, batch_size=RENDER_BATCH_SIZE):
+    """
+    Yield (emails, subjects, html bodies) lists for each batch of `batch_size` cleaned rows.
+    """
+    for start in range(0, len(rows), batch_size):
+        batch = rows.iloc[start:start + batch_size]
+        columns = {name: batch[name].tolist() for name in batch.columns}
+        yield columns["email"], SUBJECT.render(columns), REPORT.render(columns)
+
+
+def like_colors(likes):
+    """
+    Like cell style of every count in `likes`.
+    """
+    return np.select([likes < LIKE_THRESHOLD, likes > LIKE_THRESHOLD], [LIKE_LOW_COLOR, LIKE_HIGH_COLOR], "")
+
+
+def render_digests(rows, by_period=False, batch_size=RENDER_BATCH_SIZE):
+    """
+    Yield (emails, subjects, html bodies) lists of digests, `batch_size` digests at a time: one
+    report per recipient (per recipient and week/year with `by_period`) holding a table of all
+    their tools with Like/dislike totals. Digests come in order of their recipient's first row.
+    """
+    if len(rows) == 0:
+        # No valid rows, no digests (np.r_[True, ...] below would still mark a first group)
+        return
+    keys = ["email", "week", "year"] if by_period else ["email"]
+    group = rows.groupby(keys, sort=False).ngroup().to_numpy()
+    order = np.argsort(group, kind="stable")
+    rows, group = rows.iloc[order], group[order]
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    ends = np.r_[starts[1:], len(rows)]
+
+    for first in range(0, len(starts), batch_size):
+        lo, hi = starts[first], ends[min(first + batch_size, len(starts)) - 1]
+        batch = rows.iloc[lo:hi]
+        bounds = zip(starts[first:first + batch_size] - lo, ends[first:first + batch_size] - lo)
+        columns = {name: batch[name].tolist() for name in batch.columns}
+        fragments = DIGEST_ROW.render(columns)
+        periods = [f"{week}, {year}" for week, year in zip(columns["week"], columns["year"])]
+
+        digest = {"email": [], "user": [], "tool_rows": [], "period": [], "tool_count": []}
+        for start, end in bounds:
+            digest["email"].append(columns["email"][start])
+            digest["user"].append(columns["user"][start])
+            digest["tool_rows"].append("".join(fragments[start:end]))
+            period = set(periods[start:end])
+            digest["period"].append(period.pop() if len(period) == 1 else "multiple periods")
+            digest["tool_count"].append(len(set(columns["tool"][start:end])))
+
+        codes = np.repeat(np.arange(len(digest["email"])), ends[first:first + batch_size] - starts[first:first + batch_size])
+        digest["total_likes"] = as_text(pd.Series(np.bincount(codes, weights=columns["likes_value"])))
+        digest["total_dislikes"] = as_text(pd.Series(np.bincount(codes, weights=columns["dislikes_value"])))
+        digest["tool_count_label"] = [f"{n} tool" if n == 1 else f"{n} tools" for n in digest["tool_count"]]
+        digest["tool_count"] = list(map(str, digest["tool_count"]))
+        yield digest["email"], DIGEST_SUBJECT.render(digest), DIGEST.render(digest)
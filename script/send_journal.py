@@ -0,0 +1,167 @@
+"""
+Send journal for the report scripts: a local SQLite file that records every report of a run,
+so a run that crashed or hung halfway can be started again and only sends what is missing.
+
+Each report is keyed by a hash of its recipient, subject (week, year and tool) and body, and
+moves through the states rendered -> queued -> sent or failed, with a timestamp for each
+(or displayed: opened as an Outlook draft for review, which is not a send). A rerun skips
+reports already sent and sends everything else again, so a report that was being
+sent when the run died may go out twice (at least once, never lost).
+
+State changes are buffered and written in batches, one transaction each, so the journal keeps
+up with thousands of messages per minute.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+
+STATES = ("rendered", "queued", "displayed", "sent", "failed")
+
+# Buffered state changes are written once this many are pending or FLUSH_SECONDS have passed
+FLUSH_ROWS = 500
+FLUSH_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    key TEXT PRIMARY KEY,
+    recipient TEXT,
+    subject TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    rendered_at REAL,
+    queued_at REAL,
+    sent_at REAL,
+    failed_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sends_state ON sends (state);
+"""
+
+
+def report_key(recipient, subject, body):
+    """
+    Stable key of one report: the same recipient, subject and content always give the same key.
+    """
+    digest = hashlib.sha256()
+    for part in (recipient, subject, body):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SendJournal:
+    """
+    SQLite journal of report sends at `path`. `mark` buffers state changes from any thread;
+    they reach the file in batches of `flush_rows` (or after `flush_seconds`) and on `close`.
+    """
+
+    def __init__(self, path, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def sent_keys(self, keys):
+        """
+        The keys among `keys` already recorded as sent.
+        """
+        self.flush()
+        keys, sent = list(keys), set()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                # Look up by key only: with the state in the WHERE clause SQLite scans the state index
+                rows = self._db.execute(f"SELECT key, state FROM sends WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                sent.update(key for key, state in rows if state == "sent")
+        return sent
+
+    def mark(self, key, state, recipient=None, subject=None, error=None):
+        """
+        Record that report `key` reached `state` (one of STATES) now.
+        """
+        if state not in STATES:
+            raise ValueError(f"Unknown send state {state!r}, expected one of {STATES}")
+        with self._lock:
+            self._pending.append((key, recipient, subject, state, error, time.time()))
+            due = len(self._pending) >= self.flush_rows or \
+                time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def mark_many(self, entries, state):
+        """
+        Record `state` for every (key, recipient, subject) of `entries` in one batch.
+        """
+        now = time.time()
+        with self._lock:
+            self._pending.extend((key, recipient, subject, state, None, now) for key, recipient, subject in entries)
+        self.flush()
+
+    def flush(self):
+        """
+        Write all buffered state changes in one transaction.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(
+                    # A sent report stays sent; `attempts` counts the times it was queued
+                    """
+                    INSERT INTO sends (key, recipient, subject, state, error, attempts,
+                                       rendered_at, queued_at, sent_at, failed_at, updated_at)
+                    VALUES (:key, :recipient, :subject, :state, :error, :state = 'queued',
+                            CASE :state WHEN 'rendered' THEN :at END, CASE :state WHEN 'queued' THEN :at END,
+                            CASE :state WHEN 'sent' THEN :at END, CASE :state WHEN 'failed' THEN :at END, :at)
+                    ON CONFLICT (key) DO UPDATE SET
+                        recipient = coalesce(excluded.recipient, recipient),
+                        subject = coalesce(excluded.subject, subject),
+                        state = CASE WHEN state = 'sent' THEN state ELSE excluded.state END,
+                        error = CASE WHEN state = 'sent' THEN error ELSE excluded.error END,
+                        attempts = attempts + excluded.attempts,
+                        rendered_at = coalesce(excluded.rendered_at, rendered_at),
+                        queued_at = coalesce(excluded.queued_at, queued_at),
+                        sent_at = coalesce(sent_at, excluded.sent_at),
+                        failed_at = coalesce(excluded.failed_at, failed_at),
+                        updated_at = excluded.updated_at
+                    """,
+                    [dict(key=key, recipient=recipient, subject=subject, state=state, error=error, at=at)
+                     for key, recipient, subject, state, error, at in pending])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                # Keep the changes for the next flush
+                self._pending = pending + self._pending
+                raise
+
+    def counts(self):
+        """
+        Number of reports in each state.
+        """
+        self.flush()
+        with self._lock:
+            return dict(self._db.execute("SELECT state, count(*) FROM sends GROUP BY state"))
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
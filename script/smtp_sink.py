@@ -0,0 +1,125 @@
+"""
+Local SMTP stand-in: accepts every message and throws it away (or saves it as .eml files),
+for trying out the SMTP transport without a real mail server.
+
+Usage:
+    python smtp_sink.py                         # listen on localhost:1025
+    python smtp_sink.py --port 2525 --save sink_mail --latency 0.05
+
+and run the report script with --transport smtp --smtp-host localhost --smtp-port 1025.
+"""
+import argparse
+import base64
+import os
+import socketserver
+import threading
+import time
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT). Counts messages in
+    `received`; with `save_dir` each message is written there, and `latency` seconds are waited
+    before accepting each message to mimic a remote server. With `credentials` (user, password)
+    AUTH PLAIN is offered and every login attempt is counted in `logins`.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="localhost", port=1025, save_dir=None, latency=0.0, credentials=None):
+        super().__init__((host, port), _SmtpHandler)
+        self.save_dir = save_dir
+        self.latency = latency
+        self.credentials = credentials
+        self.received = 0
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    def start(self):
+        """
+        Serve on a background thread; returns the (host, port) actually bound.
+        """
+        threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True).start()
+        return self.server_address
+
+    def store(self, data):
+        with self._lock:
+            self.received += 1
+            number = self.received
+        if self.latency:
+            time.sleep(self.latency)
+        if self.save_dir:
+            with open(os.path.join(self.save_dir, f"{number:06d}.eml"), "wb") as fh:
+                fh.write(data)
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        with self.server._lock:
+            self.server.connections += 1
+        self.reply("220 smtp-sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-smtp-sink")
+                if self.server.credentials:
+                    self.reply("250-AUTH PLAIN")
+                self.reply("250 8BITMIME")
+            elif verb == "AUTH" and self.server.credentials:
+                with self.server._lock:
+                    self.server.logins += 1
+                try:
+                    _, user, password = base64.b64decode(command.split()[2]).decode("utf-8").split("\0")
+                    accepted = (user, password) == tuple(self.server.credentials)
+                except (IndexError, ValueError):
+                    accepted = False
+                self.reply("235 Authentication successful" if accepted else "535 Authentication failed")
+            elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                self.server.store(b"".join(lines))
+                self.reply("250 OK queued")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--save", help="directory to save received messages in")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before accepting each message")
+    args = parser.parse_args()
+
+    sink = SmtpSink(args.host, args.port, args.save, args.latency)
+    print(f"SMTP sink listening on {args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Received {sink.received} messages over {sink.connections} connections")
+
+
+if __name__ == "__main__":
+    main()
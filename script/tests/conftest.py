@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The script modules are imported by name, as email_script1.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
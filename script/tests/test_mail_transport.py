@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from mail_transport import SmtpTransport, SpoolTransport, build_message
+from smtp_sink import SmtpSink
+
+
+def messages(n):
+    return [build_message("sender@example.com", f"user{i}@example.com", "Report", "<p>hi</p>") for i in range(n)]
+
+
+@pytest.fixture
+def sink():
+    server = SmtpSink("localhost", 0, credentials=("report", "secret"))
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_spool_reruns_do_not_overwrite(tmp_path):
+    for _ in range(2):
+        with SpoolTransport(str(tmp_path)) as transport:
+            transport.send_many(messages(3))
+    names = os.listdir(tmp_path)
+    assert len(names) == 6
+    assert all(name.endswith(".eml") for name in names)
+
+
+def test_spool_refuses_to_replace_a_file(tmp_path):
+    transport = SpoolTransport(str(tmp_path))
+    transport.send(messages(1)[0])
+    transport._counter = 0  # same name again
+    with pytest.raises(FileExistsError):
+        transport.send(messages(1)[0])
+    assert os.listdir(tmp_path) == [name for name in os.listdir(tmp_path) if name.endswith(".eml")]
+
+
+def test_smtp_login_and_send(sink):
+    host, port = sink.server_address
+    with SmtpTransport(host, port, username="report", password="secret", workers=2) as transport:
+        results = transport.send_many(messages(5))
+    assert all(result.ok for result in results)
+    assert sink.received == 5
+    assert 1 <= sink.logins <= 2  # one login per pooled connection
+
+
+def test_smtp_auth_failure_stops_the_pool(sink):
+    host, port = sink.server_address
+    with SmtpTransport(host, port, username="report", password="wrong", workers=1, backoff=0) as transport:
+        results = transport.send_many(messages(20))
+    assert not any(result.ok for result in results)
+    assert sink.logins == 1
+    assert sink.received == 0
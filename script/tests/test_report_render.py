@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from report_render import REQUIRED_COLUMNS, clean_report_rows, render_digests, render_reports
+
+
+def make_sheet(emails):
+    return pd.DataFrame({
+        "User": [f"User {i}" for i in range(len(emails))],
+        "userEmail": emails,
+        "Like": [1] * len(emails),
+        "dislike": [0] * len(emails),
+        "comment": ["ok"] * len(emails),
+        "week": [12] * len(emails),
+        "year": [2025] * len(emails),
+        "tools": [f"Tool {i}" for i in range(len(emails))],
+    })
+
+
+@pytest.mark.parametrize("by_period", [False, True])
+@pytest.mark.parametrize("sheet", [make_sheet(["not-an-email", "also bad"]), pd.DataFrame(columns=REQUIRED_COLUMNS)],
+                         ids=["all-invalid-emails", "no-rows"])
+def test_no_valid_rows_give_no_digests(sheet, by_period):
+    rows, _, _ = clean_report_rows(sheet)
+    assert len(rows) == 0
+    assert list(render_digests(rows, by_period=by_period)) == []
+
+
+def test_digests_group_rows_by_recipient():
+    rows, _, skipped = clean_report_rows(make_sheet(["a@example.com", "b@example.com", "a@example.com", "bad"]))
+    assert skipped == 1
+    (emails, subjects, bodies), = render_digests(rows)
+    assert emails == ["a@example.com", "b@example.com"]
+    assert "(2 tools)" in subjects[0] and "(1 tool)" in subjects[1]
+    assert len(bodies) == 2
+
+
+def test_reports_one_per_valid_row():
+    rows, _, _ = clean_report_rows(make_sheet(["a@example.com", "bad", "b@example.com"]))
+    emails = [email for batch_emails, _, _ in render_reports(rows) for email in batch_emails]
+    assert emails == ["a@example.com", "b@example.com"]
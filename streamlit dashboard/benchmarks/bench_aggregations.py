@@ -0,0 +1,120 @@
+"""
+Micro-benchmark: legacy per-rerun aggregations of main.py vs utils/aggregations.py.
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/bench_aggregations.py                 # 100k, 1M and 5M rows
+    python benchmarks/bench_aggregations.py --sizes 100000  # custom sizes
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aggregations import add_feedback_flags, headline_metrics, summarize_tools, summarize_weeks
+
+
+def make_rows(n, seed=0):
+    """
+    Random KA-like rows: a few dozen tools, thousands of users, two years of weeks.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D")
+    df = pd.DataFrame({
+        "Date": dates,
+        "Username": pd.Categorical(rng.integers(0, 5000, n).astype(str)),
+        "tool": pd.Categorical(rng.integers(0, 40, n).astype(str)),
+        "metadata.feedback_rating": pd.Categorical(
+            rng.choice(["like", "dislike", "comment", "none", "nan"], n, p=[0.2, 0.05, 0.05, 0.6, 0.1])
+        ),
+    })
+    df["year_week_label"] = pd.Categorical(df["Date"].dt.strftime("%Y-W%U"))
+    return df
+
+
+def legacy(df):
+    """
+    The aggregation code main.py ran on every rerun before utils/aggregations.py.
+    """
+    filtered_df = df.copy()
+    filtered_df["feedback"] = filtered_df["metadata.feedback_rating"].astype(str).str.lower()
+
+    unique_users = filtered_df["Username"].nunique()
+    total_queries = len(filtered_df)
+    feedback = filtered_df["feedback"].dropna()
+    feedback_given = feedback.isin(["like", "dislike", "comment"]).sum()
+    feedback_total = feedback.isin(["like", "dislike", "comment", "none"]).sum()
+    feedback_pct = (feedback_given / feedback_total * 100) if feedback_total > 0 else 0
+
+    tool_summary = filtered_df.groupby("tool", observed=True).agg(
+        total_queries=("Username", "count"),
+        unique_users=("Username", "nunique"),
+        feedback_given=("feedback", lambda x: x.isin(["like", "dislike", "comment"]).sum()),
+        feedback_total=("feedback", lambda x: x.isin(["like", "dislike", "comment", "none"]).sum())
+    ).reset_index()
+    tool_summary["feedback_pct"] = tool_summary.apply(
+        lambda row: (row["feedback_given"] / row["feedback_total"] * 100) if row["feedback_total"] > 0 else 0, axis=1
+    )
+    tool_summary = tool_summary.sort_values("feedback_pct", ascending=False)
+
+    weekly_df = filtered_df.copy()
+    weekly_summary = weekly_df.groupby("year_week_label", observed=True).agg(
+        total_queries=("Username", "count"),
+        feedback_given=("feedback", lambda x: x.isin(["like", "dislike", "comment"]).sum()),
+        feedback_total=("feedback", lambda x: x.isin(["like", "dislike", "comment", "none"]).sum())
+    ).reset_index()
+    weekly_summary["feedback_pct"] = weekly_summary.apply(
+        lambda row: (row["feedback_given"] / row["feedback_total"] * 100) if row["feedback_total"] > 0 else 0, axis=1
+    )
+    return (unique_users, total_queries, feedback_given, feedback_pct), tool_summary, weekly_summary
+
+
+def vectorized(df):
+    """
+    The same outputs through utils/aggregations.py (flags already precomputed at load time).
+    """
+    metrics = headline_metrics(df)
+    headline = (metrics["unique_users"], metrics["total_queries"], metrics["feedback_given"], metrics["feedback_pct"])
+    return headline, summarize_tools(df), summarize_weeks(df)
+
+
+def best_of(func, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def check_same(old, new):
+    assert old[0][:3] == new[0][:3] and abs(old[0][3] - new[0][3]) < 1e-9, (old[0], new[0])
+    for old_summary, new_summary, key in ((old[1], new[1], "tool"), (old[2], new[2], "year_week_label")):
+        columns = [key, "total_queries", "feedback_given", "feedback_total", "feedback_pct"]
+        a = old_summary[columns].sort_values(key).reset_index(drop=True)
+        b = new_summary[columns].sort_values(key).reset_index(drop=True)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy s':>10} {'flags s':>10} {'vector s':>10} {'speedup':>8}")
+    for n in args.sizes:
+        df = make_rows(n)
+        legacy_time, legacy_result = best_of(legacy, df, args.repeat)
+        flags_time, flagged = best_of(add_feedback_flags, df, 1)
+        vector_time, vector_result = best_of(vectorized, flagged, args.repeat)
+        check_same(legacy_result, vector_result)
+        print(f"{n:>10,} {legacy_time:>10.3f} {flags_time:>10.3f} {vector_time:>10.3f} {legacy_time / vector_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Chart payload benchmark: figure JSON bytes of the dashboard charts, uncapped (as before
+utils/charts.py capped categories) vs capped, for growing numbers of weeks and tools, and the
+time from filter state to the spec st.plotly_chart sends: rebuilding the figure, a cache hit
+that stores JSON and parses it back with pio.from_json, and a cache hit on the built figure
+(what the dashboard does).
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/bench_charts.py
+    python benchmarks/bench_charts.py --weeks 52 520 --tools 10 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+import plotly.tools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.charts as charts
+from utils.aggregations import feedback_pct, rank_tools
+from utils.result_cache import ResultCache
+
+
+def make_summary(key, labels, seed=0):
+    """
+    A per-`key` summary like the query engines return, with random counts.
+    """
+    rng = np.random.default_rng(seed)
+    total = rng.integers(100, 5000, len(labels))
+    given = (total * rng.uniform(0.2, 0.5, len(labels))).astype("int64")
+    summary = pd.DataFrame({key: labels, "total_queries": total, "feedback_given": given, "feedback_total": total})
+    summary["feedback_pct"] = feedback_pct(summary["feedback_given"], summary["feedback_total"])
+    return summary
+
+
+def week_labels(n):
+    days = pd.date_range(end="2025-08-31", periods=n, freq="7D")
+    return list(days.strftime("%Y-W%U"))
+
+
+def plotly_chart_spec(figure_or_data):
+    # What st.plotly_chart does with its input before sending it
+    figure = plotly.tools.return_figure_from_figure_or_data(figure_or_data, validate_figure=True)
+    return pio.to_json(figure, validate=False)
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def run(name, build, summary, repeat):
+    caps = charts.MAX_WEEK_CATEGORIES, charts.MAX_TOOL_CATEGORIES, charts.WEBGL_MIN_POINTS
+    charts.MAX_WEEK_CATEGORIES = charts.MAX_TOOL_CATEGORIES = 0
+    charts.WEBGL_MIN_POINTS = sys.maxsize
+    try:
+        before, _ = timed(lambda: plotly_chart_spec(build(summary)), 1)
+    finally:
+        charts.MAX_WEEK_CATEGORIES, charts.MAX_TOOL_CATEGORIES, charts.WEBGL_MIN_POINTS = caps
+
+    after, rebuild_ms = timed(lambda: plotly_chart_spec(build(summary)), repeat)
+    json_cache = {name: build(summary).to_json()}
+    _, json_hit_ms = timed(lambda: plotly_chart_spec(pio.from_json(json_cache[name])), repeat)
+    cache = ResultCache(64 * 1024 * 1024)
+    charts.cached_figure(cache, name, summary, build)
+    _, hit_ms = timed(lambda: plotly_chart_spec(charts.cached_figure(cache, name, summary, build)[0]), repeat)
+    print(f"{name:<8} {len(summary):>6,} {len(before):>12,} {len(after):>12,} "
+          f"{rebuild_ms:>10.1f} {json_hit_ms:>10.1f} {hit_ms:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weeks", type=int, nargs="+", default=[52, 156, 520, 2600])
+    parser.add_argument("--tools", type=int, nargs="+", default=[10, 40, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'chart':<8} {'x':>6} {'bytes before':>12} {'bytes after':>12} "
+          f"{'ms rebuild':>10} {'ms JSON hit':>10} {'ms hit':>10}")
+    for n in args.weeks:
+        run("weekly", charts.build_weekly_figure, make_summary("year_week_label", week_labels(n)), args.repeat)
+    for n in args.tools:
+        tools = rank_tools(make_summary("tool", [f"Tool {i}" for i in range(n)], seed=1))
+        run("tools", charts.build_tool_figure, tools, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Parity check and benchmark of the two query engines of utils/backends.py (pandas rollup cube vs DuckDB).
+
+Both engines answer the same filter states; the script fails if any metric, summary or
+feedback count differs, then prints the build time and the mean time per filter state.
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/bench_engines.py                   # 100k and 1M rows
+    python benchmarks/bench_engines.py --sizes 5000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_aggregations import make_rows
+from utils.backends import DuckDBEngine, PandasEngine
+from utils.filter_index import FilterIndex, calendar_day_ranges, rollup_dimensions
+from utils.rollup import build_rollup
+
+
+def filter_states(df):
+    """
+    A spread of dashboard filter states: defaults, narrow and wide selections, every date filter
+    (including a custom range whose bounds have a time of day) and one that matches nothing.
+    """
+    tools = sorted(df["tool"].dropna().unique())
+    users = sorted(df["Username"].dropna().unique())
+    weeks = sorted(df["year_week_label"].dropna().unique())
+    first, last = df["Date"].min(), df["Date"].max()
+    return [
+        ({"tool": tools, "Username": users}, {}),
+        ({"tool": tools, "Username": users, "year_week_label": weeks[-10:]}, {}),
+        ({"tool": tools[:3], "Username": users[:25]}, {}),
+        ({"tool": tools, "Username": users, "iso_year": [int(first.year)], "month": [1, 2, 12]}, {}),
+        ({"tool": tools[5:], "Username": users}, {"day": (first + pd.Timedelta(days=30), last - pd.Timedelta(days=30))}),
+        ({"tool": tools, "Username": users}, {"day": (first + pd.Timedelta(days=30, hours=13, minutes=45),
+                                                      last - pd.Timedelta(days=30, hours=-6))}),
+        ({"tool": tools, "Username": ["no-such-user"]}, {}),
+    ]
+
+
+def check_same(expected, actual):
+    for key in ("unique_users", "total_queries", "feedback_given", "feedback_total", "min_date", "max_date"):
+        same = (pd.isna(expected["metrics"][key]) and pd.isna(actual["metrics"][key])) or expected["metrics"][key] == actual["metrics"][key]
+        assert same, (key, expected["metrics"][key], actual["metrics"][key])
+    assert abs(expected["metrics"]["feedback_pct"] - actual["metrics"]["feedback_pct"]) < 1e-9
+    for key in ("tool_summary", "weekly_summary", "ka_feedback"):
+        a = expected[key].reset_index(drop=True)
+        b = actual[key].reset_index(drop=True)
+        pd.testing.assert_frame_equal(a, b, check_dtype=False, check_categorical=False)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'engine':>8} {'build s':>10} {'query ms':>10}")
+    for n in args.sizes:
+        df = make_rows(n)
+        # Bounds are normalized before the engines see them, as in main.py
+        states = [(selections, calendar_day_ranges(ranges)) for selections, ranges in filter_states(df)]
+
+        def build_pandas():
+            rollup = build_rollup(df)
+            return PandasEngine(rollup, FilterIndex(rollup_dimensions(rollup)))
+
+        engines = [
+            timed(build_pandas),
+            timed(lambda: DuckDBEngine([pa.Table.from_pandas(df, preserve_index=False)])),
+        ]
+        results = {}
+        for build_time, engine in engines:
+            query_time = 0.0
+            for i, (selections, ranges) in enumerate(states):
+                elapsed, results[engine.name, i] = timed(engine.summaries, selections, ranges)
+                query_time += elapsed
+            print(f"{n:>10,} {engine.name:>8} {build_time:>10.3f} {query_time / len(states) * 1000:>10.1f}")
+        for i in range(len(states)):
+            check_same(results["pandas", i], results["duckdb", i])
+    print("pandas and duckdb results are identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Headless benchmark of the dashboard pipeline, stage by stage, with regression thresholds.
+
+For every size a synthetic KA dataset is generated (see benchmarks/synthetic.py, cached in
+.cache/bench/) and each stage is timed with its peak memory:
+
+    excel_load      stream + type the xlsx workbook (utils/ingest.py)
+    parquet_load    read the same rows from Parquet
+    schema_typing   clean, validate and type raw rows (utils/schema.py)
+    snapshot_write  write the Feather snapshot
+    snapshot_load   read it back into pandas
+    rollup_build    week × tool × user cube (utils/rollup.py)
+    filter_index    filter indexes of the cube and of the raw rows
+    queries         metrics and summaries for a spread of filter states (utils/backends.py)
+    charts          Plotly figures of those states, serialized to JSON
+    csv_export      CSV download of the default filter (utils/export.py)
+
+Results are compared with a stored baseline; the script exits with status 1 when a stage
+is slower or uses more memory than the baseline plus the tolerance, and with status 2 when
+the baseline has no numbers for a benchmarked size (record them with --save-baseline first).
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/bench_pipeline.py                        # 10k, 100k and 1M rows
+    python benchmarks/bench_pipeline.py --sizes 10000000 --excel-max-rows 0
+    python benchmarks/bench_pipeline.py --save-baseline        # record the current numbers
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_engines import filter_states
+from synthetic import ensure_dataset
+from utils import snapshot
+from utils.backends import DuckDBEngine, PandasEngine
+from utils.charts import build_feedback_figure, build_tool_figure, build_weekly_figure
+from utils.export import export_rows
+from utils.filter_index import FilterIndex, rollup_dimensions, row_dimensions
+from utils.ingest import list_sheets, prepare_ka_frame, read_ka_excel
+from utils.memory import PeakMemory
+from utils.readers import concat_frames
+from utils.rollup import build_rollup
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Differences below these are noise, whatever the relative tolerance says
+MIN_SLACK_SECONDS = 0.05
+MIN_SLACK_MB = 16.0
+
+
+class StageTimer:
+    """
+    Runs pipeline stages and records the wall time and peak memory of each.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    def run(self, stage, func, *args):
+        gc.collect()
+        with PeakMemory() as peak:
+            start = time.perf_counter()
+            result = func(*args)
+            seconds = time.perf_counter() - start
+        self.results[stage] = {"seconds": round(seconds, 4), "peak_mb": round(peak.delta_mb, 1) if peak.available else None}
+        return result
+
+
+def load_excel(path, engine):
+    return concat_frames([read_ka_excel(path, sheet, engine=engine)[0] for sheet in list_sheets(path)])
+
+
+def run_queries(engine, states):
+    return [engine.summaries(selections, ranges) for selections, ranges in states]
+
+
+def build_charts(summaries):
+    return [
+        (build_tool_figure(s["tool_summary"]).to_json(),
+         build_weekly_figure(s["weekly_summary"]).to_json(),
+         build_feedback_figure(s["ka_feedback"], "All Users Feedback Distribution").to_json())
+        for s in summaries
+    ]
+
+
+def bench_size(n, args):
+    paths = ensure_dataset(n, formats=("xlsx", "parquet") if n <= args.excel_max_rows else ("parquet",))
+    timer = StageTimer()
+
+    if "xlsx" in paths:
+        timer.run("excel_load", load_excel, paths["xlsx"], args.excel_engine)
+
+    raw = timer.run("parquet_load", pd.read_parquet, paths["parquet"])
+    df = timer.run("schema_typing", prepare_ka_frame, raw)
+    del raw
+
+    snapshot_dir = tempfile.mkdtemp(prefix="ka-bench-")
+    snapshot.SNAPSHOT_DIR = snapshot_dir
+    try:
+        timer.run("snapshot_write", snapshot.write_snapshot, df, paths["parquet"], "bench")
+        df = timer.run("snapshot_load", snapshot.load_snapshot, paths["parquet"], "bench")
+
+        rollup = timer.run("rollup_build", build_rollup, df)
+        rollup_index, row_index = timer.run(
+            "filter_index", lambda: (FilterIndex(rollup_dimensions(rollup)), FilterIndex(row_dimensions(df)))
+        )
+
+        states = filter_states(df)
+        if args.engine == "duckdb":
+            import pyarrow as pa
+            engine = DuckDBEngine([pa.Table.from_pandas(df, preserve_index=False)])
+        else:
+            engine = PandasEngine(rollup, rollup_index)
+        summaries = timer.run("queries", run_queries, engine, states)
+        timer.run("charts", build_charts, summaries)
+
+        # Default dashboard view: every tool and user, last 10 weeks
+        row_ids = np.flatnonzero(row_index.mask(states[1][0], states[1][1]))
+        timer.run("csv_export", export_rows, df, row_ids, "CSV")
+    finally:
+        del df
+        gc.collect()
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+    return timer.results
+
+
+def regressions(results, baseline, time_tolerance, memory_tolerance):
+    """
+    List of (rows, stage, metric, baseline, current) for every metric beyond its threshold.
+    """
+    found = []
+    for rows, stages in results.items():
+        for stage, current in stages.items():
+            base = baseline.get(rows, {}).get(stage)
+            if base is None:
+                continue
+            if current["seconds"] > base["seconds"] * (1 + time_tolerance) + MIN_SLACK_SECONDS:
+                found.append((rows, stage, "seconds", base["seconds"], current["seconds"]))
+            if None not in (current["peak_mb"], base.get("peak_mb")) and \
+                    current["peak_mb"] > base["peak_mb"] * (1 + memory_tolerance) + MIN_SLACK_MB:
+                found.append((rows, stage, "peak_mb", base["peak_mb"], current["peak_mb"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--excel-max-rows", type=int, default=1_000_000,
+                        help="largest size that also gets an xlsx workbook and an excel_load stage")
+    parser.add_argument("--excel-engine", default="auto", choices=["auto", "calamine", "openpyxl"])
+    parser.add_argument("--engine", default="pandas", choices=["pandas", "duckdb"], help="query engine")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative slowdown per stage")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed relative peak memory growth")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'rows':>12} {'stage':<16} {'seconds':>10} {'peak MB':>10}")
+    for n in args.sizes:
+        results[str(n)] = bench_size(n, args)
+        for stage, r in results[str(n)].items():
+            peak = "n/a" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+            print(f"{n:>12,} {stage:<16} {r['seconds']:>10.3f} {peak:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh).get("results", {})
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "results": baseline}, fh, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    missing = [rows for rows in results if rows not in baseline]
+    if missing:
+        print(f"No baseline for {', '.join(f'{int(r):,}' for r in missing)} rows in {args.baseline}; "
+              "run with --save-baseline to record one.")
+        sys.exit(2)
+    found = regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for rows, stage, metric, before, now in found:
+        print(f"REGRESSION {int(rows):,} rows {stage} {metric}: {before} -> {now}")
+    if found:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
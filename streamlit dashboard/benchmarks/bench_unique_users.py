@@ -0,0 +1,71 @@
+"""
+Exact vs approximate (HyperLogLog, utils/sketches.py) unique-user counts of the pandas engine.
+
+For a spread of filter states the script prints the time of both modes and the relative error
+of the approximate headline count and of the worst per-tool count, and fails if any estimate is
+further off than 4 standard errors (plus 2 users, for tiny counts).
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/bench_unique_users.py                  # 100k and 1M rows
+    python benchmarks/bench_unique_users.py --sizes 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_engines import filter_states
+from synthetic import make_ka_rows
+from utils.backends import PandasEngine
+from utils.filter_index import FilterIndex, rollup_dimensions
+from utils.ingest import prepare_ka_frame
+from utils.rollup import build_rollup
+from utils.sketches import hll_error
+
+
+def relative_errors(exact, approx):
+    tools = exact["tool_summary"].set_index("tool")["unique_users"]
+    estimated = approx["tool_summary"].set_index("tool")["unique_users"].reindex(tools.index)
+    allowed = 4 * hll_error() * tools + 2
+    headline = exact["metrics"]["unique_users"], approx["metrics"]["unique_users"]
+    ok = bool((abs(estimated - tools) <= allowed).all()) and \
+        abs(headline[1] - headline[0]) <= 4 * hll_error() * headline[0] + 2
+    worst = float((abs(estimated - tools) / tools.clip(lower=1)).max()) if len(tools) else 0.0
+    return (headline[1] - headline[0]) / max(headline[0], 1), worst, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"standard error {hll_error():.2%}")
+    print(f"{'rows':>10} {'state':>5} {'exact ms':>10} {'approx ms':>10} {'users err':>10} {'worst tool':>10}")
+    failed = False
+    for n in args.sizes:
+        df = prepare_ka_frame(make_ka_rows(n))
+        rollup = build_rollup(df)
+        named = set(df.loc[df["Full Name"].notna(), "Username"].dropna())
+        engine = PandasEngine(rollup, FilterIndex(rollup_dimensions(rollup)), user_groups=[named])
+        start = time.perf_counter()
+        engine.user_sketches()
+        print(f"{n:>10,} {'build':>5} {'':>10} {(time.perf_counter() - start) * 1000:>10.1f}")
+        for i, (selections, ranges) in enumerate(filter_states(df)):
+            timings, results = [], []
+            for approx in (False, True):
+                start = time.perf_counter()
+                results.append(engine.summaries(selections, ranges, approx_users=approx))
+                timings.append((time.perf_counter() - start) * 1000)
+            exact_result, approx_result = results
+            users_err, worst, ok = relative_errors(exact_result, approx_result)
+            failed |= not ok
+            print(f"{n:>10,} {i:>5} {timings[0]:>10.1f} {timings[1]:>10.1f} {users_err:>+10.2%} {worst:>10.2%}"
+                  + ("" if ok else "  OUT OF BOUNDS"))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
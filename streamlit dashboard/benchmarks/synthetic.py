@@ -0,0 +1,147 @@
+"""
+Generator of realistic synthetic KA data for the benchmarks.
+
+Users and tools follow Zipf distributions (a few heavy users and popular tools, a long tail),
+dates span several years with weekday seasonality and growth, and feedback_rating has the
+usual mix of none / like / dislike / comment, missing values and inconsistent casing.
+
+Usage (from the "streamlit dashboard" folder):
+    python benchmarks/synthetic.py 100000                      # .cache/bench/ka_100000.{xlsx,parquet}
+    python benchmarks/synthetic.py 1000000 --formats parquet
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+BENCH_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "bench")
+
+# Excel's sheet limit is 1,048,576 rows including the header; larger datasets span several sheets
+EXCEL_MAX_ROWS_PER_SHEET = 1_048_575
+
+TOOLS = [
+    "VCS", "Verdi", "PrimeTime", "Fusion Compiler", "IC Compiler II", "Design Compiler", "VC Formal",
+    "SpyGlass", "IC Validator", "StarRC", "HSPICE", "PrimeSim", "Custom Compiler", "DSO.ai", "ZeBu",
+    "HAPS", "TestMAX", "Tessent", "Sentaurus", "Proteus", "VC SpyGlass", "VC LP", "Formality",
+    "RTL Architect", "PrimePower", "PrimeShield", "QuantumATK", "Platform Architect", "Virtualizer",
+    "Coverity", "Black Duck", "Saber", "LucidShape", "CODE V", "LightTools", "RSoft", "Silver",
+    "Embedded Vision", "ARC MetaWare", "Euclide",
+]
+
+FEEDBACK_MIX = {"none": 0.58, "like": 0.2, "Like": 0.03, "dislike": 0.05, "comment": 0.06, "COMMENT": 0.01, None: 0.07}
+
+COMMENTS = ["Great answer", "Not what I asked", "Please add an example", "Outdated command", "Helpful, thanks"]
+
+
+def zipf_choice(rng, n_values, n, exponent):
+    """
+    Draw `n` indexes in [0, n_values) with P(k) proportional to 1 / (k + 1) ** exponent.
+    """
+    weights = 1.0 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=n, p=weights / weights.sum())
+
+
+def make_ka_rows(n, seed=0, years=3, end="2025-08-31"):
+    """
+    `n` synthetic KA rows with the columns of the real export, ordered by date.
+    """
+    rng = np.random.default_rng(seed)
+    n_users = int(min(50_000, max(50, n // 20)))
+
+    # Growth over time (more queries recently) and fewer queries at weekends
+    days = pd.date_range(end=end, periods=365 * years, freq="D")
+    weights = np.linspace(0.4, 1.0, len(days)) * np.where(days.dayofweek >= 5, 0.25, 1.0)
+    day_idx = np.sort(rng.choice(len(days), size=n, p=weights / weights.sum()))
+    seconds = rng.integers(8 * 3600, 20 * 3600, n)
+    dates = days.values[day_idx] + seconds.astype("timedelta64[s]")
+
+    users = zipf_choice(rng, n_users, n, 1.1)
+    tools = zipf_choice(rng, len(TOOLS), n, 1.3)
+    feedback_values = list(FEEDBACK_MIX)
+    feedback = rng.choice(len(feedback_values), size=n, p=list(FEEDBACK_MIX.values()))
+    feedback = np.array(feedback_values, dtype=object)[feedback]
+
+    user_names = np.array([f"user{i}" for i in range(n_users)], dtype=object)
+    # A few accounts (service users) have no full name and are hidden from the KA User filter
+    full_names = np.array([None if i % 50 == 49 else f"User {i}" for i in range(n_users)], dtype=object)
+    is_comment = np.array([isinstance(f, str) and f.lower() == "comment" for f in feedback])
+    comments = np.full(n, None, dtype=object)
+    comments[is_comment] = np.array(COMMENTS, dtype=object)[rng.integers(0, len(COMMENTS), int(is_comment.sum()))]
+
+    return pd.DataFrame({
+        "Date": dates,
+        "Username": user_names[users],
+        "Full Name": full_names[users],
+        "tool": np.array(TOOLS, dtype=object)[tools],
+        "metadata.feedback_rating": feedback,
+        "metadata.feedback_comment": comments,
+    })
+
+
+def write_parquet(df, path):
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), path, compression="zstd")
+
+
+def write_xlsx(df, path, max_rows_per_sheet=EXCEL_MAX_ROWS_PER_SHEET):
+    """
+    Write `df` with openpyxl's streaming writer, as Sheet1, Sheet2, ... of at most
+    `max_rows_per_sheet` data rows each. Returns the sheet names.
+    """
+    wb = Workbook(write_only=True)
+    sheets = []
+    columns = list(df.columns)
+    for start in range(0, max(len(df), 1), max_rows_per_sheet):
+        ws = wb.create_sheet(f"Sheet{len(sheets) + 1}")
+        sheets.append(ws.title)
+        ws.append(columns)
+        part = df.iloc[start:start + max_rows_per_sheet]
+        values = [part[col].astype(object).where(part[col].notna(), None).tolist() for col in columns]
+        for row in zip(*values):
+            ws.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    wb.save(path)
+    return sheets
+
+
+def dataset_paths(n, seed=0, data_dir=BENCH_DATA_DIR):
+    base = os.path.join(data_dir, f"ka_{n}_{seed}")
+    return {"xlsx": base + ".xlsx", "parquet": base + ".parquet"}
+
+
+def ensure_dataset(n, formats=("xlsx", "parquet"), seed=0, data_dir=BENCH_DATA_DIR):
+    """
+    Generate the synthetic dataset of `n` rows in the requested formats unless already on disk.
+    Returns {format: path}.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    paths = {fmt: path for fmt, path in dataset_paths(n, seed, data_dir).items() if fmt in formats}
+    missing = [fmt for fmt, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        df = make_ka_rows(n, seed=seed)
+        for fmt in missing:
+            tmp_path = paths[fmt] + ".tmp"
+            if fmt == "parquet":
+                write_parquet(df, tmp_path)
+            else:
+                write_xlsx(df, tmp_path)
+            os.replace(tmp_path, paths[fmt])
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sizes", type=int, nargs="+")
+    parser.add_argument("--formats", nargs="+", choices=["xlsx", "parquet"], default=["xlsx", "parquet"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=BENCH_DATA_DIR)
+    args = parser.parse_args()
+    for n in args.sizes:
+        for fmt, path in ensure_dataset(n, args.formats, args.seed, args.out).items():
+            print(f"{n:>12,} {fmt:>8} {path}")
+
+
+if __name__ == "__main__":
+    main()
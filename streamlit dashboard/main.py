@@ -1,14 +1,28 @@
 # main.py — Synopsys Executive Dashboard
+import time
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from utils.data_loader import load_ka_data, get_data_summary
+from utils.data_loader import APPROX_UNIQUE_USERS, load_ka_dataset, load_query_engine, load_row_index, load_dimensions, load_user_search, get_data_summary, get_result_cache, get_dataset_refresher
+from utils.export import EXPORT_FORMATS, export_rows
+from utils.charts import build_feedback_figure, build_tool_figure, build_weekly_figure, cached_figure
+from utils.result_cache import canonical_filter_key
+from utils.filter_index import calendar_day_ranges
+from utils.dimensions import tools_for_users
+from utils.user_search import USER_SEARCH_MIN_USERS, user_search_selector
+from utils.sketches import hll_error
+from utils.instrumentation import begin_rerun, finish_rerun, stage
+from utils.debug_panel import is_admin, render_debug_panel
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Set global config
 st.set_page_config(page_title="Synopsys Executive Dashboard", layout="wide")
 st.markdown("<style>footer {visibility: hidden;}</style>", unsafe_allow_html=True)
 
+# Per-stage timings of this rerun (see utils/instrumentation.py)
+script_ctx = get_script_run_ctx()
+rerun_trace = begin_rerun(script_ctx.session_id if script_ctx else None)
+
 
 # --- MAIN DASHBOARD CONTENT ---
 st.markdown("""
@@ -26,8 +40,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load data with progress indicator
-df = load_ka_data()
+# Load data with progress indicator; the dataset is shared by all sessions and df is a view of it
+with stage("load_data", cached="load_ka_dataset") as record:
+    dataset = load_ka_dataset()
+    df = dataset.view()
+    record.rows_out = len(df)
+rerun_trace.context["dataset_version"] = df.attrs.get("dataset_version")
 
 # Check if data is empty
 if df.empty:
@@ -35,23 +53,27 @@ if df.empty:
     st.stop()
 
 # Get data summary for large dataset info
-data_summary = get_data_summary(df)
-
-
-synopsys_palette = [
-    "#E0C3FC", "#C792F5", "#A96DE2", "#8A4DD0", "#6E2BC2",
-    "#5023A4", "#3A3FBD", "#2267D0", "#2D95E6", "#54C4FD"
-]
-# Ensure iso_year exists for Year filtering
-if "iso_year" not in df.columns and "Date" in df.columns:
-    try:
-        df["iso_year"] = df["Date"].dt.isocalendar().year
-    except Exception:
-        df["iso_year"] = df["Date"].dt.year
-
-default_weeks = sorted(df["year_week_label"].dropna().unique())[-10:] if not df["year_week_label"].dropna().empty else []
-min_date = df["Date"].min()
-max_date = df["Date"].max()
+with stage("data_summary", cached="data_summary"):
+    data_summary = dataset.derived("data_summary", get_data_summary)
+
+# Query engine behind metrics and charts (pandas rollup cube or DuckDB), built once per dataset version
+with stage("query_engine", cached="query_engine"):
+    query_engine = load_query_engine(dataset)
+
+# Age of the data being shown; new data is loaded in the background and swapped in when ready
+refresh_status = get_dataset_refresher().status()
+data_age_minutes = int(refresh_status["age_seconds"] // 60)
+last_refresh = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(refresh_status["last_refresh_at"]))
+st.caption(f"🕒 Data loaded {data_age_minutes} min ago · last refresh finished {last_refresh}")
+if refresh_status["last_error"]:
+    st.warning(f"⚠️ Background refresh failed, showing the previous data: {refresh_status['last_error']}")
+
+# Filter options and the user -> tools mapping, precomputed once per dataset
+with stage("dimensions", cached="dimensions"):
+    dimensions = load_dimensions(dataset)
+default_weeks = dimensions["default_weeks"]
+min_date = dimensions["min_date"]
+max_date = dimensions["max_date"]
 
 with st.expander("🔎 Filters", expanded=True):
     # Create two columns for KA User and Select Tools side by side
@@ -59,18 +81,21 @@ with st.expander("🔎 Filters", expanded=True):
     
     # KA User filter in left column
     with cols[0]:
-        valid_users = df[df["Full Name"].notna()]
-        all_users = sorted(valid_users["Username"].dropna().unique())
+        all_users = dimensions["users"]
         
         if not all_users:
             st.error("❌ No valid users found in the data!")
             st.stop()
         
-        selected_ka_users = st.multiselect("KA User", all_users, default=[])
+        if len(all_users) > USER_SEARCH_MIN_USERS:
+            # Too many users for one list: search on the server and send one page of matches at a time
+            selected_ka_users = user_search_selector(load_user_search(dataset))
+        else:
+            selected_ka_users = st.multiselect("KA User", all_users, default=[])
     
     # Select Tools filter in right column
     with cols[1]:
-        all_tools = df["tool"].dropna().unique().tolist()
+        all_tools = dimensions["tools"]
         
         if not all_tools:
             st.error("❌ No tools found in the data!")
@@ -82,7 +107,7 @@ with st.expander("🔎 Filters", expanded=True):
         prev_ka = st.session_state.get("prev_ka_users", [])
         if set(prev_ka) != set(selected_ka_users):
             if selected_ka_users:
-                user_tools = sorted(df[df["Username"].isin(selected_ka_users)]["tool"].dropna().unique().tolist())
+                user_tools = tools_for_users(dimensions, selected_ka_users)
                 st.session_state["tools_ms"] = user_tools or st.session_state["tools_ms"]
             else:
                 # If KA selection cleared, revert to all tools
@@ -99,64 +124,111 @@ with st.expander("🔎 Filters", expanded=True):
     date_filter_options = st.multiselect("Select Filter Granularity", ["Year", "Month", "Week", "Custom"], default=["Week"])
     selected_years, selected_months, selected_weeks, selected_range = [], [], [], []
     
-    # Create month mapping once for reuse
-    month_labels = {i: pd.to_datetime(f"2025-{i}-01").strftime('%B') for i in range(1, 13)}
+    month_labels = dimensions["months"]
 
     if "Year" in date_filter_options:
-        selected_years = st.multiselect("Select Year(s)", sorted(df["iso_year"].dropna().unique()))
+        selected_years = st.multiselect("Select Year(s)", dimensions["years"])
     if "Month" in date_filter_options:
         selected_months = st.multiselect("Select Month(s)", list(month_labels.values()))
     if "Week" in date_filter_options:
-        selected_weeks = st.multiselect("Select Week(s)", sorted(df["year_week_label"].dropna().unique()), default=default_weeks)
+        selected_weeks = st.multiselect("Select Week(s)", dimensions["weeks"], default=default_weeks)
     if "Custom" in date_filter_options:
         selected_range = st.date_input("Select Custom Date Range", [min_date, max_date])
 
+    # Sketch-based estimates are a pandas-engine feature; DuckDB always counts exactly
+    approx_users = query_engine.name == "pandas" and st.toggle(
+        "≈ Approximate unique users",
+        value=APPROX_UNIQUE_USERS,
+        help=f"Estimate unique users with HyperLogLog sketches: faster on long date ranges, typically "
+             f"within ±{hll_error():.1%} (±{2 * hll_error():.1%} in 95% of cases). Off = exact counts.",
+    )
+
 if not selected_tools:
     st.warning("Please select at least one tool to proceed.")
     st.stop()
 
 # ================= Filter Logic =================
-filtered_df = df[df["tool"].isin(selected_tools)]
+# Reverse mapping: month_name -> month_number
+month_map = {v: k for k, v in month_labels.items()}
+month_numbers = [month_map[m] for m in selected_months]
+# Apply KA User filter to all data for consistent filtering across all graphs
+selected_or_all_users = selected_ka_users or all_users
 
+# Filter selections as {dimension: allowed values} / {dimension: (first, last)} for the filter index
+filter_selections = {"tool": selected_tools, "Username": selected_or_all_users}
+filter_ranges = {}
 if "Custom" in date_filter_options and len(selected_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df["Date"] >= pd.to_datetime(selected_range[0])) &
-        (filtered_df["Date"] <= pd.to_datetime(selected_range[1]))
-    ]
+    filter_ranges["day"] = (pd.to_datetime(selected_range[0]), pd.to_datetime(selected_range[1]))
 if "Year" in date_filter_options and selected_years:
-    filtered_df = filtered_df[filtered_df["iso_year"].isin(selected_years)]
+    filter_selections["iso_year"] = selected_years
 if "Month" in date_filter_options and selected_months:
-    # Reuse month_labels mapping from above
-    month_map = {v: k for k, v in month_labels.items()}  # Reverse mapping: month_name -> month_number
-    month_numbers = [month_map[m] for m in selected_months]
-    filtered_df = filtered_df[filtered_df["Date"].dt.month.isin(month_numbers)]
+    filter_selections["month"] = month_numbers
 if "Week" in date_filter_options and selected_weeks:
-    filtered_df = filtered_df[filtered_df["year_week_label"].isin(selected_weeks)]
+    filter_selections["year_week_label"] = selected_weeks
+# Date bounds as calendar dates, so both query engines (and the export) select whole days
+filter_ranges = calendar_day_ranges(filter_ranges)
+
+# ================= Cached Views =================
+def compute_views(filter_selections, filter_ranges, feedback_title):
+    """
+    Runs the filtered aggregations on the query engine and builds the figures for one filter state.
+    """
+    with stage("queries", rows_in=len(df)) as record:
+        summaries = query_engine.summaries(filter_selections, filter_ranges, approx_users=approx_users)
+        record.rows_out = summaries["metrics"]["total_queries"]
+    # Tools come back sorted by feedback_pct in descending order
+    tool_summary = summaries["tool_summary"]
+    weekly_summary = summaries["weekly_summary"]
+    ka_feedback = summaries["ka_feedback"]
+    # Figures are shared by every filter state with the same aggregated input
+    with stage("figures") as record:
+        figures, chart_bytes, hits = {}, {}, 0
+        for name, data, build, args in (
+            ("fig_tool_analysis", tool_summary, build_tool_figure, ()),
+            ("fig_weekly", weekly_summary, build_weekly_figure, ()),
+            ("fig_ka_feedback", ka_feedback, build_feedback_figure, (feedback_title,)),
+        ):
+            figures[name], chart_bytes[name], hit = cached_figure(result_cache, name, data, build, *args)
+            hits += hit
+        record.cache = "hit" if hits == len(figures) else "miss"
+        record.extra["figure_hits"] = hits
+    return {**summaries, **figures, "chart_bytes": chart_bytes}
 
-# Apply KA User filter to all data for consistent filtering across all graphs
-selected_or_all_users = selected_ka_users or all_users
-filtered_df = filtered_df[filtered_df["Username"].isin(selected_or_all_users)]
+# Determine appropriate title based on filtering
+feedback_title = "Selected Users Feedback Distribution" if selected_ka_users else "All Users Feedback Distribution"
 
-# ================= Process feedback data once for reuse =================
-filtered_df["feedback"] = filtered_df["metadata.feedback_rating"].astype(str).str.lower()
+# Views are shared by all sessions, keyed by the normalized filter state and the dataset version
+dataset_version = df.attrs.get("dataset_version")
+result_cache = get_result_cache()
+cache_key = canonical_filter_key(
+    dataset_version,
+    {**filter_selections, "Username": selected_ka_users or None, "unique_users": ["approx" if approx_users else "exact"]},
+    filter_ranges,
+)
+rerun_trace.context["filter_key"] = cache_key
+with stage("views") as record:
+    views = result_cache.get(cache_key)
+    record.cache = "miss" if views is None else "hit"
+    if views is None:
+        views = compute_views(filter_selections, filter_ranges, feedback_title)
+        result_cache.put(cache_key, views)
 
 # ================= Metrics =================
 col1, col2, col3, col4 = st.columns(4)
-unique_users = filtered_df["Username"].nunique()
-total_queries = len(filtered_df)
-feedback = filtered_df["feedback"].dropna()
-feedback_given = feedback.isin(["like", "dislike", "comment"]).sum()
-feedback_total = feedback.isin(["like", "dislike", "comment", "none"]).sum()
-feedback_pct = (feedback_given / feedback_total * 100) if feedback_total > 0 else 0
-
-col1.metric("👤 Unique Users", f"{unique_users:,}")
+metrics = views["metrics"]
+unique_users = metrics["unique_users"]
+total_queries = metrics["total_queries"]
+feedback_given = metrics["feedback_given"]
+feedback_pct = metrics["feedback_pct"]
+
+col1.metric("👤 Unique Users", f"≈{unique_users:,}" if approx_users else f"{unique_users:,}")
 col2.metric("💬 Total Queries", f"{total_queries:,}")
 col3.metric("✅ Feedback Count", f"{feedback_given:,}")
 col4.metric("👍 Feedback %", f"{feedback_pct:.2f}%")
 
 # Show period of data being displayed
-min_shown_date = filtered_df["Date"].min()
-max_shown_date = filtered_df["Date"].max()
+min_shown_date = metrics["min_date"]
+max_shown_date = metrics["max_date"]
 if pd.isna(min_shown_date) or pd.isna(max_shown_date):
     period_label = "N/A"
 else:
@@ -165,125 +237,40 @@ st.columns(1)[0].metric("📅 Period", period_label)
 
 st.markdown("---")
 
-# ================= Graph 1: Tool Analysis =================
-
-tool_summary = filtered_df.groupby("tool").agg(
-    total_queries=("Username", "count"),
-    unique_users=("Username", "nunique"),
-    feedback_given=("feedback", lambda x: x.isin(["like", "dislike", "comment"]).sum()),
-    feedback_total=("feedback", lambda x: x.isin(["like", "dislike", "comment", "none"]).sum())
-).reset_index()
-
-tool_summary["feedback_pct"] = tool_summary.apply(
-    lambda row: (row["feedback_given"] / row["feedback_total"] * 100) if row["feedback_total"] > 0 else 0, axis=1
-)
-
-# Sort tools by feedback_pct in descending order
-tool_summary = tool_summary.sort_values("feedback_pct", ascending=False)
-
-fig_tool_analysis = go.Figure()
-fig_tool_analysis.add_trace(go.Bar(
-    x=tool_summary["tool"],
-    y=tool_summary["feedback_pct"],
-    name="Feedback %",
-    marker_color=synopsys_palette[8],
-    yaxis="y1"
-))
-fig_tool_analysis.add_trace(go.Scatter(
-    x=tool_summary["tool"],
-    y=tool_summary["total_queries"],
-    mode="lines+markers",
-    name="Total Queries",
-    line=dict(color=synopsys_palette[3], width=3),
-    yaxis="y2"
-))
-fig_tool_analysis.update_layout(
-    title="Tool Usage Analysis",
-    xaxis_title="Tool",
-    yaxis=dict(title="Queries / Users", side="left"),
-    yaxis2=dict(title="Feedback %", overlaying="y", side="right"),
-    font=dict(size=16),
-    barmode="group",
-    legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
-)
-
-# ================= Graph 2: Weekly Total Queries & Feedback % Trend =================
-# Use existing feedback column instead of recreating
-weekly_df = filtered_df.copy()
-
-weekly_summary = weekly_df.groupby("year_week_label").agg(
-    total_queries=("Username", "count"),
-    feedback_given=("feedback", lambda x: x.isin(["like", "dislike", "comment"]).sum()),
-    feedback_total=("feedback", lambda x: x.isin(["like", "dislike", "comment", "none"]).sum())
-).reset_index()
-
-weekly_summary["feedback_pct"] = weekly_summary.apply(
-    lambda row: (row["feedback_given"] / row["feedback_total"] * 100) if row["feedback_total"] > 0 else 0, axis=1
-)
-
-fig_weekly = go.Figure()
-
-# Add Feedback % as bar chart
-fig_weekly.add_trace(go.Bar(
-    x=weekly_summary["year_week_label"],
-    y=weekly_summary["feedback_pct"],
-    name="Feedback %",
-    marker_color=synopsys_palette[-1],
-    yaxis="y1"
-))
-
-# Add Total Queries as line chart
-fig_weekly.add_trace(go.Scatter(
-    x=weekly_summary["year_week_label"],
-    y=weekly_summary["total_queries"],
-    name="Total Queries",
-    mode="lines+markers",
-    line=dict(color=synopsys_palette[5], width=3),
-    yaxis="y2"
-))
-
-fig_weekly.update_layout(
-    title="Weekly Total Queries & Feedback % Trend",
-    xaxis_title="Week",
-    yaxis=dict(title="Total Queries", side="left"),
-    yaxis2=dict(title="Feedback %", overlaying="y", side="right"),
-    font=dict(size=16),
-    legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
-)
-
-# ================= Graph 3: KA User Feedback =================
-# Use filtered_df directly since it's already filtered by selected KA users
-ka_feedback = filtered_df["feedback"].dropna().value_counts().reset_index()
-ka_feedback.columns = ["Feedback Type", "Count"]
-# Determine appropriate title based on filtering
-feedback_title = "Selected Users Feedback Distribution" if selected_ka_users else "All Users Feedback Distribution"
-fig_ka_feedback = px.pie(
-    ka_feedback, names="Feedback Type", values="Count",
-    title=feedback_title,
-    color_discrete_sequence=synopsys_palette
-)
-fig_ka_feedback.update_layout(
-    font=dict(size=16),
-    legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
-)
-
 # ================= Layout =================
-# Graph 2 at the top (full width)
-st.plotly_chart(fig_weekly, use_container_width=True)
+with stage("render_charts") as record:
+    # Serialized bytes shipped to the browser per chart
+    for name in ("fig_weekly", "fig_tool_analysis", "fig_ka_feedback"):
+        record.extra[f"{name}_bytes"] = views["chart_bytes"][name]
+
+    # Graph 2: Weekly Total Queries & Feedback % Trend at the top (full width)
+    st.plotly_chart(views["fig_weekly"], use_container_width=True)
 
-# Graphs 1 and 3 side by side
-left_col, right_col = st.columns(2)
-with left_col:
-    st.plotly_chart(fig_tool_analysis, use_container_width=True)
-with right_col:
-    st.plotly_chart(fig_ka_feedback, use_container_width=True)
+    # Graph 1 (Tool Analysis) and Graph 3 (KA User Feedback) side by side
+    left_col, right_col = st.columns(2)
+    with left_col:
+        st.plotly_chart(views["fig_tool_analysis"], use_container_width=True)
+    with right_col:
+        st.plotly_chart(views["fig_ka_feedback"], use_container_width=True)
 
 
 
 with st.expander("⬇ Download Filtered Data"):
-    # Ensure all columns are string-compatible for CSV export
-    export_df = filtered_df.copy()
-    if "metadata.feedback_comment" in export_df.columns:
-        export_df["metadata.feedback_comment"] = export_df["metadata.feedback_comment"].astype(str)
-    csv = export_df.to_csv(index=False).encode("utf-8")
-    st.download_button("Download CSV", csv, "filtered_data.csv", "text/csv")
\ No newline at end of file
+    export_format = st.radio("Format", list(EXPORT_FORMATS), horizontal=True)
+    file_name, mime = EXPORT_FORMATS[export_format]
+
+    def build_export():
+        # Runs only when the download is requested; raw rows are filtered and converted chunk by chunk
+        with stage("export", rows_in=len(df)) as record:
+            row_index = load_row_index(dataset)
+            row_ids = np.flatnonzero(row_index.mask(filter_selections, filter_ranges))
+            record.rows_out = len(row_ids)
+            record.extra["format"] = export_format
+            return export_rows(df, row_ids, export_format)
+
+    st.download_button(f"Download {export_format}", build_export, file_name, mime)
+
+# ================= Instrumentation =================
+if is_admin():
+    render_debug_panel(result_cache)
+finish_rerun()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The dashboard imports its modules as utils.*, from the "streamlit dashboard" folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE_ROWS = 5_000
+
+
+def make_ka_export(n=FIXTURE_ROWS, seed=7):
+    """
+    Rows shaped like the KA export: mixed-case feedback, blank ratings and comments,
+    several queries per user per day.
+    """
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, 400, n)
+    return pd.DataFrame({
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 240, n)), unit="D"),
+        "Username": [f"user{u}" for u in users],
+        "tool": rng.choice(["VCS", "Verdi", "PrimeTime", "DSO.ai", "VC Formal", "Fusion Compiler"], n),
+        "metadata.feedback_rating": rng.choice(["like", "Like", "dislike", "comment", "none", None], n,
+                                               p=[0.15, 0.05, 0.05, 0.05, 0.6, 0.1]),
+        "metadata.feedback_comment": rng.choice(["good", "bad", None], n, p=[0.1, 0.1, 0.8]),
+        "question": [f"q{i}" for i in range(n)],
+        "Full Name": [f"USER{u}" for u in users],
+    })
+
+
+@pytest.fixture(scope="session")
+def ka_export():
+    return make_ka_export()
+
+
+@pytest.fixture(scope="session")
+def ka_workbook(ka_export, tmp_path_factory):
+    path = tmp_path_factory.mktemp("ka") / "ka.xlsx"
+    ka_export.to_excel(path, sheet_name="KA", index=False)
+    return str(path)
@@ -0,0 +1,107 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from utils.aggregations import FEEDBACK_GIVEN, FEEDBACK_TOTAL
+from utils.backends import DuckDBEngine, PandasEngine, duckdb
+from utils.filter_index import FilterIndex, calendar_day_ranges, rollup_dimensions
+from utils.ingest import read_ka_excel
+from utils.rollup import build_rollup
+
+pytestmark = pytest.mark.skipif(duckdb is None, reason="duckdb is not installed")
+
+
+@pytest.fixture(scope="module")
+def ka_frame(ka_workbook):
+    df, _ = read_ka_excel(ka_workbook, "KA")
+    return df
+
+
+@pytest.fixture(scope="module")
+def engines(ka_frame):
+    rollup = build_rollup(ka_frame)
+    return (
+        PandasEngine(rollup, FilterIndex(rollup_dimensions(rollup))),
+        DuckDBEngine([pa.Table.from_pandas(ka_frame, preserve_index=False)]),
+    )
+
+
+def expected_metrics(export, tools=None, users=None, first=None, last=None):
+    """
+    Headline metrics straight from the generated export rows, independent of both engines.
+    """
+    rows = export
+    if tools is not None:
+        rows = rows[rows["tool"].isin(tools)]
+    if users is not None:
+        rows = rows[rows["Username"].isin(users)]
+    if first is not None:
+        day = rows["Date"].dt.normalize()
+        rows = rows[(day >= pd.Timestamp(first).normalize()) & (day <= pd.Timestamp(last).normalize())]
+    feedback = rows["metadata.feedback_rating"].str.lower()
+    return {
+        "unique_users": rows["Username"].nunique(),
+        "total_queries": len(rows),
+        "feedback_given": int(feedback.isin(FEEDBACK_GIVEN).sum()),
+        "feedback_total": int(feedback.isin(FEEDBACK_TOTAL).sum()),
+    }
+
+
+def run(engines, selections, ranges):
+    ranges = calendar_day_ranges(ranges)
+    return [engine.summaries(selections, ranges) for engine in engines]
+
+
+def assert_same(pandas_result, duckdb_result):
+    for key in ("unique_users", "total_queries", "feedback_given", "feedback_total", "min_date", "max_date"):
+        assert pandas_result["metrics"][key] == duckdb_result["metrics"][key], key
+    assert pandas_result["metrics"]["feedback_pct"] == pytest.approx(duckdb_result["metrics"]["feedback_pct"])
+    for key in ("tool_summary", "weekly_summary", "ka_feedback"):
+        pd.testing.assert_frame_equal(pandas_result[key].reset_index(drop=True), duckdb_result[key].reset_index(drop=True),
+                                      check_dtype=False, check_categorical=False)
+
+
+def pick(result):
+    return {key: result["metrics"][key] for key in ("unique_users", "total_queries", "feedback_given", "feedback_total")}
+
+
+def test_default_metrics(ka_export, ka_frame, engines):
+    selections = {"tool": sorted(ka_frame["tool"].unique()), "Username": sorted(ka_frame["Username"].unique())}
+    pandas_result, duckdb_result = run(engines, selections, {})
+    assert_same(pandas_result, duckdb_result)
+    # Pinned for the seeded fixture, so a change that moves both engines the same way still fails
+    assert pick(pandas_result) == {"unique_users": 400, "total_queries": 5000, "feedback_given": 1482, "feedback_total": 4470}
+    assert pick(pandas_result) == expected_metrics(ka_export)
+
+
+@pytest.mark.parametrize("first, last", [
+    ("2024-02-01", "2024-03-15"),
+    ("2024-02-01 13:45", "2024-03-15 06:00"),  # bounds with a time of day still cover whole days
+    ("2024-03-15", "2024-03-15"),
+])
+def test_custom_date_range_includes_end_day(ka_export, ka_frame, engines, first, last):
+    selections = {"tool": sorted(ka_frame["tool"].unique()), "Username": sorted(ka_frame["Username"].unique())}
+    pandas_result, duckdb_result = run(engines, selections, {"day": (pd.Timestamp(first), pd.Timestamp(last))})
+    assert_same(pandas_result, duckdb_result)
+    assert pick(pandas_result) == expected_metrics(ka_export, first=first, last=last)
+    assert pandas_result["metrics"]["max_date"].normalize() == pd.Timestamp(last).normalize()
+
+
+def test_narrow_selection(ka_export, engines):
+    tools, users = ["VCS", "Verdi"], [f"user{i}" for i in range(50)]
+    pandas_result, duckdb_result = run(engines, {"tool": tools, "Username": users}, {})
+    assert_same(pandas_result, duckdb_result)
+    assert pick(pandas_result) == expected_metrics(ka_export, tools=tools, users=users)
+
+
+def test_year_month_and_week_filters(ka_frame, engines):
+    weeks = sorted(ka_frame["year_week_label"].unique())
+    selections = {"tool": sorted(ka_frame["tool"].unique()), "Username": sorted(ka_frame["Username"].unique())}
+    assert_same(*run(engines, dict(selections, iso_year=[2024], month=[2, 7]), {}))
+    assert_same(*run(engines, dict(selections, year_week_label=weeks[-5:]), {}))
+
+
+def test_no_matching_rows(ka_frame, engines):
+    pandas_result, duckdb_result = run(engines, {"tool": sorted(ka_frame["tool"].unique()), "Username": ["no-such-user"]}, {})
+    assert pick(pandas_result) == pick(duckdb_result) == {"unique_users": 0, "total_queries": 0,
+                                                           "feedback_given": 0, "feedback_total": 0}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pandas as pd
+
+from utils.dataset import Dataset
+
+
+def test_slow_build_does_not_block_other_values():
+    dataset = Dataset(pd.DataFrame({"x": [1, 2, 3]}))
+    started, release = threading.Event(), threading.Event()
+
+    def slow(frame):
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    worker = threading.Thread(target=dataset.derived, args=("slow", slow))
+    worker.start()
+    started.wait(5)
+    start = time.perf_counter()
+    assert dataset.derived("fast", lambda frame: len(frame)) == 3
+    assert time.perf_counter() - start < 1
+    release.set()
+    worker.join(5)
+    assert dataset.derived("slow", slow) == "slow"
+
+
+def test_concurrent_first_uses_build_once():
+    dataset = Dataset(pd.DataFrame({"x": [1, 2, 3]}))
+    builds = []
+
+    def build(frame):
+        builds.append(1)
+        time.sleep(0.05)
+        return frame["x"].sum()
+
+    threads = [threading.Thread(target=dataset.derived, args=("total", build)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(builds) == 1
+    assert dataset.derived("total", build) == 6
+
+
+def test_builds_may_use_other_derived_values():
+    dataset = Dataset(pd.DataFrame({"x": [1, 2, 3]}))
+    total = lambda frame: dataset.derived("sum", lambda f: f["x"].sum()) * 2
+    assert dataset.derived("double", total) == 12
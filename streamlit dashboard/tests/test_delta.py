@@ -0,0 +1,50 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+from utils import snapshot
+from utils.ingest import ingest_ka_delta, read_ka_excel
+from utils.readers import python_calamine
+
+ENGINES = ["openpyxl", pytest.param("calamine", marks=pytest.mark.skipif(python_calamine is None, reason="python-calamine is not installed"))]
+
+
+@pytest.fixture
+def workbook(ka_export, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    path = str(tmp_path / "ka.xlsx")
+    ka_export.head(300).to_excel(path, sheet_name="KA", index=False)
+    df, watermark = read_ka_excel(path, "KA")
+    snapshot.write_snapshot(df, path, "KA", watermark=watermark)
+    return path
+
+
+def append_rows(path, rows):
+    wb = openpyxl.load_workbook(path)
+    ws = wb["KA"]
+    for row in rows.itertuples(index=False):
+        ws.append([None if pd.isna(v) else v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    wb.save(path)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_appended_rows_match_a_full_read(workbook, ka_export, engine):
+    append_rows(workbook, ka_export.iloc[300:420])
+    df, new_rows = ingest_ka_delta(workbook, "KA", engine=engine)
+    assert new_rows == 120
+    full, _ = read_ka_excel(workbook, "KA", engine=engine)
+    pd.testing.assert_frame_equal(df, full, check_dtype=False)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_edited_rows_need_a_full_reload(workbook, ka_export, engine):
+    edited = ka_export.head(300).copy()
+    edited.loc[299, "tool"] = "Edited"
+    edited.to_excel(workbook, sheet_name="KA", index=False)
+    assert ingest_ka_delta(workbook, "KA", engine=engine) is None
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_fewer_rows_need_a_full_reload(workbook, ka_export, engine):
+    ka_export.head(200).to_excel(workbook, sheet_name="KA", index=False)
+    assert ingest_ka_delta(workbook, "KA", engine=engine) is None
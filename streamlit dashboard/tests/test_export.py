@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.export import export_rows
+from utils.ingest import read_ka_excel
+
+
+def test_parquet_keeps_missing_comments_null(ka_workbook):
+    df, _ = read_ka_excel(ka_workbook, "KA")
+    row_ids = np.arange(len(df))
+    table = pq.read_table(export_rows(df, row_ids, "Parquet"))
+    comments = table.column("metadata.feedback_comment")
+    assert comments.null_count == df["metadata.feedback_comment"].isna().sum() > 0
+    assert "nan" not in set(comments.drop_null().to_pylist())
+
+
+def test_csv_and_parquet_hold_the_same_rows(ka_workbook):
+    df, _ = read_ka_excel(ka_workbook, "KA")
+    row_ids = np.flatnonzero(df["tool"] == "VCS")
+    from_csv = pd.read_csv(export_rows(df, row_ids, "CSV"))
+    from_parquet = pq.read_table(export_rows(df, row_ids, "Parquet")).to_pandas()
+    assert len(from_csv) == len(from_parquet) == len(row_ids)
+    assert list(from_csv["question"]) == list(from_parquet["question"])
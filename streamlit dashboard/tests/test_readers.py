@@ -0,0 +1,27 @@
+import pandas as pd
+
+from utils.readers import header_names, iter_excel_chunks, rows_to_frame
+from utils.schema import read_dtypes
+
+
+def test_header_names_match_read_excel(tmp_path):
+    path = tmp_path / "headers.xlsx"
+    pd.DataFrame([[1, 2, 3, 4, 5]], columns=["Date", "tool", "Date", "x", "Date"]).to_excel(path, index=False)
+    assert header_names(["Date", "tool", "Date", None, "Date"]) == ["Date", "tool", "Date.1", "Unnamed: 3", "Date.2"]
+    assert header_names(["Date", "tool", "Date", "x", "Date"]) == list(pd.read_excel(path).columns)
+
+
+def test_every_chunk_gets_the_schema_dtypes(ka_workbook):
+    dtype = read_dtypes()
+    for chunk, _, _ in iter_excel_chunks(ka_workbook, "KA", chunk_rows=700, dtype=dtype):
+        for col, t in dtype.items():
+            if col in chunk.columns:
+                assert str(chunk[col].dtype) == str(pd.Series([], dtype=t).dtype), col
+
+
+def test_rows_to_frame_types_missing_only_columns():
+    frame = rows_to_frame([("a", None), ("b",)], ["tool", "metadata.feedback_comment"], read_dtypes())
+    assert isinstance(frame["tool"].dtype, pd.CategoricalDtype)
+    assert frame["metadata.feedback_comment"].dtype == "string[pyarrow]"
+    assert frame["metadata.feedback_comment"].isna().all()
+    assert rows_to_frame([], ["tool"], read_dtypes())["tool"].dtype == "category"
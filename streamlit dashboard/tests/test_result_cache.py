@@ -0,0 +1,29 @@
+from utils.result_cache import ResultCache, canonical_filter_key
+
+
+def key(version, tool):
+    return canonical_filter_key(version, {"tool": [tool]}, {})
+
+
+def test_new_version_does_not_wipe_the_cache():
+    cache = ResultCache(1024 * 1024)
+    cache.put(key("v1", "VCS"), "old")
+    cache.put(key("v2", "VCS"), "new")
+    # A rerun still on the replaced data stores its result after the swap
+    cache.put(key("v1", "Verdi"), "straggler")
+    assert cache.get(key("v2", "VCS")) == "new"
+    assert cache.get(key("v1", "VCS")) == "old"
+    assert cache.stats()["entries"] == 3
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = ResultCache(1024 * 1024)
+    value = "x" * 300_000
+    cache.put(key("v1", "VCS"), value)
+    cache.put(key("v1", "Verdi"), value)
+    cache.get(key("v1", "VCS"))
+    cache.put(key("v2", "VCS"), value)
+    cache.put(key("v2", "Verdi"), value)
+    assert cache.get(key("v1", "Verdi")) is None
+    assert cache.get(key("v2", "Verdi")) == value
+    assert cache.used_bytes <= cache.max_bytes
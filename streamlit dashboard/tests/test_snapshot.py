@@ -0,0 +1,32 @@
+import pytest
+
+from utils import snapshot
+from utils.ingest import read_ka_excel, refresh_sheet
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+
+@pytest.fixture
+def workbook(ka_export, tmp_path):
+    path = tmp_path / "ka.xlsx"
+    ka_export.head(200).to_excel(path, sheet_name="KA", index=False)
+    return str(path)
+
+
+def test_snapshot_round_trip(snapshot_dir, workbook):
+    df, report = refresh_sheet(workbook, "KA", incremental=False)
+    assert report["snapshot_written"]
+    loaded = snapshot.load_snapshot(workbook, "KA")
+    assert loaded is not None and len(loaded) == len(df) == 200
+
+
+def test_workbook_saved_during_parse_is_not_stamped_current(snapshot_dir, workbook, ka_export):
+    fingerprint = snapshot.source_fingerprint(workbook)
+    df, watermark = read_ka_excel(workbook, "KA")
+    # Someone saves more rows while the old contents are being parsed
+    ka_export.head(300).to_excel(workbook, sheet_name="KA", index=False)
+    snapshot.write_snapshot(df, workbook, "KA", watermark=watermark, fingerprint=fingerprint)
+    assert snapshot.load_snapshot(workbook, "KA") is None
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Feedback values that count as "feedback given" and towards the feedback % denominator
+FEEDBACK_GIVEN = ["like", "dislike", "comment"]
+FEEDBACK_TOTAL = FEEDBACK_GIVEN + ["none"]
+
+
+def normalize_feedback(feedback):
+    """
+    Lower-cased feedback labels; categorical input is normalized on its categories only.
+    """
+    if isinstance(feedback.dtype, pd.CategoricalDtype):
+        lowered = feedback.cat.categories.astype(str).str.lower()
+        if lowered.is_unique:
+            return feedback.cat.rename_categories(lowered)
+    return feedback.astype(str).str.lower()
+
+
+def add_feedback_flags(df, column="metadata.feedback_rating"):
+    """
+    Return `df` with int8 `is_feedback_given` / `is_feedback_total` columns derived from `column`.
+
+    Computed once, these turn every feedback metric into a plain vectorized sum.
+    """
+    feedback = normalize_feedback(df[column])
+    return df.assign(
+        is_feedback_given=feedback.isin(FEEDBACK_GIVEN).to_numpy(dtype="int8"),
+        is_feedback_total=feedback.isin(FEEDBACK_TOTAL).to_numpy(dtype="int8"),
+    )
+
+
+def feedback_pct(given, total):
+    """
+    Vectorized feedback % (0 where there is no feedback at all).
+    """
+    given = np.asarray(given, dtype="float64")
+    total = np.asarray(total, dtype="float64")
+    return np.where(total > 0, given / np.where(total > 0, total, 1) * 100, 0.0)
+
+
+def _measure_aggs(frame):
+    """
+    Named aggregations for the three count measures of `frame`.
+
+    Rollup cells carry pre-summed `queries` / `feedback_given` / `feedback_total` columns;
+    raw rows (after add_feedback_flags) count one query per row and sum the flags.
+    """
+    if "queries" in frame.columns:
+        return {
+            "total_queries": ("queries", "sum"),
+            "feedback_given": ("feedback_given", "sum"),
+            "feedback_total": ("feedback_total", "sum"),
+        }
+    return {
+        "total_queries": ("is_feedback_total", "size"),
+        "feedback_given": ("is_feedback_given", "sum"),
+        "feedback_total": ("is_feedback_total", "sum"),
+    }
+
+
+def summarize(frame, by, unique_users=False):
+    """
+    Single vectorized groupby pass over `frame` returning queries, feedback counts and %
+    (and the number of distinct users when `unique_users` is set) per `by` group.
+    """
+    aggs = _measure_aggs(frame)
+    if unique_users:
+        aggs["unique_users"] = ("Username", "nunique")
+    summary = frame.groupby(by, observed=True, sort=True).agg(**aggs).reset_index()
+    summary["feedback_pct"] = feedback_pct(summary["feedback_given"], summary["feedback_total"])
+    return summary
+
+
+def headline_metrics(frame, date_column=None, unique_users=True):
+    """
+    Unique users, total queries, feedback count and % (plus the date span) over `frame`.
+
+    With `unique_users` off the exact distinct count is skipped (None), for callers that estimate it.
+    """
+    if date_column is None:
+        date_column = "day" if "day" in frame.columns else "Date"
+    totals = {name: int(frame[col].sum()) if func == "sum" else len(frame)
+              for name, (col, func) in _measure_aggs(frame).items()}
+    return {
+        "unique_users": frame["Username"].nunique() if unique_users else None,
+        "total_queries": totals["total_queries"],
+        "feedback_given": totals["feedback_given"],
+        "feedback_total": totals["feedback_total"],
+        "feedback_pct": float(feedback_pct(totals["feedback_given"], totals["feedback_total"])),
+        "min_date": frame[date_column].min(),
+        "max_date": frame[date_column].max(),
+    }
+
+
+def summarize_tools(frame, user_counts=None):
+    """
+    Per-tool queries, unique users and feedback %, sorted by feedback % (descending).
+
+    `user_counts` (unique users per tool, e.g. estimated from sketches) replaces the exact count.
+    """
+    if user_counts is None:
+        return rank_tools(summarize(frame, "tool", unique_users=True))
+    summary = summarize(frame, "tool")
+    counts = user_counts.reindex(summary["tool"].astype(object)).fillna(0).to_numpy(dtype="int64")
+    summary.insert(summary.columns.get_loc("feedback_pct"), "unique_users", counts)
+    return rank_tools(summary)
+
+
+def rank_tools(tool_summary):
+    """
+    Order a per-tool summary (sorted by tool) by feedback % descending; ties keep tool order.
+    """
+    return tool_summary.sort_values("feedback_pct", ascending=False, kind="stable")
+
+
+def summarize_weeks(frame):
+    """
+    Per-week queries and feedback %.
+    """
+    return summarize(frame, "year_week_label")
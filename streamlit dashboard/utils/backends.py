@@ -0,0 +1,215 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.aggregations import FEEDBACK_GIVEN, FEEDBACK_TOTAL, feedback_pct, headline_metrics, rank_tools, summarize_tools, summarize_weeks
+from utils.rollup import rollup_feedback_counts
+from utils.sketches import UserSketches
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for KA_QUERY_ENGINE=duckdb, `pip install duckdb`
+    duckdb = None
+
+QUERY_ENGINES = ("pandas", "duckdb")
+
+# Columns of the DuckDB table: the filter dimensions (derived once, when the table is built,
+# the same way utils/rollup.py derives them for the pandas engine) and the normalized feedback
+_TABLE_SQL = """
+CREATE TABLE ka AS SELECT
+    "tool"::VARCHAR AS "tool",
+    "Username"::VARCHAR AS "Username",
+    "year_week_label"::VARCHAR AS "year_week_label",
+    isoyear("Date") AS "iso_year",
+    month("Date") AS "month",
+    CAST("Date" AS DATE) AS "day",
+    lower(CAST("metadata.feedback_rating" AS VARCHAR)) AS "feedback"
+FROM ({source})
+"""
+
+class PandasEngine:
+    """
+    Answers dashboard queries from the in-memory rollup cube through its filter index.
+    """
+
+    name = "pandas"
+
+    def __init__(self, rollup, rollup_index, user_groups=None):
+        self.rollup = rollup
+        self.rollup_index = rollup_index
+        # Users whose selection as a whole is common (e.g. every named user), see UserSketches
+        self.user_groups = user_groups
+        self._sketches = None
+        self._sketch_lock = threading.Lock()
+
+    def user_sketches(self):
+        """
+        HyperLogLog sketches of the cube, built on the first approximate query.
+        """
+        with self._sketch_lock:
+            if self._sketches is None:
+                self._sketches = UserSketches(self.rollup, self.user_groups)
+            return self._sketches
+
+    def summaries(self, selections, ranges, approx_users=False):
+        """
+        Headline metrics, per-tool and per-week summaries and feedback counts for one filter state.
+
+        `selections` maps a dimension to its allowed values (None = no filter) and `ranges`
+        a dimension to an inclusive (first, last) pair, as for FilterIndex.mask. With
+        `approx_users` unique users are estimated from sketches instead of counted exactly.
+        """
+        rows = np.flatnonzero(self.rollup_index.mask(selections, ranges))
+        cells = self.rollup.take(rows)
+        metrics = headline_metrics(cells, unique_users=not approx_users)
+        user_counts = None
+        if approx_users:
+            metrics["unique_users"], user_counts = self.user_sketches().estimate(rows)
+        return {
+            "metrics": metrics,
+            # Tools come back sorted by feedback_pct in descending order
+            "tool_summary": summarize_tools(cells, user_counts),
+            "weekly_summary": summarize_weeks(cells),
+            # Rollup cells are already filtered by selected KA users
+            "ka_feedback": rollup_feedback_counts(cells),
+        }
+
+
+def _sql_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def _day(value):
+    return pd.Timestamp(value).date()
+
+
+def _timestamp_or_nat(value):
+    return pd.NaT if value is None else pd.Timestamp(value)
+
+
+class DuckDBEngine:
+    """
+    Answers dashboard queries with an embedded DuckDB database loaded from Arrow tables
+    (typically the memory-mapped snapshot files): filters and aggregations run as SQL and
+    only the small result sets are turned into pandas objects.
+    """
+
+    name = "duckdb"
+
+    def __init__(self, tables):
+        if duckdb is None:
+            raise ImportError("The duckdb query engine needs the duckdb package")
+        self._con = duckdb.connect()
+        # One connection is shared by all sessions; DuckDB connections are not thread-safe
+        self._lock = threading.Lock()
+        names = []
+        for i, table in enumerate(tables):
+            name = f"ka_part_{i}"
+            self._con.register(name, table)
+            names.append(f"SELECT * FROM {name}")
+        # Copied once into DuckDB's compressed columnar storage with the derived columns
+        self._con.execute(_TABLE_SQL.format(source=" UNION ALL BY NAME ".join(names)))
+        for i in range(len(names)):
+            self._con.unregister(f"ka_part_{i}")
+        self._values = {
+            name: {v for (v,) in self._con.execute(f'SELECT DISTINCT "{name}" FROM ka WHERE "{name}" IS NOT NULL').fetchall()}
+            for name in ("tool", "Username", "year_week_label")
+        }
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._con.execute(sql, params).fetchall()
+
+    def _where(self, selections, ranges, not_null=None):
+        clauses, params = [], []
+        for name, values in selections.items():
+            if values is None:
+                continue
+            values = [_day(v) if name == "day" else _sql_value(v) for v in values]
+            if not values:
+                clauses.append("FALSE")
+            elif name in self._values and self._values[name].issubset(values):
+                # Selecting every value (the default for tools and users) only drops missing ones
+                clauses.append(f'"{name}" IS NOT NULL')
+            else:
+                clauses.append(f'"{name}" IN (SELECT unnest(?))')
+                params.append(values)
+        for name, (low, high) in ranges.items():
+            convert = _day if name == "day" else _sql_value
+            clauses.append(f'"{name}" BETWEEN ? AND ?')
+            params.extend([convert(low), convert(high)])
+        if not_null is not None:
+            clauses.append(f'"{not_null}" IS NOT NULL')
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _measures(self):
+        given = ", ".join(f"'{v}'" for v in FEEDBACK_GIVEN)
+        total = ", ".join(f"'{v}'" for v in FEEDBACK_TOTAL)
+        return (
+            "count(*) AS total_queries, "
+            f'count(*) FILTER (WHERE "feedback" IN ({given})) AS feedback_given, '
+            f'count(*) FILTER (WHERE "feedback" IN ({total})) AS feedback_total'
+        )
+
+    def headline_metrics(self, selections, ranges):
+        where, params = self._where(selections, ranges)
+        unique_users, total_queries, given, total, min_day, max_day = self._query(
+            f'SELECT count(DISTINCT "Username"), {self._measures()}, min("day"), max("day") FROM ka{where}',
+            params,
+        )[0]
+        return {
+            "unique_users": int(unique_users),
+            "total_queries": int(total_queries),
+            "feedback_given": int(given),
+            "feedback_total": int(total),
+            "feedback_pct": float(feedback_pct(given, total)),
+            "min_date": _timestamp_or_nat(min_day),
+            "max_date": _timestamp_or_nat(max_day),
+        }
+
+    def _summary(self, by, selections, ranges, unique_users=False):
+        where, params = self._where(selections, ranges, not_null=by)
+        columns = [by, "total_queries", "feedback_given", "feedback_total"]
+        users = ""
+        if unique_users:
+            columns.append("unique_users")
+            users = ', count(DISTINCT "Username") AS unique_users'
+        rows = self._query(
+            f'SELECT "{by}", {self._measures()}{users} FROM ka{where} GROUP BY 1 ORDER BY 1',
+            params,
+        )
+        summary = pd.DataFrame(rows, columns=columns)
+        for col in columns[1:]:
+            summary[col] = summary[col].astype("int64")
+        summary["feedback_pct"] = feedback_pct(summary["feedback_given"], summary["feedback_total"])
+        return summary
+
+    def feedback_counts(self, selections, ranges):
+        where, params = self._where(selections, ranges)
+        where += (" AND " if where else " WHERE ") + '"feedback" IS NOT NULL'
+        rows = self._query(
+            f'SELECT "feedback", count(*) AS n FROM ka{where} GROUP BY 1 ORDER BY n DESC, "feedback"',
+            params,
+        )
+        return pd.DataFrame({
+            "Feedback Type": [r[0] for r in rows],
+            "Count": np.array([r[1] for r in rows], dtype="int64"),
+        })
+
+    def summaries(self, selections, ranges, approx_users=False):
+        """
+        Same results as PandasEngine.summaries, computed by DuckDB. Unique users are always
+        exact: DuckDB's approx_count_distinct is far less accurate than the sketches of
+        utils/sketches.py (tens of percent off on a few hundred users), so `approx_users` is ignored.
+        """
+        return {
+            "metrics": self.headline_metrics(selections, ranges),
+            "tool_summary": rank_tools(self._summary("tool", selections, ranges, unique_users=True)),
+            "weekly_summary": self._summary("year_week_label", selections, ranges),
+            "ka_feedback": self.feedback_counts(selections, ranges),
+        }
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import os
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.aggregations import feedback_pct
+
+synopsys_palette = [
+    "#E0C3FC", "#C792F5", "#A96DE2", "#8A4DD0", "#6E2BC2",
+    "#5023A4", "#3A3FBD", "#2267D0", "#2D95E6", "#54C4FD"
+]
+
+# Most x-axis categories a chart shows (0 = no cap): beyond that consecutive weeks are merged
+# into buckets and the tools with the fewest queries into one "Other" bar
+MAX_WEEK_CATEGORIES = int(os.environ.get("KA_CHART_MAX_WEEKS", "104"))
+MAX_TOOL_CATEGORIES = int(os.environ.get("KA_CHART_MAX_TOOLS", "20"))
+OTHER_LABEL = "Other"
+
+# Line traces with at least this many points are drawn with WebGL instead of SVG
+WEBGL_MIN_POINTS = int(os.environ.get("KA_CHART_WEBGL_POINTS", "1000"))
+
+_MEASURES = ["total_queries", "feedback_given", "feedback_total"]
+
+
+def _with_pct(summary):
+    summary["feedback_pct"] = feedback_pct(summary["feedback_given"], summary["feedback_total"])
+    return summary
+
+
+def cap_tools(tool_summary, max_categories=MAX_TOOL_CATEGORIES):
+    """
+    Keep the `max_categories` - 1 tools with the most queries (in their original order) and
+    merge the rest into one "Other" row with summed counts and its own feedback %.
+    """
+    if max_categories <= 0 or len(tool_summary) <= max_categories:
+        return tool_summary
+    keep = tool_summary["total_queries"].rank(method="first", ascending=False) < max_categories
+    other = tool_summary.loc[~keep, _MEASURES].sum().to_frame().T
+    other.insert(0, "tool", OTHER_LABEL)
+    kept = tool_summary.loc[keep, ["tool"] + _MEASURES].astype({"tool": object})
+    return _with_pct(pd.concat([kept, other], ignore_index=True))
+
+
+def bucket_weeks(weekly_summary, max_categories=MAX_WEEK_CATEGORIES):
+    """
+    Merge runs of consecutive weeks so at most `max_categories` remain, each labelled with its
+    first and last week; counts are summed and the feedback % recomputed.
+    """
+    if max_categories <= 0 or len(weekly_summary) <= max_categories:
+        return weekly_summary
+    size = math.ceil(len(weekly_summary) / max_categories)
+    buckets = pd.RangeIndex(len(weekly_summary)) // size
+    labels = weekly_summary["year_week_label"].astype(str).groupby(buckets)
+    summary = weekly_summary[_MEASURES].groupby(buckets).sum().reset_index(drop=True)
+    summary.insert(0, "year_week_label", (labels.first() + " – " + labels.last()).to_numpy())
+    return _with_pct(summary)
+
+
+def _line_trace(points, **kwargs):
+    # Scattergl draws on one canvas instead of one SVG node per marker
+    return go.Scattergl(**kwargs) if points >= WEBGL_MIN_POINTS else go.Scatter(**kwargs)
+
+
+def _digest(frame):
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes() + repr(list(frame.columns)).encode()).hexdigest()
+
+
+def cached_figure(result_cache, name, data, build, *args):
+    """
+    `build(data, *args)`, built once per aggregated input and arguments and shared through
+    `result_cache` by every filter state, and every dataset version, that produces the same
+    chart. The figure is cached as built, so st.plotly_chart serializes it without validating it again.
+    Returns the figure (shared, never modify it), its JSON size in bytes and whether it came
+    from the cache.
+    """
+    key = ("figure", name, _digest(data), args, MAX_WEEK_CATEGORIES, MAX_TOOL_CATEGORIES, WEBGL_MIN_POINTS)
+    entry = result_cache.get(key)
+    if entry is not None:
+        return entry + (True,)
+    figure = build(data, *args)
+    entry = (figure, len(pio.to_json(figure, validate=False)))
+    result_cache.put(key, entry)
+    return entry + (False,)
+
+
+def build_tool_figure(tool_summary):
+    """
+    Graph 1: feedback % (bars) and total queries (line) per tool, capped at MAX_TOOL_CATEGORIES.
+    """
+    tools = len(tool_summary)
+    tool_summary = cap_tools(tool_summary, MAX_TOOL_CATEGORIES)
+    xaxis_title = "Tool"
+    if len(tool_summary) < tools:
+        xaxis_title = f"Tool (top {len(tool_summary) - 1} of {tools} by queries, the rest in {OTHER_LABEL})"
+    fig_tool_analysis = go.Figure()
+    fig_tool_analysis.add_trace(go.Bar(
+        x=tool_summary["tool"],
+        y=tool_summary["feedback_pct"],
+        name="Feedback %",
+        marker_color=synopsys_palette[8],
+        yaxis="y1"
+    ))
+    fig_tool_analysis.add_trace(_line_trace(
+        len(tool_summary),
+        x=tool_summary["tool"],
+        y=tool_summary["total_queries"],
+        mode="lines+markers",
+        name="Total Queries",
+        line=dict(color=synopsys_palette[3], width=3),
+        yaxis="y2"
+    ))
+    fig_tool_analysis.update_layout(
+        title="Tool Usage Analysis",
+        xaxis_title=xaxis_title,
+        yaxis=dict(title="Queries / Users", side="left"),
+        yaxis2=dict(title="Feedback %", overlaying="y", side="right"),
+        font=dict(size=16),
+        barmode="group",
+        legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
+    )
+    return fig_tool_analysis
+
+
+def build_weekly_figure(weekly_summary):
+    """
+    Graph 2: weekly feedback % (bars) and total queries (line), bucketed to MAX_WEEK_CATEGORIES.
+    """
+    weeks = len(weekly_summary)
+    weekly_summary = bucket_weeks(weekly_summary, MAX_WEEK_CATEGORIES)
+    xaxis_title = "Week"
+    if len(weekly_summary) < weeks:
+        xaxis_title = f"Week ({weeks} weeks merged into {len(weekly_summary)} periods)"
+    fig_weekly = go.Figure()
+
+    # Add Feedback % as bar chart
+    fig_weekly.add_trace(go.Bar(
+        x=weekly_summary["year_week_label"],
+        y=weekly_summary["feedback_pct"],
+        name="Feedback %",
+        marker_color=synopsys_palette[-1],
+        yaxis="y1"
+    ))
+
+    # Add Total Queries as line chart
+    fig_weekly.add_trace(_line_trace(
+        len(weekly_summary),
+        x=weekly_summary["year_week_label"],
+        y=weekly_summary["total_queries"],
+        name="Total Queries",
+        mode="lines+markers",
+        line=dict(color=synopsys_palette[5], width=3),
+        yaxis="y2"
+    ))
+
+    fig_weekly.update_layout(
+        title="Weekly Total Queries & Feedback % Trend",
+        xaxis_title=xaxis_title,
+        yaxis=dict(title="Total Queries", side="left"),
+        yaxis2=dict(title="Feedback %", overlaying="y", side="right"),
+        font=dict(size=16),
+        legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
+    )
+    return fig_weekly
+
+
+def build_feedback_figure(ka_feedback, title):
+    """
+    Graph 3: feedback type distribution pie.
+    """
+    fig_ka_feedback = px.pie(
+        ka_feedback, names="Feedback Type", values="Count",
+        title=title,
+        color_discrete_sequence=synopsys_palette
+    )
+    fig_ka_feedback.update_layout(
+        font=dict(size=16),
+        legend=dict(orientation="v", yanchor="top", y=1, xanchor="left", x=1.05)
+    )
+    return fig_ka_feedback
@@ -1,111 +1,242 @@
-import pandas as pd
+import os
+import time
 import streamlit as st
-from typing import Optional
+import pyarrow as pa
+from utils.backends import QUERY_ENGINES, DuckDBEngine, PandasEngine
+from utils.dataset import Dataset
+from utils.dimensions import build_dimensions
+from utils.instrumentation import count_miss, stage
+from utils.ingest import MissingColumnsError, combined_version, ingest_sources, resolve_sources, workbook_signature
+from utils.memory import PeakMemory
+from utils.readers import DEFAULT_CHUNK_ROWS
+from utils.filter_index import FilterIndex, rollup_dimensions, row_dimensions
+from utils.refresher import DatasetRefresher
+from utils.result_cache import ResultCache
+from utils.rollup import build_rollup
+from utils.snapshot import read_snapshot_meta, read_snapshot_table
+from utils.user_search import USER_SEARCH_MIN_USERS, build_user_search
 
-# Utility to remove unwanted Excel junk columns
-def clean_excel(df):
-    return df.loc[:, ~df.columns.str.contains("^Unnamed")]
+# Path of the KA export workbook, a directory of workbooks or a glob such as r"C:\KA\*.xlsx"
+# (can also be set through the KA_EXCEL_PATH environment variable)
+EXCEL_PATH = os.environ.get("KA_EXCEL_PATH", r"PASTE_YOUR_EXCEL_FILE_PATH_HERE")
+# Sheet to read from every workbook; several can be comma-separated, "*" reads all sheets
+SHEET_NAME = os.environ.get("KA_SHEET_NAME", "Sheet1")
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def load_ka_data():
+# Excel parser: "calamine" (fast, needs python-calamine), "openpyxl" (streaming) or "auto"
+EXCEL_ENGINE = os.environ.get("KA_EXCEL_ENGINE", "auto")
+# Rows parsed and typed per chunk; bounds peak memory while reading
+EXCEL_CHUNK_ROWS = int(os.environ.get("KA_EXCEL_CHUNK_ROWS", DEFAULT_CHUNK_ROWS))
+
+# Processes parsing stale workbooks/sheets in parallel; 0 means one per CPU core
+INGEST_WORKERS = int(os.environ.get("KA_INGEST_WORKERS", "0"))
+
+# Engine answering the dashboard queries: "pandas" (in-memory rollup cube) or "duckdb"
+# (SQL over the memory-mapped snapshots, needs the duckdb package)
+QUERY_ENGINE = os.environ.get("KA_QUERY_ENGINE", "pandas")
+
+# Default of the "Approximate unique users" toggle: HyperLogLog estimates instead of exact counts
+APPROX_UNIQUE_USERS = os.environ.get("KA_APPROX_UNIQUE_USERS", "0") == "1"
+
+# Memory budget of the filter-result cache shared by all sessions
+RESULT_CACHE_MB = int(os.environ.get("KA_RESULT_CACHE_MB", "256"))
+
+# The KA export only grows; when on, only rows appended since the last snapshot are parsed
+INCREMENTAL_INGEST = os.environ.get("KA_INCREMENTAL_INGEST", "1") != "0"
+
+# Seconds between background checks of the workbooks for changes; 0 turns background refresh off
+REFRESH_SECONDS = int(os.environ.get("KA_REFRESH_SECONDS", "60"))
+
+def ingest_ka_dataset(on_progress=None):
     """
-    Loads and cleans the main KA data Excel file with optimizations for large datasets.
+    Loads and cleans the KA data with optimizations for large datasets.
+
+    EXCEL_PATH may name one workbook, a directory of workbooks or a glob pattern, and SHEET_NAME
+    one sheet, several (comma-separated) or "*"; all of them are combined into one frame.
+    Each sheet is kept as a local columnar snapshot and only parsed again when its workbook
+    changes (see utils/snapshot.py); stale sheets are parsed in parallel (see utils/ingest.py).
+
+    No Streamlit calls: this also runs on the background refresher thread.
+    """
+    sources = resolve_sources(EXCEL_PATH, SHEET_NAME)
+    if not sources:
+        raise FileNotFoundError(EXCEL_PATH)
+    with PeakMemory() as peak, stage("ingest") as record:
+        df, reports = ingest_sources(
+            sources,
+            engine=EXCEL_ENGINE,
+            chunk_rows=EXCEL_CHUNK_ROWS,
+            incremental=INCREMENTAL_INGEST,
+            workers=INGEST_WORKERS,
+            on_progress=on_progress,
+        )
+        record.rows_out = len(df)
+        record.extra["sources"] = {mode: sum(r["mode"] == mode for r in reports) for mode in ("snapshot", "delta", "full")}
+
+    # Snapshots carry a content-based version; fall back to a load-time one if one could not be written
+    df.attrs.setdefault("dataset_version", f"unsaved-{time.time():.0f}")
+    return Dataset(df, reports=reports, peak_mb=peak.delta_mb if peak.available else None)
+
+def load_first_dataset():
     """
+    The first load of the server process, run in the requesting session with a progress bar.
+    """
+    count_miss("load_ka_dataset")
     # Show loading progress
     with st.spinner("Loading data..."):
-        # Read Excel with optimized settings for large files
+        progress = st.progress(0.0, text="Loading data...")
         try:
-            df = pd.read_excel(
-                r"PASTE_YOUR_EXCEL_FILE_PATH_HERE", 
-                sheet_name="Sheet1",
-                engine='openpyxl',  # More memory efficient for large files
-                dtype_backend='pyarrow'  # Use PyArrow for better performance
-            )
+            dataset = ingest_ka_dataset(on_progress=lambda fraction, text: progress.progress(fraction, text=text))
         except FileNotFoundError:
-            st.error("❌ Excel file not found! Please update the file path in utils/data_loader.py (line 18)")
+            st.error("❌ Excel file not found! Please update EXCEL_PATH in utils/data_loader.py")
+            st.stop()
+        except MissingColumnsError as e:
+            st.error(f"❌ Missing required columns: {e.missing}")
+            st.error(f"Available columns: {e.available}")
             st.stop()
         except Exception as e:
             st.error(f"❌ Error loading Excel file: {str(e)}")
             st.stop()
-        
-        # Clean up Excel artifacts
-        df = clean_excel(df)
-        
-        # Optimize data types to reduce memory usage
-        df = optimize_dtypes(df)
-        
-        # Validate required columns
-        required_columns = ["Date", "Username", "tool", "metadata.feedback_rating"]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            st.error(f"❌ Missing required columns: {missing_columns}")
-            st.error(f"Available columns: {list(df.columns)}")
-            st.stop()
-        
-        # Log successful data loading for large datasets
-        st.success(f"✅ Data loaded successfully! {len(df):,} rows, {len(df.columns)} columns")
-        
-        # Normalize data types
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df["metadata.feedback_rating"] = df["metadata.feedback_rating"].astype(str).str.lower()
-        
-        # Create year_week_label if it doesn't exist
-        if "year_week_label" not in df.columns:
-            df["year_week_label"] = df["Date"].dt.strftime('%Y-W%U')
-        
-        # Validate data integrity for large datasets
-        null_dates = df["Date"].isnull().sum()
-        if null_dates > 0:
-            st.warning(f"⚠️ Found {null_dates:,} rows with invalid dates - these will be excluded from analysis")
-        
-        # Log data quality metrics
-        st.info(f"📊 Data Quality: {df['Username'].nunique():,} unique users, {df['tool'].nunique()} unique tools, Date range: {df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}")
-        
-    return df
-
-def optimize_dtypes(df):
-    """
-    Optimize data types to reduce memory usage for large datasets (lakhs+ rows).
-    """
-    original_memory = df.memory_usage(deep=True).sum() / 1024 / 1024
-    
-    # Convert object columns to category where appropriate
-    for col in df.columns:
-        if df[col].dtype == 'object':
-            # If column has many repeated values, convert to category
-            unique_ratio = df[col].nunique() / len(df)
-            if unique_ratio < 0.5:  # Less than 50% unique values
-                df[col] = df[col].astype('category')
-    
-    # Convert numeric columns to appropriate types
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns
-    for col in numeric_cols:
-        if df[col].dtype == 'int64':
-            # Downcast integers
-            df[col] = pd.to_numeric(df[col], downcast='integer')
-        elif df[col].dtype == 'float64':
-            # Downcast floats
-            df[col] = pd.to_numeric(df[col], downcast='float')
-    
-    # Optimize datetime columns
-    for col in df.columns:
-        if df[col].dtype == 'datetime64[ns]':
-            # Convert to datetime64[ns] with timezone if needed
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-    
-    optimized_memory = df.memory_usage(deep=True).sum() / 1024 / 1024
-    memory_saved = original_memory - optimized_memory
-    memory_reduction = (memory_saved / original_memory * 100) if original_memory > 0 else 0
-    
-    if memory_saved > 10:  # Only show if significant memory saved
-        st.info(f"💾 Memory optimization: {memory_saved:.1f} MB saved ({memory_reduction:.1f}% reduction)")
-    
-    return df
-
-@st.cache_data
+        progress.empty()
+        warm_dataset(dataset)
+    return dataset
+
+def warm_dataset(dataset):
+    """
+    Builds the derived values every rerun needs, so a refreshed dataset is ready before it is served.
+    """
+    dataset.derived("data_summary", get_data_summary)
+    dataset.derived("data_quality", get_data_quality)
+    if len(load_dimensions(dataset)["users"]) > USER_SEARCH_MIN_USERS:
+        load_user_search(dataset)
+    engine = load_query_engine(dataset)
+    if APPROX_UNIQUE_USERS and isinstance(engine, PandasEngine):
+        engine.user_sketches()
+
+@st.cache_resource
+def get_dataset_refresher():
+    """
+    Process-wide holder of the served dataset, refreshed in the background (see utils/refresher.py).
+    """
+    return DatasetRefresher(
+        build=ingest_ka_dataset,
+        signature=lambda: workbook_signature(EXCEL_PATH),
+        interval=REFRESH_SECONDS,
+        warm=warm_dataset,
+    )
+
+def load_ka_dataset():
+    """
+    The KA data served to this rerun: one read-only Dataset shared by every session of the server
+    process (see utils/dataset.py). Only the very first request waits for a load; later changes
+    to the workbooks are picked up in the background and swapped in when ready.
+    """
+    dataset = get_dataset_refresher().get(load_first_dataset)
+    report_ingest(dataset)
+    return dataset
+
+def load_rollup(dataset):
+    """
+    The week × tool × user rollup cube of the dataset (see utils/rollup.py), built once.
+    """
+    return dataset.derived("rollup", build_rollup)
+
+def load_dimensions(dataset):
+    """
+    Filter widget options and the Username -> tools mapping (see utils/dimensions.py), built once.
+    """
+    return dataset.derived("dimensions", build_dimensions)
+
+def load_user_search(dataset):
+    """
+    Search index behind the KA User filter of large user lists (see utils/user_search.py), built once.
+    """
+    return dataset.derived("user_search", lambda frame: build_user_search(frame, load_dimensions(dataset)["users"]))
+
+def load_row_index(dataset):
+    """
+    Filter index of the raw rows, built once per dataset and shared by all sessions.
+    """
+    return dataset.derived("row_index", lambda frame: FilterIndex(row_dimensions(frame)))
+
+def load_query_engine(dataset):
+    """
+    The query engine (see utils/backends.py) of the dataset, built once.
+    """
+    if QUERY_ENGINE not in QUERY_ENGINES:
+        raise ValueError(f"Unknown query engine {QUERY_ENGINE!r}, expected one of {QUERY_ENGINES}")
+
+    def build(frame):
+        if QUERY_ENGINE == "duckdb":
+            # Read straight from the memory-mapped snapshots when they match the loaded data
+            return DuckDBEngine(snapshot_tables(dataset.version) or [pa.Table.from_pandas(frame, preserve_index=False)])
+        rollup = load_rollup(dataset)
+        # Named users (the KA User default) get their own sketches, see utils/sketches.py
+        named_users = set(load_dimensions(dataset)["users"])
+        return PandasEngine(rollup, FilterIndex(rollup_dimensions(rollup)), user_groups=[named_users])
+
+    return dataset.derived("query_engine", build)
+
+def snapshot_tables(dataset_version):
+    """
+    Memory-mapped Arrow tables of the snapshots behind `dataset_version`, or None when the
+    snapshots on disk do not (or no longer) match it.
+    """
+    tables, versions = [], []
+    for source in resolve_sources(EXCEL_PATH, SHEET_NAME):
+        meta = read_snapshot_meta(*source)
+        table = read_snapshot_table(*source) if meta is not None else None
+        if table is None:
+            return None
+        tables.append(table)
+        versions.append(meta["sha256"][:12])
+    if not tables or combined_version(versions) != dataset_version:
+        return None
+    return tables
+
+@st.cache_resource
+def get_result_cache():
+    """
+    Process-wide LRU cache of per-filter-state metrics, summaries and figures (see utils/result_cache.py).
+    """
+    return ResultCache(RESULT_CACHE_MB * 1024 * 1024)
+
+def report_ingest(dataset):
+    """
+    Shows what each source went through (incremental refresh, full parse, recovered problems),
+    the peak memory used while parsing next to the size of the resulting frame, and data quality.
+    """
+    df = dataset.view()
+    reports = dataset.reports
+    for report in reports:
+        for warning in report["warnings"]:
+            st.warning(f"⚠️ {warning}")
+    delta = [r for r in reports if r["mode"] == "delta"]
+    if delta:
+        new_rows = sum(r["new_rows"] for r in delta)
+        st.info(f"➕ Incremental refresh: {new_rows:,} new rows added to {len(df) - new_rows:,} existing rows")
+    parsed = [r for r in reports if r["mode"] in ("full", "delta")]
+    if len(reports) > 1 and parsed:
+        st.info(f"📚 {len(reports)} sheets combined, {len(parsed)} parsed from Excel")
+    worker_peaks = [r["peak_mb"] for r in parsed if r.get("peak_mb") is not None]
+    if parsed and (dataset.peak_mb is not None or worker_peaks):
+        peak_mb = max(worker_peaks + ([dataset.peak_mb] if dataset.peak_mb is not None else []))
+        final_mb = dataset.derived("data_summary", get_data_summary)["memory_usage_mb"]
+        st.info(f"💾 Memory: peak {peak_mb:.1f} MB above baseline during load, final data {final_mb:.1f} MB")
+
+    # Log successful data loading for large datasets
+    st.success(f"✅ Data loaded successfully! {len(df):,} rows, {len(df.columns)} columns")
+
+    # Validate data integrity for large datasets
+    quality = dataset.derived("data_quality", get_data_quality)
+    if quality["null_dates"] > 0:
+        st.warning(f"⚠️ Found {quality['null_dates']:,} rows with invalid dates - these will be excluded from analysis")
+
+    # Log data quality metrics
+    st.info(quality["message"])
+
 def get_data_summary(df):
     """
-    Get summary statistics for the dataset.
+    Get summary statistics for the dataset (computed once per dataset, see Dataset.derived).
     """
     return {
         'total_rows': len(df),
@@ -114,4 +245,13 @@ def get_data_summary(df):
         'date_range': f"{df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
         'unique_users': df['Username'].nunique(),
         'unique_tools': df['tool'].nunique()
-    }
\ No newline at end of file
+    }
+
+def get_data_quality(df):
+    """
+    Invalid dates and headline counts shown after loading.
+    """
+    return {
+        'null_dates': int(df["Date"].isnull().sum()),
+        'message': f"📊 Data Quality: {df['Username'].nunique():,} unique users, {df['tool'].nunique()} unique tools, Date range: {df['Date'].min().strftime('%Y-%m-%d')} to {df['Date'].max().strftime('%Y-%m-%d')}",
+    }
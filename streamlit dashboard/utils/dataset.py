@@ -0,0 +1,55 @@
+import threading
+import time
+
+from utils.instrumentation import count_miss
+
+
+class Dataset:
+    """
+    The loaded KA data, shared read-only by every session of the server process: the process
+    holds one copy of the rows and each session works on a shallow view of it.
+
+    Sessions never get the frame itself but a view (see `view`), and values derived from the
+    data (summaries, filter domains, ...) are built once per dataset through `derived`.
+    """
+
+    def __init__(self, frame, reports=(), peak_mb=None):
+        self._frame = frame
+        # How the data was loaded: one report per source (see utils/ingest.py) and the peak memory
+        self.reports = list(reports)
+        self.peak_mb = peak_mb
+        self.version = frame.attrs.get("dataset_version")
+        self.loaded_at = time.time()
+        self._derived = {}
+        # One lock per derived value, so building one never blocks readers of the others
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def view(self):
+        """
+        A shallow copy sharing every column buffer with the dataset; nothing is copied. Columns
+        a session adds, replaces or drops stay local to its view, but values must never be
+        written in place: before pandas 3 (no copy-on-write) that would change the shared data.
+        """
+        return self._frame.copy(deep=False)
+
+    def __len__(self):
+        return len(self._frame)
+
+    def derived(self, name, build):
+        """
+        Value `name` computed by `build(frame)` on first use and shared afterwards. `build` may
+        itself use other derived values. Concurrent first uses of the same name wait for a single
+        build; values already built are returned without taking any lock.
+        """
+        try:
+            return self._derived[name]
+        except KeyError:
+            pass
+        with self._locks_lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            if name not in self._derived:
+                count_miss(name)
+                self._derived[name] = build(self._frame)
+            return self._derived[name]
@@ -0,0 +1,52 @@
+import hmac
+import os
+
+import pandas as pd
+import streamlit as st
+
+from utils.instrumentation import METRICS_LOG, cache_hit_rates, current_trace, latency_percentiles, recent_reruns
+
+# The panel is shown when the page is opened with ?admin=<KA_ADMIN_TOKEN>; unset = never shown
+ADMIN_TOKEN = os.environ.get("KA_ADMIN_TOKEN", "")
+
+
+def is_admin():
+    """
+    Whether this session may see the performance panel.
+    """
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(st.query_params.get("admin", ""), ADMIN_TOKEN)
+
+
+def render_debug_panel(result_cache=None):
+    """
+    Admin-only expander with the stages of the current rerun, p50/p95 latencies and cache hit rates
+    of the recent reruns of this server process.
+    """
+    trace = current_trace()
+    records = recent_reruns()
+    with st.expander("🛠 Performance (admin)"):
+        if trace is not None:
+            st.markdown("**This rerun**")
+            st.dataframe(pd.DataFrame([s.to_dict() for s in trace.stages]), hide_index=True)
+
+        st.markdown(f"**Latency over the last {len(records):,} reruns (ms)**")
+        percentiles = latency_percentiles(records)
+        if percentiles:
+            st.dataframe(pd.DataFrame.from_dict(percentiles, orient="index"))
+        else:
+            st.caption("No finished reruns yet.")
+
+        rates = cache_hit_rates(records)
+        if rates:
+            st.markdown("**Cache hit rate**")
+            st.dataframe(pd.DataFrame({"hit_rate": rates}).style.format("{:.0%}"))
+        if result_cache is not None:
+            stats = result_cache.stats()
+            st.caption(
+                f"Result cache: {stats['entries']:,} entries, {stats['used_mb']:.1f} / {stats['max_mb']:.0f} MB, "
+                f"{stats['hits']:,} hits, {stats['misses']:,} misses"
+            )
+        if METRICS_LOG:
+            st.caption(f"Metrics log: {METRICS_LOG}")
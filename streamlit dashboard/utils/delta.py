@@ -0,0 +1,110 @@
+import datetime
+import hashlib
+import math
+
+import pandas as pd
+
+from utils.readers import concat_frames, header_names, iter_sheet_rows, rows_to_frame
+
+
+def _normalize_cell(value):
+    """
+    Render a cell value the same way whether it came from pandas or straight from openpyxl.
+    """
+    if value is None or value is pd.NA or value is pd.NaT:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return pd.Timestamp(value).isoformat()
+    return str(value)
+
+
+def row_fingerprint(values):
+    """
+    Hash one raw row so a later ingest can check that the rows it already has are unchanged.
+    """
+    joined = "\x1f".join(_normalize_cell(v) for v in values)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def build_watermark(raw_tail, rows=None, max_date=None):
+    """
+    High-water mark of ingested KA rows: how many rows were ingested, which columns they had
+    and what the last one looked like.
+
+    `raw_tail` holds raw (cleaned, not yet normalized) rows ending with the last ingested row;
+    `rows` and `max_date` default to its own length and largest Date.
+    """
+    if max_date is None and "Date" in raw_tail.columns and len(raw_tail):
+        max_date = pd.to_datetime(raw_tail["Date"], errors="coerce").max()
+    return {
+        "columns": [str(c) for c in raw_tail.columns],
+        "rows": len(raw_tail) if rows is None else rows,
+        "last_row": row_fingerprint(raw_tail.iloc[-1].tolist()) if len(raw_tail) else None,
+        "max_date": None if max_date is None or pd.isna(max_date) else pd.Timestamp(max_date).isoformat(),
+    }
+
+
+def advance_watermark(watermark, raw_delta):
+    """
+    Move a watermark past the rows of a freshly ingested delta.
+    """
+    delta_mark = build_watermark(raw_delta)
+    max_dates = [d for d in (watermark.get("max_date"), delta_mark["max_date"]) if d]
+    return {
+        "columns": watermark["columns"],
+        "rows": watermark["rows"] + len(raw_delta),
+        "last_row": delta_mark["last_row"] or watermark["last_row"],
+        "max_date": max(max_dates) if max_dates else None,
+    }
+
+
+def read_appended_rows(path, sheet_name, watermark, dtype=None, engine="auto"):
+    """
+    Read only the rows appended to the workbook since `watermark` was taken.
+
+    Columns listed in `dtype` are built in that type, like the `dtype` argument of read_excel.
+    Returns a raw DataFrame (possibly empty) of the new rows, or None when the workbook was
+    changed in any other way (different header, fewer rows, or a different last known row)
+    or does not record its row count, in which case the caller must fall back to a full reload.
+    """
+    known_rows = watermark["rows"]
+    if not known_rows:
+        return None
+
+    # Data row N lives on sheet row N + 1 (row 1 is the header); start at the last known row
+    rows = iter_sheet_rows(path, sheet_name, engine=engine, skip_rows=known_rows - 1)
+    try:
+        total = next(rows)
+        if total is None or total < known_rows:
+            return None
+        header = header_names(next(rows, ()))
+        try:
+            positions = [header.index(col) for col in watermark["columns"]]
+        except ValueError:
+            return None
+
+        last_known = next(rows, None)
+        if last_known is None:
+            return None
+        pick = lambda row: [row[i] if i < len(row) else None for i in positions]
+        if row_fingerprint(pick(last_known)) != watermark["last_row"]:
+            return None
+        new_rows = [pick(row) for row in rows if any(v is not None for v in row)]
+    finally:
+        rows.close()
+
+    return rows_to_frame(new_rows, watermark["columns"], dtype)
+
+
+def merge_delta(base, delta):
+    """
+    Append typed delta rows to the typed base frame.
+
+    Categorical dictionaries are unioned, so values seen only in the delta stay categorical.
+    """
+    return concat_frames([base, delta.reindex(columns=base.columns)])
@@ -0,0 +1,74 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import iso_years
+
+# Month number -> name, as offered by the Month filter
+MONTH_LABELS = {i: calendar.month_name[i] for i in range(1, 13)}
+
+# Weeks selected by default: the most recent ones
+DEFAULT_WEEKS = 10
+
+
+def build_dimensions(df):
+    """
+    Everything the filter widgets need, computed once per dataset so building the filter UI does
+    not scan the rows on every rerun:
+
+    users          sorted Usernames that have a Full Name (options of the KA User filter)
+    tools          tools in order of first appearance
+    weeks          sorted week labels, and default_weeks the last DEFAULT_WEEKS of them
+    years          sorted ISO years
+    months         MONTH_LABELS
+    min_date / max_date
+    user_tools     Username -> sorted tools the user asked about (see tools_for_users)
+    """
+    weeks = sorted(df["year_week_label"].dropna().unique())
+    return {
+        "users": sorted(df.loc[df["Full Name"].notna(), "Username"].dropna().unique()),
+        "tools": df["tool"].dropna().unique().tolist(),
+        "weeks": weeks,
+        "default_weeks": weeks[-DEFAULT_WEEKS:],
+        "years": sorted(iso_years(df["Date"]).dropna().unique()),
+        "months": MONTH_LABELS,
+        "min_date": df["Date"].min(),
+        "max_date": df["Date"].max(),
+        "user_tools": user_tool_map(df["Username"], df["tool"]),
+    }
+
+
+def user_tool_map(users, tools):
+    """
+    {user: sorted list of the tools found on that user's rows}, from one pass over the code arrays.
+    """
+    user_codes, user_values = pd.factorize(users)
+    tool_codes, tool_values = pd.factorize(tools)
+    if not len(tool_values):
+        return {}
+    # Renumber tools in name order so that sorting the pairs sorts each user's tools by name
+    order = sorted(range(len(tool_values)), key=lambda i: tool_values[i])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    valid = (user_codes >= 0) & (tool_codes >= 0)
+    pairs = np.unique(user_codes[valid].astype(np.int64) * len(order) + rank[tool_codes[valid]])
+    if not len(pairs):
+        return {}
+    pair_users, pair_tools = np.divmod(pairs, len(order))
+    names = np.asarray(tool_values, dtype=object)[order]
+    bounds = np.flatnonzero(np.diff(pair_users)) + 1
+    return {
+        user_values[group[0]]: names[tool_ranks].tolist()
+        for group, tool_ranks in zip(np.split(pair_users, bounds), np.split(pair_tools, bounds))
+    }
+
+
+def tools_for_users(dimensions, users):
+    """
+    Sorted tools used by any of `users`, answered from the precomputed mapping.
+    """
+    user_tools = dimensions["user_tools"]
+    if len(users) == 1:
+        return list(user_tools.get(users[0], []))
+    return sorted(set().union(*(user_tools.get(user, ()) for user in users)))
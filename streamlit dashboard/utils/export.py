@@ -0,0 +1,72 @@
+import gzip
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows converted per chunk; keeps the export's extra memory bounded regardless of filter size
+EXPORT_CHUNK_ROWS = 100_000
+
+EXPORT_FORMATS = {
+    "CSV": ("filtered_data.csv", "text/csv"),
+    "CSV (gzip)": ("filtered_data.csv.gz", "application/gzip"),
+    "Parquet": ("filtered_data.parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_export_chunks(df, row_ids, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Yield the selected rows of `df` chunk by chunk, never materializing the whole selection.
+    """
+    for start in range(0, len(row_ids), chunk_rows):
+        yield df.take(row_ids[start:start + chunk_rows])
+
+
+def write_csv(df, row_ids, fh, compress=False):
+    """
+    Stream the selected rows as (optionally gzip-compressed) UTF-8 CSV into `fh`.
+    """
+    target = gzip.GzipFile(fileobj=fh, mode="wb", compresslevel=6) if compress else fh
+    header = True
+    for chunk in iter_export_chunks(df, row_ids):
+        # Ensure all columns are string-compatible for export; only CSV needs it, Parquet keeps
+        # the typed column so missing comments stay nulls
+        if "metadata.feedback_comment" in chunk.columns:
+            chunk = chunk.assign(**{"metadata.feedback_comment": chunk["metadata.feedback_comment"].astype(str)})
+        target.write(chunk.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+    if header:
+        # No rows matched: still write the header line
+        target.write(df.iloc[:0].to_csv(index=False).encode("utf-8"))
+    if compress:
+        target.close()
+
+
+def write_parquet(df, row_ids, fh):
+    """
+    Stream the selected rows into `fh` as a Parquet file with one row group per chunk.
+    """
+    writer = None
+    for chunk in iter_export_chunks(df, row_ids):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(fh, table.schema, compression="zstd")
+        writer.write_table(table.cast(writer.schema))
+    if writer is None:
+        writer = pq.ParquetWriter(fh, pa.Table.from_pandas(df.iloc[:0], preserve_index=False).schema)
+    writer.close()
+
+
+def export_rows(df, row_ids, export_format):
+    """
+    Build the download for `export_format` (a key of EXPORT_FORMATS) as a rewound in-memory file.
+
+    Only the encoded output is held in full; rows are converted one chunk at a time.
+    """
+    fh = io.BytesIO()
+    if export_format == "Parquet":
+        write_parquet(df, row_ids, fh)
+    else:
+        write_csv(df, row_ids, fh, compress=export_format == "CSV (gzip)")
+    fh.seek(0)
+    return fh
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from utils.schema import iso_years
+
+# Dimensions with more distinct values than this also get sorted row-id lists, so selecting
+# a handful of users or weeks touches only their rows instead of scanning every code
+POSTINGS_MIN_CARDINALITY = 64
+
+
+def _compact_codes(codes, cardinality):
+    for dtype in ("int8", "int16", "int32"):
+        if cardinality < np.iinfo(dtype).max:
+            return codes.astype(dtype)
+    return codes.astype("int64")
+
+
+class _Dimension:
+    """
+    One filterable column: sorted distinct values, a compact integer code per row and,
+    for high-cardinality columns, the row ids of every value (CSR layout).
+    """
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=True)
+        self.values = pd.Index(uniques)
+        self.codes = _compact_codes(codes, len(uniques))
+        self.rows = None
+        self.offsets = None
+        if len(uniques) > POSTINGS_MIN_CARDINALITY:
+            self.rows = np.argsort(codes, kind="stable").astype("int32")
+            self.offsets = np.searchsorted(codes[self.rows], np.arange(len(uniques) + 1))
+
+    def lookup(self, selected):
+        positions = self.values.get_indexer(pd.Index(list(selected)))
+        return np.unique(positions[positions >= 0])
+
+    def mask_for_codes(self, selected_codes):
+        n = len(self.codes)
+        mask = np.zeros(n, dtype=bool)
+        if len(selected_codes) == 0:
+            return mask
+        if self.rows is not None:
+            hits = int((self.offsets[selected_codes + 1] - self.offsets[selected_codes]).sum())
+            if hits < n // 8:
+                mask[np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in selected_codes])] = True
+                return mask
+        # Boolean lookup table indexed by code; the trailing False slot catches the -1 (missing) code
+        table = np.zeros(len(self.values) + 1, dtype=bool)
+        table[selected_codes] = True
+        return table[self.codes]
+
+    def mask_for_values(self, selected):
+        return self.mask_for_codes(self.lookup(selected))
+
+    def mask_for_range(self, low, high):
+        # Values are sorted, so a value range is a contiguous code range
+        first = self.values.searchsorted(low, side="left")
+        last = self.values.searchsorted(high, side="right")
+        return (self.codes >= first) & (self.codes < last)
+
+
+class FilterIndex:
+    """
+    Load-time filter index over a frame: integer codes (and row-id lists) per dimension.
+
+    A filter selection becomes one AND over per-dimension masks, followed by a single
+    `take` of the matching rows, instead of one boolean-index copy per filter.
+    """
+
+    def __init__(self, dimensions):
+        self.dimensions = {name: _Dimension(values) for name, values in dimensions.items()}
+        self.size = len(next(iter(self.dimensions.values())).codes) if self.dimensions else 0
+
+    def values(self, name):
+        """
+        Sorted distinct values of a dimension.
+        """
+        return self.dimensions[name].values
+
+    def mask(self, selections=None, ranges=None):
+        """
+        Boolean row mask for `selections` ({dimension: allowed values}) and
+        `ranges` ({dimension: (low, high)}, both ends inclusive).
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for name, selected in (selections or {}).items():
+            mask &= self.dimensions[name].mask_for_values(selected)
+        for name, (low, high) in (ranges or {}).items():
+            mask &= self.dimensions[name].mask_for_range(low, high)
+        return mask
+
+    def take(self, frame, selections=None, ranges=None):
+        """
+        Rows of `frame` (the frame the index was built from) matching the selections.
+        """
+        return frame.take(np.flatnonzero(self.mask(selections, ranges)))
+
+
+def calendar_day_ranges(ranges):
+    """
+    `ranges` with the "day" bounds truncated to calendar dates (midnight timestamps).
+
+    The "day" dimension holds whole days, which the pandas engine compares as timestamps and
+    DuckDB as dates; normalizing the bounds once, before either engine sees them, makes a bound
+    with a time of day select the same days in both.
+    """
+    ranges = dict(ranges)
+    if "day" in ranges:
+        low, high = ranges["day"]
+        ranges["day"] = (pd.Timestamp(low).normalize(), pd.Timestamp(high).normalize())
+    return ranges
+
+
+def row_dimensions(df):
+    """
+    Filter dimensions of the raw KA rows (month and ISO year derived once here, not per rerun).
+    """
+    return {
+        "tool": df["tool"],
+        "Username": df["Username"],
+        "iso_year": iso_years(df["Date"]),
+        "month": df["Date"].dt.month,
+        "year_week_label": df["year_week_label"],
+        "day": df["Date"].dt.normalize(),
+    }
+
+
+def rollup_dimensions(cube):
+    """
+    Filter dimensions of the rollup cube (see utils/rollup.py).
+    """
+    return {name: cube[name] for name in ("tool", "Username", "iso_year", "month", "year_week_label", "day")}
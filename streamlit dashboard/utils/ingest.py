@@ -0,0 +1,342 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import openpyxl
+
+from utils.delta import advance_watermark, build_watermark, merge_delta, read_appended_rows
+from utils.memory import PeakMemory
+from utils.readers import DEFAULT_CHUNK_ROWS, concat_frames, iter_excel_chunks, python_calamine
+from utils.schema import REQUIRED_COLUMNS, apply_schema, read_dtypes
+from utils.snapshot import load_snapshot, read_snapshot_frame, read_snapshot_meta, source_fingerprint, write_snapshot
+
+# Files picked up when the Excel path is a directory
+WORKBOOK_PATTERNS = ("*.xlsx", "*.xlsm")
+
+# Sheet name meaning "every worksheet of every workbook"
+ALL_SHEETS = "*"
+
+# The dashboard folder, from which the ingestion workers import utils
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class MissingColumnsError(ValueError):
+    """
+    A KA sheet lacks one of the REQUIRED_COLUMNS.
+    """
+
+    def __init__(self, missing, available):
+        super().__init__(f"Missing required columns: {missing}")
+        self.missing = missing
+        self.available = available
+
+    def __reduce__(self):
+        # Raised in the ingestion workers and unpickled in the dashboard process
+        return type(self), (self.missing, self.available)
+
+
+# Utility to remove unwanted Excel junk columns
+def clean_excel(df):
+    return df.loc[:, ~df.columns.str.contains("^Unnamed")]
+
+
+def prepare_ka_frame(df):
+    """
+    Validates raw KA rows (a full sheet or an appended delta) and brings them to the schema types.
+    """
+    # Clean up Excel artifacts
+    df = clean_excel(df)
+
+    # Validate required columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise MissingColumnsError(missing_columns, list(df.columns))
+
+    # Finish typing: Date coercion, lower-cased feedback categories, compact numbers, year_week_label
+    return apply_schema(df)
+
+
+def read_ka_excel(path, sheet_name, engine="auto", chunk_rows=DEFAULT_CHUNK_ROWS, on_progress=None):
+    """
+    Streams one KA worksheet in chunks, building each column in its schema type
+    (utils/schema.py) as the chunks arrive, so peak memory stays bounded by the chunk size.
+
+    `on_progress(rows_read, total_rows)` is called after every chunk.
+    Returns the prepared frame and the watermark describing how far into the workbook it goes.
+    """
+    chunks = []
+    raw = None
+    for raw, rows_read, total_rows in iter_excel_chunks(
+        path,
+        sheet_name,
+        engine=engine,
+        chunk_rows=chunk_rows,
+        dtype=read_dtypes(),  # final dtypes applied while parsing, no wide intermediate frame
+    ):
+        chunks.append(prepare_ka_frame(raw))
+        if on_progress is not None:
+            on_progress(rows_read, total_rows)
+    if not chunks:
+        raise ValueError(f"No data found in sheet {sheet_name!r} of {path}")
+
+    df = concat_frames(chunks)
+    # The watermark describes the last chunk's raw rows, without the Excel junk columns
+    watermark = build_watermark(clean_excel(raw), rows=len(df), max_date=df["Date"].max())
+    return df, watermark
+
+
+def ingest_ka_delta(path, sheet_name, engine="auto"):
+    """
+    Extends the stored snapshot with the rows appended to the workbook since it was written.
+
+    Only the new rows are parsed and typed; returns (frame, number of new rows), or None when
+    there is no snapshot to extend or the workbook changed in a way other than appending rows.
+    """
+    meta = read_snapshot_meta(path, sheet_name)
+    if meta is None or not meta.get("watermark"):
+        return None
+    watermark = meta["watermark"]
+
+    fingerprint = source_fingerprint(path)
+    raw_delta = read_appended_rows(path, sheet_name, watermark, dtype=read_dtypes(), engine=engine)
+    if raw_delta is None or raw_delta.empty:
+        # Contents changed without new rows (edits in place): only a full reload is safe
+        return None
+
+    base = read_snapshot_frame(path, sheet_name, meta)
+    if base is None:
+        return None
+
+    delta = prepare_ka_frame(raw_delta)
+    df = merge_delta(base, delta)
+    write_snapshot(df, path, sheet_name, watermark=advance_watermark(watermark, raw_delta), fingerprint=fingerprint)
+    return df, len(delta)
+
+
+def refresh_sheet(path, sheet_name, engine="auto", chunk_rows=DEFAULT_CHUNK_ROWS, incremental=True, on_progress=None):
+    """
+    Bring the snapshot of one stale worksheet up to date: append new rows when possible,
+    otherwise parse the whole sheet, then persist the result.
+
+    Never touches Streamlit, so it can run in a worker process. Returns (frame, report);
+    problems that were recovered from are listed in report["warnings"].
+    """
+    report = {"path": path, "sheet": sheet_name, "mode": "full", "new_rows": 0, "peak_mb": None,
+              "snapshot_written": False, "warnings": []}
+
+    if incremental:
+        try:
+            with PeakMemory() as peak:
+                result = ingest_ka_delta(path, sheet_name, engine=engine)
+            if result is not None:
+                df, new_rows = result
+                report.update(mode="delta", rows=len(df), new_rows=new_rows, peak_mb=peak.delta_mb, snapshot_written=True)
+                return df, report
+        except Exception as e:
+            report["warnings"].append(f"Incremental refresh of {_label(path, sheet_name)} failed, re-reading it: {str(e)}")
+
+    fingerprint = source_fingerprint(path)
+    with PeakMemory() as peak:
+        df, watermark = read_ka_excel(path, sheet_name, engine=engine, chunk_rows=chunk_rows, on_progress=on_progress)
+    report.update(rows=len(df), peak_mb=peak.delta_mb)
+    try:
+        write_snapshot(df, path, sheet_name, watermark=watermark, fingerprint=fingerprint)
+        report["snapshot_written"] = True
+    except Exception as e:
+        report["warnings"].append(f"Could not write data snapshot of {_label(path, sheet_name)}: {str(e)}")
+    return df, report
+
+
+def _run_worker(todo, results, engine, chunk_rows, incremental, work_dir):
+    """
+    Start one `python -m utils.ingest_worker` process and have it refresh sources taken from the
+    `todo` queue until it is empty, putting (source, (frame or None, report)) or (source,
+    exception) on `results` for each.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_APP_DIR, os.environ.get("PYTHONPATH")])))
+    with open(os.path.join(work_dir, f"worker-{threading.get_ident()}.log"), "w+") as log:
+        process = source = None
+        try:
+            process = subprocess.Popen([sys.executable, "-m", "utils.ingest_worker"], env=env, text=True,
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log)
+            while True:
+                try:
+                    source = todo.get_nowait()
+                except queue.Empty:
+                    return
+                path, sheet_name = source
+                output = os.path.join(work_dir, hashlib.sha1(f"{path}|{sheet_name}".encode("utf-8")).hexdigest() + ".pkl")
+                request = dict(path=os.path.abspath(path), sheet=sheet_name, engine=engine, chunk_rows=chunk_rows,
+                               incremental=incremental, output=output)
+                process.stdin.write(json.dumps(request) + "\n")
+                process.stdin.flush()
+                reply = process.stdout.readline().strip()
+                if reply not in ("ok", "error"):
+                    log.seek(0)
+                    error = (log.read().strip().splitlines() or ["no output"])[-1]
+                    raise RuntimeError(f"Ingestion worker stopped while reading {_label(*source)}: {error}")
+                with open(output, "rb") as fh:
+                    results.put((source, pickle.load(fh)))
+        except Exception as e:
+            results.put((source, e))
+        finally:
+            if process is not None:
+                process.stdin.close()
+                process.wait()
+
+
+def _label(path, sheet_name):
+    return f"{os.path.basename(path)} [{sheet_name}]"
+
+
+def list_workbooks(path_spec):
+    """
+    Expand the Excel path setting: a single file, a directory of workbooks or a glob pattern.
+    """
+    if os.path.isdir(path_spec):
+        paths = [p for pattern in WORKBOOK_PATTERNS for p in glob.glob(os.path.join(path_spec, pattern))]
+    elif glob.has_magic(path_spec):
+        paths = glob.glob(path_spec, recursive=True)
+    else:
+        return [path_spec] if os.path.exists(path_spec) else []
+    # Skip Office lock files of workbooks that are open in Excel
+    return sorted(p for p in paths if os.path.isfile(p) and not os.path.basename(p).startswith("~$"))
+
+
+def workbook_signature(path_spec):
+    """
+    (path, size, modification time) of every workbook behind the Excel path setting; it changes
+    whenever a workbook is saved, added or removed.
+    """
+    signature = []
+    for path in list_workbooks(path_spec):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def list_sheets(path):
+    """
+    Names of the worksheets of one workbook.
+    """
+    if python_calamine is not None:
+        return list(python_calamine.CalamineWorkbook.from_path(path).sheet_names)
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def resolve_sources(path_spec, sheet_spec):
+    """
+    List the (workbook, sheet) pairs to ingest.
+
+    `sheet_spec` is one sheet name, a comma-separated list, or "*" for every sheet. With a list,
+    workbooks are only asked for the sheets they actually have.
+    """
+    workbooks = list_workbooks(path_spec)
+    wanted = [s.strip() for s in sheet_spec.split(",") if s.strip()]
+    if wanted == [ALL_SHEETS]:
+        return [(path, sheet) for path in workbooks for sheet in list_sheets(path)]
+    if len(wanted) == 1:
+        return [(path, wanted[0]) for path in workbooks]
+    sources = []
+    for path in workbooks:
+        available = set(list_sheets(path))
+        sources.extend((path, sheet) for sheet in wanted if sheet in available)
+    return sources
+
+
+def combined_version(versions):
+    """
+    Dataset version of several sources: their own versions hashed together, or the version
+    itself when there is only one source.
+    """
+    if len(versions) == 1:
+        return versions[0]
+    return hashlib.sha1("|".join(versions).encode("utf-8")).hexdigest()[:12]
+
+
+def ingest_sources(sources, engine="auto", chunk_rows=DEFAULT_CHUNK_ROWS, incremental=True, workers=None, on_progress=None):
+    """
+    Load every (workbook, sheet) source and concatenate them into one typed frame.
+
+    Up-to-date snapshots are read back directly; stale sources are refreshed in a pool of
+    `workers` processes (default: one per CPU core), or in-process when only one is stale.
+    `on_progress(fraction, text)` reports progress. Returns (frame, reports), one report per source.
+    """
+    frames = {}
+    reports = []
+    stale = []
+    for source in sources:
+        try:
+            df = load_snapshot(*source)
+        except Exception as e:
+            reports.append({"path": source[0], "sheet": source[1], "mode": "snapshot", "warnings": [
+                f"Could not read data snapshot of {_label(*source)}, re-reading it: {str(e)}"]})
+            df = None
+        if df is None:
+            stale.append(source)
+        else:
+            frames[source] = df
+            reports.append({"path": source[0], "sheet": source[1], "mode": "snapshot", "rows": len(df), "warnings": []})
+
+    workers = min(workers or os.cpu_count() or 1, len(stale))
+    if workers <= 1:
+        for done, source in enumerate(stale):
+            def rows_progress(rows_read, total_rows, done=done, source=source):
+                if on_progress is None:
+                    return
+                fraction = min(rows_read / total_rows, 1.0) if total_rows else 0.0
+                shown = f"{rows_read:,} / {total_rows:,} rows" if total_rows else f"{rows_read:,} rows"
+                prefix = f"{_label(*source)}: " if len(stale) > 1 else ""
+                on_progress((done + fraction) / len(stale), f"Reading Excel file... {prefix}{shown}")
+            frames[source], report = refresh_sheet(*source, engine=engine, chunk_rows=chunk_rows,
+                                                   incremental=incremental, on_progress=rows_progress)
+            reports.append(report)
+    else:
+        # `workers` worker processes taking stale sheets one at a time. They run utils.ingest_worker
+        # rather than being forked (unsafe in the threaded Streamlit server) or spawned by
+        # multiprocessing (which re-runs the dashboard script as their __main__); the threads only
+        # feed them and wait.
+        todo, results = queue.Queue(), queue.Queue()
+        for source in stale:
+            todo.put(source)
+        with tempfile.TemporaryDirectory(prefix="ka-ingest-") as work_dir, ThreadPoolExecutor(max_workers=workers) as pool:
+            for _ in range(workers):
+                pool.submit(_run_worker, todo, results, engine, chunk_rows, incremental, work_dir)
+            for done in range(1, len(stale) + 1):
+                source, result = results.get()
+                if isinstance(result, Exception):
+                    # Drop the sheets not started yet; the pool waits for the ones being read
+                    with todo.mutex:
+                        todo.queue.clear()
+                    raise result
+                df, report = result
+                if df is None:
+                    df = read_snapshot_frame(*source, read_snapshot_meta(*source))
+                    if df is None:
+                        raise RuntimeError(f"Snapshot of {_label(*source)} written by the worker could not be read")
+                frames[source] = df
+                reports.append(report)
+                if on_progress is not None:
+                    on_progress(done / len(stale), f"Reading Excel files... {done} / {len(stale)} sheets")
+
+    ordered = [frames[source] for source in sources]
+    df = concat_frames(ordered)
+    versions = [f.attrs.get("dataset_version") for f in ordered]
+    if all(versions):
+        df.attrs["dataset_version"] = combined_version(versions)
+    return df, reports
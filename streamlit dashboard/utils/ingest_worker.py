@@ -0,0 +1,38 @@
+"""
+Entry point of the Excel ingestion workers started by utils.ingest.ingest_sources:
+
+    python -m utils.ingest_worker
+
+Reads one JSON request per line on stdin ({"path", "sheet", "engine", "chunk_rows",
+"incremental", "output"}), refreshes that sheet and pickles (frame, report) to `output`, or the
+exception it raised; the frame is None when a snapshot was written, which the parent reads back
+instead. Each request is answered with one line on stdout, "ok" or "error". A module of its own
+rather than a multiprocessing child, whose start-up re-runs the parent's __main__ (the
+Streamlit script).
+"""
+import json
+import pickle
+import sys
+
+from utils.ingest import refresh_sheet
+
+
+def main():
+    # Only the replies go to stdout; anything else printed while reading goes to stderr
+    replies, sys.stdout = sys.stdout, sys.stderr
+    for line in sys.stdin:
+        request = json.loads(line)
+        try:
+            df, report = refresh_sheet(request["path"], request["sheet"], engine=request["engine"],
+                                       chunk_rows=request["chunk_rows"], incremental=request["incremental"])
+            result, reply = (None if report["snapshot_written"] else df, report), "ok"
+        except Exception as e:
+            result, reply = e, "error"
+        with open(request["output"], "wb") as fh:
+            pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        replies.write(reply + "\n")
+        replies.flush()
+
+
+if __name__ == "__main__":
+    main()
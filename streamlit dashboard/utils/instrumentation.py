@@ -0,0 +1,243 @@
+import collections
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from utils.memory import current_rss
+
+# Structured log of every rerun, one JSON object per line; set KA_METRICS_LOG="" to disable
+METRICS_LOG = os.environ.get(
+    "KA_METRICS_LOG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "metrics", "reruns.jsonl"),
+)
+
+# Reruns kept in memory for the p50/p95 figures of the debug panel
+RECENT_RERUNS = 1000
+
+
+class StageRecord:
+    """
+    Wall time, rows in/out, resident memory change and cache outcome of one pipeline stage.
+    """
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.ms = None
+        self.mem_delta_mb = None
+        self.cache = None
+        self.extra = {}
+
+    def to_dict(self):
+        record = {
+            "stage": self.name,
+            "ms": self.ms,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "mem_delta_mb": self.mem_delta_mb,
+            "cache": self.cache,
+        }
+        record.update(self.extra)
+        return record
+
+
+class RerunTrace:
+    """
+    Stages recorded during one script rerun (or one standalone event such as a download).
+    """
+
+    def __init__(self, kind="rerun", session_id=None):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.stages = []
+        self.context = {}
+        self.misses = collections.Counter()
+        self._start = time.perf_counter()
+        self.total_ms = None
+
+    def to_dict(self, stopped=False):
+        return {
+            "ts": datetime.datetime.fromtimestamp(self.started_at, datetime.timezone.utc).isoformat(),
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "session": self.session_id,
+            "total_ms": self.total_ms,
+            "stopped": stopped,
+            **self.context,
+            "stages": [s.to_dict() for s in self.stages],
+        }
+
+
+_local = threading.local()
+_lock = threading.Lock()
+# Reruns that have not reached finish_rerun yet, by session; an st.stop() leaves them here
+_pending = {}
+_recent = collections.deque(maxlen=RECENT_RERUNS)
+
+
+def current_trace():
+    """
+    The trace of the rerun running on this thread, or None.
+    """
+    return getattr(_local, "trace", None)
+
+
+def begin_rerun(session_id=None):
+    """
+    Start tracing a script rerun on this thread. A previous rerun of the same session that
+    never finished (st.stop) is flushed first, marked as stopped.
+    """
+    with _lock:
+        unfinished = _pending.pop(session_id, None)
+    if unfinished is not None:
+        _finish(unfinished, stopped=True)
+    trace = RerunTrace(session_id=session_id)
+    _local.trace = trace
+    with _lock:
+        _pending[session_id] = trace
+    return trace
+
+
+def finish_rerun():
+    """
+    Close the trace of the rerun running on this thread and write it out.
+    """
+    trace = current_trace()
+    if trace is None:
+        return None
+    _local.trace = None
+    with _lock:
+        if _pending.get(trace.session_id) is trace:
+            del _pending[trace.session_id]
+    return _finish(trace)
+
+
+def count_miss(name):
+    """
+    Called at the top of a cached function body: the body only runs on a cache miss.
+    """
+    trace = current_trace()
+    if trace is not None:
+        trace.misses[name] += 1
+
+
+@contextlib.contextmanager
+def stage(name, rows_in=None, cached=None):
+    """
+    Time the enclosed block as stage `name` of the current rerun.
+
+    Yields the StageRecord so the block can set `rows_out` or `cache`, or add fields to `extra`.
+    With `cached` set to the name passed to count_miss by a cached function, the stage is marked
+    as a cache hit or miss. Outside of a rerun the stage is written out as its own event.
+    """
+    trace = current_trace()
+    standalone = trace is None
+    if standalone:
+        trace = RerunTrace(kind=name)
+    record = StageRecord(name, rows_in)
+    misses_before = trace.misses[cached] if cached else 0
+    rss_before = current_rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.ms = round((time.perf_counter() - start) * 1000, 2)
+        rss_after = current_rss()
+        if rss_before is not None and rss_after is not None:
+            record.mem_delta_mb = round((rss_after - rss_before) / 1024 / 1024, 2)
+        if cached:
+            record.cache = "miss" if trace.misses[cached] > misses_before else "hit"
+        trace.stages.append(record)
+        if standalone:
+            _finish(trace)
+
+
+def _finish(trace, stopped=False):
+    trace.total_ms = round((time.perf_counter() - trace._start) * 1000, 2)
+    record = trace.to_dict(stopped=stopped)
+    with _lock:
+        _recent.append(record)
+    write_jsonl(record)
+    return record
+
+
+def write_jsonl(record, path=None):
+    """
+    Append one record to the metrics log; logging problems never break the dashboard.
+    """
+    path = METRICS_LOG if path is None else path
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = json.dumps(record, default=str)
+        with _lock, open(path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    except OSError:
+        pass
+
+
+def recent_reruns(kind="rerun"):
+    """
+    The reruns (or other events) recorded by this process, oldest first.
+    """
+    with _lock:
+        return [r for r in _recent if r["kind"] == kind]
+
+
+def read_jsonl(path=None, limit=RECENT_RERUNS):
+    """
+    The last `limit` records of a metrics log (e.g. to compute percentiles across restarts).
+    """
+    path = METRICS_LOG if path is None else path
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            lines = collections.deque(fh, maxlen=limit)
+    except OSError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def latency_percentiles(records, percentiles=(50, 95)):
+    """
+    {"total": {"count", "p50", "p95"}, "<stage>": {...}} over the total and per-stage times (ms).
+    """
+    samples = collections.defaultdict(list)
+    for record in records:
+        if record.get("total_ms") is not None:
+            samples["total"].append(record["total_ms"])
+        for s in record.get("stages", []):
+            if s.get("ms") is not None:
+                samples[s["stage"]].append(s["ms"])
+    summary = {}
+    for name, values in samples.items():
+        points = np.percentile(values, percentiles)
+        summary[name] = {"count": len(values), **{f"p{p}": round(float(v), 2) for p, v in zip(percentiles, points)}}
+    return summary
+
+
+def cache_hit_rates(records):
+    """
+    Share of cache hits per cached stage over `records`.
+    """
+    counts = collections.defaultdict(collections.Counter)
+    for record in records:
+        for s in record.get("stages", []):
+            if s.get("cache"):
+                counts[s["stage"]][s["cache"]] += 1
+    return {name: c["hit"] / (c["hit"] + c["miss"]) for name, c in counts.items()}
@@ -0,0 +1,179 @@
+import itertools
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:  # optional: much faster Rust parser, `pip install python-calamine`
+    python_calamine = None
+
+# Rows turned into a typed DataFrame at a time; bounds the number of live Python cell objects
+DEFAULT_CHUNK_ROWS = 50_000
+
+EXCEL_ENGINES = ("auto", "calamine", "openpyxl")
+
+
+def resolve_engine(engine):
+    """
+    Map "auto" to the fastest installed engine and reject unknown names.
+    """
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Unknown Excel engine {engine!r}, expected one of {EXCEL_ENGINES}")
+    if engine == "auto":
+        return "calamine" if python_calamine is not None else "openpyxl"
+    if engine == "calamine" and python_calamine is None:
+        raise ImportError("The calamine engine needs the python-calamine package")
+    return engine
+
+
+def header_names(header):
+    """
+    Column names the way pandas names them: blank header cells become "Unnamed: <i>" and
+    repeated names get ".1", ".2", ... suffixes.
+    """
+    names = [f"Unnamed: {i}" if h is None or h == "" else str(h) for i, h in enumerate(header)]
+    counts = {}
+    for i, name in enumerate(names):
+        count = counts.get(name, 0)
+        while count:
+            counts[name] = count + 1
+            name = f"{name}.{count}"
+            count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def rows_to_frame(rows, columns, dtype=None):
+    """
+    Build a typed DataFrame from a batch of raw row tuples.
+
+    Columns listed in `dtype` are built in that type, like the `dtype` argument of read_excel,
+    so every chunk of a sheet gets the same type whatever its values; the types of the other
+    columns are inferred from the cell values.
+    """
+    dtype = dtype or {}
+    width = len(columns)
+    rows = [tuple(row[:width]) + (None,) * (width - len(row)) if len(row) != width else row for row in rows]
+    values = np.empty((len(rows), width), dtype=object)
+    if rows:
+        values[:] = rows
+    return pd.DataFrame({
+        col: pd.Series(values[:, i], dtype=dtype[col]) if col in dtype else pd.Series(values[:, i]).infer_objects()
+        for i, col in enumerate(columns)
+    }, columns=columns)
+
+
+def _openpyxl_rows(path, sheet_name, skip_rows):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name]
+        total = (ws.max_row - 1) if ws.max_row else None
+        yield total
+        yield from ws.iter_rows(min_row=1, max_row=1, values_only=True)
+        yield from ws.iter_rows(min_row=2 + skip_rows, values_only=True)
+    finally:
+        wb.close()
+
+
+def _calamine_rows(path, sheet_name, skip_rows):
+    workbook = python_calamine.CalamineWorkbook.from_path(path)
+    sheet = workbook.get_sheet_by_name(sheet_name)
+    yield sheet.height - 1
+    rows = sheet.iter_rows()
+    header = next(rows, None)
+    if header is None:
+        return
+    for row in itertools.chain([header], itertools.islice(rows, skip_rows, None)):
+        # calamine reports empty cells as "", openpyxl and pandas as missing
+        yield tuple(None if v == "" else v for v in row)
+
+
+def iter_sheet_rows(path, sheet_name, engine="auto", skip_rows=0):
+    """
+    Raw rows of a worksheet: first the number of data rows the workbook announces (None when
+    it does not record it), then the header row, then the data rows after the first `skip_rows`.
+    """
+    engine = resolve_engine(engine)
+    if engine == "calamine":
+        return _calamine_rows(path, sheet_name, skip_rows)
+    return _openpyxl_rows(path, sheet_name, skip_rows)
+
+
+def iter_excel_chunks(path, sheet_name, engine="auto", chunk_rows=DEFAULT_CHUNK_ROWS, dtype=None):
+    """
+    Stream a worksheet as typed DataFrame chunks of up to `chunk_rows` rows.
+
+    Yields (chunk, rows_read, total_rows) so callers can report real progress; total_rows is
+    the size announced by the workbook and may be None. Blank rows are skipped, as in read_excel.
+    """
+    rows = iter_sheet_rows(path, sheet_name, engine=engine)
+    total = next(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns = header_names(header)
+
+    batch = []
+    rows_read = 0
+    for row in rows:
+        if all(v is None for v in row):
+            continue
+        batch.append(row)
+        if len(batch) >= chunk_rows:
+            rows_read += len(batch)
+            yield rows_to_frame(batch, columns, dtype), rows_read, total
+            batch = []
+    if batch or rows_read == 0:
+        rows_read += len(batch)
+        yield rows_to_frame(batch, columns, dtype), rows_read, total
+
+
+def concat_frames(frames):
+    """
+    Concatenate typed frames, unioning categorical dictionaries instead of falling back to object.
+
+    The merged dictionary is kept sorted, like the one of a frame read in a single piece,
+    so group-bys and filter lists come out in the same order however the data was chunked.
+    """
+    frames = [f for f in frames if f is not None]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    columns = list(dict.fromkeys(col for f in frames for col in f.columns))
+    merged = {}
+    for col in columns:
+        # Sources without the column contribute missing values of the column's type
+        dtype = next(f[col].dtype for f in frames if col in f.columns)
+        parts = [f[col] if col in f.columns else _missing(len(f), dtype) for f in frames]
+        categorical = [p for p in parts if isinstance(p.dtype, pd.CategoricalDtype)]
+        if categorical:
+            merged[col] = _union_categoricals(parts, ordered=categorical[0].cat.ordered)
+        else:
+            merged[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(merged, copy=False)
+
+
+def _missing(length, dtype):
+    # Numpy integer and bool columns cannot hold missing values; widen them the way pd.concat does
+    if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        dtype = "float64"
+    elif pd.api.types.is_bool_dtype(dtype) and not pd.api.types.is_extension_array_dtype(dtype):
+        dtype = "object"
+    return pd.Series([None] * length, dtype=dtype)
+
+
+def _union_categoricals(parts, ordered=False):
+    categories = pd.Index([])
+    for part in parts:
+        values = part.cat.categories if isinstance(part.dtype, pd.CategoricalDtype) else pd.Index(part.dropna().unique())
+        new_values = values.difference(categories, sort=False) if len(categories) else values
+        categories = categories.append(new_values) if len(categories) else pd.Index(new_values)
+    if not ordered:
+        try:
+            categories = categories.sort_values()
+        except TypeError:
+            pass  # mixed value types have no order; keep first-seen order
+    dtype = pd.CategoricalDtype(categories, ordered=ordered)
+    return pd.concat([part.astype(dtype) for part in parts], ignore_index=True)
@@ -0,0 +1,111 @@
+import threading
+import time
+
+
+class DatasetRefresher:
+    """
+    Holds the dataset currently served to every session and replaces it in the background.
+
+    A daemon thread checks the sources every `interval` seconds through `signature()`; when it
+    changes, `build()` ingests the new data and `warm(dataset)` builds its derived values (query
+    engine, indexes, ...) off the request path. The new dataset is then swapped in with a single
+    assignment, so sessions keep reading the previous version until the new one is complete and
+    no request ever waits on ingestion after the first load.
+    """
+
+    def __init__(self, build, signature, interval, warm=None):
+        self._build = build
+        self._signature = signature
+        self._warm = warm
+        self.interval = interval
+        self._dataset = None
+        self._seen_signature = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_check_at = None
+        self.last_refresh_at = None
+        self.last_error = None
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    def get(self, load):
+        """
+        The current dataset. The very first call loads it with `load()` (which may show progress
+        to the user); concurrent first callers wait for that one load instead of starting their own.
+        """
+        dataset = self._dataset
+        if dataset is not None:
+            return dataset
+        with self._load_lock:
+            if self._dataset is None:
+                signature = self._signature()
+                self._publish(load(), signature)
+                self._start()
+            return self._dataset
+
+    def refresh(self, force=False):
+        """
+        Rebuild the dataset if the sources changed (or always with `force`) and swap it in.
+        Returns True when a new version was published. Errors are kept in `last_error` and the
+        previous dataset stays in service; the next check tries again.
+        """
+        with self._refresh_lock:
+            self.last_check_at = time.time()
+            signature = self._signature()
+            if not force and signature == self._seen_signature:
+                return False
+            try:
+                dataset = self._build()
+                current = self._dataset
+                if current is not None and dataset.version == current.version:
+                    # Saved without content changes: nothing to swap
+                    self._seen_signature = signature
+                    self.last_refresh_at = time.time()
+                    self.last_error = None
+                    return False
+                if self._warm is not None:
+                    self._warm(dataset)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self._publish(dataset, signature)
+            return True
+
+    def status(self):
+        """
+        Version and age of the data being served, and the outcome of the background checks.
+        """
+        dataset = self._dataset
+        now = time.time()
+        return {
+            "version": dataset.version if dataset is not None else None,
+            "loaded_at": dataset.loaded_at if dataset is not None else None,
+            "age_seconds": now - dataset.loaded_at if dataset is not None else None,
+            "last_refresh_at": self.last_refresh_at,
+            "last_check_at": self.last_check_at,
+            "last_error": self.last_error,
+            "interval": self.interval,
+        }
+
+    def stop(self):
+        self._stop.set()
+
+    def _publish(self, dataset, signature):
+        self._dataset = dataset
+        self._seen_signature = signature
+        self.last_refresh_at = time.time()
+        self.last_error = None
+
+    def _start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ka-dataset-refresher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
@@ -0,0 +1,100 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def canonical_filter_key(dataset_version, selections, ranges):
+    """
+    Hashable, order-independent key for a filter state.
+
+    `selections` maps a dimension to its allowed values (None meaning "all"), `ranges` maps a
+    dimension to an inclusive (low, high) pair; value order and duplicates do not matter.
+    """
+    parts = [("version", dataset_version)]
+    for name in sorted(selections):
+        values = selections[name]
+        parts.append((name, "*" if values is None else tuple(sorted({str(v) for v in values}))))
+    for name in sorted(ranges):
+        low, high = ranges[name]
+        parts.append((name, (str(low), str(high))))
+    return tuple(parts)
+
+
+def estimate_size(value):
+    """
+    Approximate in-memory size of a cached value in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if hasattr(value, "to_plotly_json"):
+        # Plotly figure: size of its data and layout
+        return sys.getsizeof(value) + estimate_size(value.to_plotly_json())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a memory budget, meant to be shared by all sessions.
+
+    Keys carry whatever makes an entry valid (the dataset version of a filter state, the digest
+    of a figure's input), so nothing is dropped when the data changes: entries of a replaced
+    dataset are simply no longer hit and age out of the LRU order, while reruns still running on
+    it cannot wipe the entries of the new one.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self._lock:
+            if size > self.max_bytes:
+                return
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._clear_locked()
+
+    def _clear_locked(self):
+        self._entries.clear()
+        self.used_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_mb": self.used_bytes / 1024 / 1024,
+                "max_mb": self.max_bytes / 1024 / 1024,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from utils.aggregations import FEEDBACK_GIVEN, FEEDBACK_TOTAL, normalize_feedback
+from utils.schema import iso_years
+
+# Feedback count columns of the cube are named "fb_<feedback value>"
+FEEDBACK_PREFIX = "fb_"
+
+# Grain of the cube: one cell per calendar day, tool and user (week/year/month are
+# functions of the day, so they come for free and let every date filter stay exact)
+ROLLUP_KEYS = ["day", "year_week_label", "iso_year", "month", "tool", "Username"]
+
+
+def build_rollup(df):
+    """
+    Pre-aggregate the KA rows into a week × tool × user cube (kept at day resolution).
+
+    Each cell holds the number of queries, the feedback given/total counts and one count column
+    per feedback value, so every headline metric and chart can be answered by summing the cells
+    that match the filters (see utils/aggregations.py).
+    """
+    keys = pd.DataFrame({
+        "day": df["Date"].dt.normalize(),
+        "year_week_label": df["year_week_label"],
+        "iso_year": iso_years(df["Date"]),
+        "month": df["Date"].dt.month,
+        "tool": df["tool"],
+        "Username": df["Username"],
+        "feedback": normalize_feedback(df["metadata.feedback_rating"]),
+    })
+
+    counts = keys.groupby(ROLLUP_KEYS + ["feedback"], dropna=False, observed=True).size()
+    cube = counts.unstack("feedback", fill_value=0)
+    # Missing feedback still counts as a query, it just has no feedback column of its own
+    cube.insert(0, "queries", cube.sum(axis=1))
+    cube = cube.loc[:, [c == "queries" or not pd.isna(c) for c in cube.columns]]
+    cube.columns = ["queries"] + [FEEDBACK_PREFIX + str(c) for c in cube.columns[1:]]
+    cube.columns.name = None
+
+    # Feedback given/total per cell, so summaries never need to look at the per-value columns
+    cube.insert(1, "feedback_given", cube[feedback_columns(cube, FEEDBACK_GIVEN)].sum(axis=1))
+    cube.insert(2, "feedback_total", cube[feedback_columns(cube, FEEDBACK_TOTAL)].sum(axis=1))
+    return cube.reset_index()
+
+
+def feedback_columns(cube, values=None):
+    """
+    Names of the feedback count columns in the cube, optionally limited to `values`.
+    """
+    columns = [c for c in cube.columns if c.startswith(FEEDBACK_PREFIX)]
+    if values is not None:
+        wanted = {FEEDBACK_PREFIX + v for v in values}
+        columns = [c for c in columns if c in wanted]
+    return columns
+
+
+def rollup_feedback_counts(cells):
+    """
+    Count of each feedback value over the matching cells, most frequent first.
+    """
+    columns = feedback_columns(cells)
+    counts = cells[columns].sum()
+    # Most frequent first; equal counts are ordered by feedback value
+    counts = counts[counts > 0].sort_index().sort_values(ascending=False, kind="stable")
+    return pd.DataFrame({
+        "Feedback Type": [c[len(FEEDBACK_PREFIX):] for c in counts.index],
+        "Count": counts.to_numpy(),
+    })
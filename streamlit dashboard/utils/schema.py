@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Target type of every known KA column. Strings with few distinct values are dictionary
+# encoded ("category"), free text stays a string, feedback is a lower-cased categorical.
+# Columns not listed keep the type pandas infers, with numbers downcast to the smallest type.
+KA_SCHEMA = {
+    "Date": "datetime",
+    "Username": "category",
+    "Full Name": "category",
+    "tool": "category",
+    "metadata.feedback_rating": "feedback",
+    "metadata.feedback_comment": "string",
+    "year_week_label": "category",
+}
+
+REQUIRED_COLUMNS = ["Date", "Username", "tool", "metadata.feedback_rating"]
+
+
+def read_dtypes(schema=KA_SCHEMA):
+    """
+    dtype mapping handed to the Excel parser so columns are built in their final type directly.
+    """
+    read_as = {"category": "category", "feedback": "category", "string": "string[pyarrow]"}
+    return {col: read_as[kind] for col, kind in schema.items() if kind in read_as}
+
+
+def lowercase_categories(series):
+    """
+    Lower-case a categorical column by rewriting its dictionary, not every row.
+
+    Categories that collide once lower-cased ("Like" / "like") are merged by remapping codes.
+    """
+    categories = series.cat.categories.astype(str).str.lower()
+    if categories.is_unique:
+        return series.cat.rename_categories(categories)
+    merged, inverse = np.unique(np.asarray(categories), return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, merged), index=series.index, name=series.name)
+
+
+def week_labels(dates):
+    """
+    '%Y-W%U' week labels as a categorical, formatted once per distinct day instead of once per row.
+    """
+    codes, days = pd.factorize(dates.dt.normalize(), sort=True)
+    labels = pd.Index(days.strftime("%Y-W%U"))
+    categories, inverse = np.unique(np.asarray(labels), return_inverse=True)
+    week_codes = np.where(codes >= 0, inverse[codes] if len(inverse) else codes, -1)
+    return pd.Series(pd.Categorical.from_codes(week_codes, categories), index=dates.index)
+
+
+def iso_years(dates):
+    """
+    ISO-calendar year of each date (the year its ISO week belongs to).
+    """
+    try:
+        return dates.dt.isocalendar().year
+    except Exception:
+        return dates.dt.year
+
+
+def _apply_kind(series, kind):
+    if kind == "datetime":
+        return pd.to_datetime(series, errors="coerce")
+    if kind == "category":
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category")
+    if kind == "feedback":
+        if not isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype("category")
+        return lowercase_categories(series)
+    if kind == "string":
+        return series if series.dtype == "string[pyarrow]" else series.astype("string[pyarrow]")
+    return series
+
+
+def _compact_numeric(series):
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return series
+    if pd.api.types.is_integer_dtype(series.dtype) and not isinstance(series.dtype, pd.ArrowDtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series.dtype) and not isinstance(series.dtype, pd.ArrowDtype):
+        return pd.to_numeric(series, downcast="float")
+    return series
+
+
+def apply_schema(df, schema=KA_SCHEMA):
+    """
+    Bring every column of `df` to its schema type (a no-op for columns the parser already typed)
+    and derive `year_week_label` if the sheet does not have one.
+    """
+    columns = {}
+    for col in df.columns:
+        kind = schema.get(col)
+        columns[col] = _apply_kind(df[col], kind) if kind else _compact_numeric(df[col])
+    df = pd.DataFrame(columns, index=df.index)
+
+    if "year_week_label" not in df.columns and "Date" in df.columns:
+        df["year_week_label"] = week_labels(df["Date"])
+    return df
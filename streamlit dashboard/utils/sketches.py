@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+# 2 ** HLL_PRECISION registers per sketch; the relative standard error of an estimate is
+# 1.04 / sqrt(2 ** HLL_PRECISION), about 1.6% at 12 (4 KB per sketch)
+HLL_PRECISION = 12
+
+# Slices with fewer cells than this get no sketch: merging their users straight from the
+# cells is as cheap as merging a sketch and saves its 4 KB
+SKETCH_MIN_CELLS = 256
+
+# Only the 52 bits after the register index are ranked, so they convert to float64 exactly;
+# ranks are capped at 53
+_RANK_BITS = 52
+
+
+def hll_error(precision=HLL_PRECISION):
+    """
+    Relative standard error of a HyperLogLog estimate (about 68% of estimates are within it,
+    95% within twice it).
+    """
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+def hash_values(values):
+    """
+    Stable 64-bit hashes of `values` (the same value hashes the same in every process).
+    """
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def register_ranks(hashes, precision=HLL_PRECISION):
+    """
+    Register index (top `precision` bits) and rank (position of the first set bit of the rest).
+    """
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    registers = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = (hashes << np.uint64(precision)) >> np.uint64(64 - _RANK_BITS)
+    _, exponent = np.frexp(rest.astype(np.float64))
+    ranks = np.where(rest == 0, _RANK_BITS + 1, _RANK_BITS + 1 - exponent)
+    return registers, ranks.astype(np.uint8)
+
+
+def hll_registers(groups, hashes, n_groups, precision=HLL_PRECISION):
+    """
+    One HyperLogLog sketch (row of registers) per group id in [0, n_groups).
+    """
+    sketches = np.zeros((n_groups, 2 ** precision), dtype=np.uint8)
+    registers, ranks = register_ranks(hashes, precision)
+    np.maximum.at(sketches, (np.asarray(groups, dtype=np.int64), registers), ranks)
+    return sketches
+
+
+def hll_estimate(sketches):
+    """
+    Estimated number of distinct values of each sketch (last axis = registers), with the
+    linear-counting correction for small cardinalities.
+    """
+    sketches = np.atleast_2d(sketches)
+    m = sketches.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / np.sum(np.exp2(-sketches.astype(np.float64)), axis=-1)
+    zeros = (sketches == 0).sum(axis=-1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where(small, linear, raw)
+
+
+class UserSketches:
+    """
+    HyperLogLog sketches of the users of every week × tool × user-group slice of the rollup cube.
+
+    A slice is a (year_week_label, iso_year, month, tool, user group) combination; a week that
+    straddles two months is two slices, so Year and Month filters match whole slices. User groups
+    let the usual KA User default (every named user) match whole slices too.
+
+    Unique users of a filter selection are estimated by merging (element-wise max) the sketches
+    of the slices whose cells all match, plus the hashed users of the matching cells of slices
+    that only partly match (day ranges, hand-picked users) or are too small to be sketched, so
+    any filter can be answered.
+    """
+
+    KEYS = ["year_week_label", "iso_year", "month", "tool"]
+
+    def __init__(self, rollup, user_groups=None, precision=HLL_PRECISION, min_cells=SKETCH_MIN_CELLS):
+        self.precision = precision
+        user_codes, users = pd.factorize(rollup["Username"])
+        user_hashes = hash_values(users)
+        # Group of every distinct user: 1 + position in user_groups, 0 for users in no group
+        group_of_user = np.zeros(len(users), dtype=np.int64)
+        for i, members in enumerate(user_groups or []):
+            group_of_user[pd.Index(users).isin(list(members))] = i + 1
+
+        valid = user_codes >= 0
+        keys = rollup[self.KEYS].assign(user_group=np.where(valid, group_of_user[user_codes], -1))
+        slices = keys.groupby(list(keys.columns), dropna=False, observed=True, sort=False)
+        self.cell_slice = slices.ngroup().to_numpy(dtype=np.int64)
+        self.cell_hash = np.where(valid, user_hashes[user_codes], 0).astype(np.uint64)
+        self.cell_valid = valid
+        self.slice_cells = np.bincount(self.cell_slice, minlength=slices.ngroups)
+
+        # Tool of every cell and slice; cells without a tool share one extra slot at the end
+        tool_codes, self.tools = pd.factorize(rollup["tool"], sort=True)
+        self.cell_tool = np.where(tool_codes >= 0, tool_codes, len(self.tools)).astype(np.int64)
+        self.slice_tool = np.zeros(slices.ngroups, dtype=np.int64)
+        self.slice_tool[self.cell_slice] = self.cell_tool
+
+        # Sketch row of every slice, -1 for slices answered from their cells
+        sketched = self.slice_cells >= min_cells
+        self.slice_sketch = np.where(sketched, np.cumsum(sketched) - 1, -1)
+        in_sketch = valid & sketched[self.cell_slice]
+        self.sketches = hll_registers(self.slice_sketch[self.cell_slice[in_sketch]], self.cell_hash[in_sketch],
+                                      int(sketched.sum()), precision)
+
+    def estimate(self, rows):
+        """
+        Estimated unique users over the rollup cells at positions `rows`: (total, per-tool Series).
+        """
+        matched = np.bincount(self.cell_slice[rows], minlength=len(self.slice_cells))
+        whole = (matched > 0) & (matched == self.slice_cells) & (self.slice_sketch >= 0)
+        full = np.flatnonzero(whole)
+        partial = rows[~whole[self.cell_slice[rows]] & self.cell_valid[rows]]
+
+        per_tool = np.zeros((len(self.tools) + 1, 2 ** self.precision), dtype=np.uint8)
+        if len(full):
+            order = full[np.argsort(self.slice_tool[full], kind="stable")]
+            tools = self.slice_tool[order]
+            sketches = self.sketches[self.slice_sketch[order]]
+            bounds = np.flatnonzero(np.r_[True, tools[1:] != tools[:-1], True])
+            # One contiguous max per tool (much faster than np.maximum.reduceat along axis 0)
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                np.maximum.reduce(sketches[start:end], axis=0, out=per_tool[tools[start]])
+        if len(partial):
+            registers, ranks = register_ranks(self.cell_hash[partial], self.precision)
+            np.maximum.at(per_tool, (self.cell_tool[partial], registers), ranks)
+
+        total = int(np.rint(hll_estimate(per_tool.max(axis=0))[0]))
+        used = np.flatnonzero(per_tool[:-1].any(axis=1))
+        counts = np.rint(hll_estimate(per_tool[used])).astype("int64") if len(used) else np.array([], dtype="int64")
+        return total, pd.Series(counts, index=pd.Index(self.tools[used], name="tool"), name="unique_users")
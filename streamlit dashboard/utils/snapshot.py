@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import time
+
+import pyarrow.feather as feather
+
+# Bump whenever the cleaning/typing pipeline changes so old snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 3
+
+# Snapshots live next to the app, outside of the Streamlit in-memory cache, so they survive restarts
+SNAPSHOT_DIR = os.environ.get(
+    "KA_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "snapshots"),
+)
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """
+    Hash the workbook contents in blocks so large files never sit in memory at once.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path):
+    """
+    The (mtime, size, sha256) of a workbook as a dict, taken before it is parsed.
+
+    The stat comes first: a save during hashing or parsing changes the mtime, so the next
+    load_snapshot() re-checks the contents instead of trusting the snapshot.
+    """
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size, "sha256": file_sha256(path)}
+
+
+def snapshot_key(source_path, sheet_name):
+    """
+    Stable file-name prefix of the snapshot for one workbook sheet.
+    """
+    return hashlib.sha1(f"{os.path.abspath(source_path)}::{sheet_name}".encode("utf-8")).hexdigest()[:16]
+
+
+def snapshot_paths(source_path, sheet_name):
+    """
+    Return the (data, metadata) file paths of the snapshot for one workbook sheet.
+
+    The data file name comes from the metadata, so a new snapshot never overwrites a file
+    that a running session may still have memory-mapped.
+    """
+    base = os.path.join(SNAPSHOT_DIR, snapshot_key(source_path, sheet_name))
+    meta_path = base + ".json"
+    try:
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            data_file = json.load(fh).get("data_file")
+    except (OSError, ValueError):
+        data_file = None
+    data_path = os.path.join(SNAPSHOT_DIR, data_file) if data_file else base + ".feather"
+    return data_path, meta_path
+
+
+def read_snapshot_meta(source_path, sheet_name):
+    """
+    Return the stored metadata of a snapshot, or None if there is no usable snapshot.
+    """
+    data_path, meta_path = snapshot_paths(source_path, sheet_name)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return meta
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    os.replace(tmp_path, meta_path)
+
+
+def load_snapshot(source_path, sheet_name):
+    """
+    Read back the snapshot for a workbook sheet if the workbook has not changed since it was written.
+
+    The cheap mtime/size check is tried first; the content hash is only computed when those differ,
+    so touching or re-saving an identical workbook does not force a re-parse.
+    Returns None when the snapshot is missing or stale.
+    """
+    meta = read_snapshot_meta(source_path, sheet_name)
+    if meta is None:
+        return None
+
+    stat = os.stat(source_path)
+    if stat.st_mtime != meta["mtime"] or stat.st_size != meta["size"]:
+        if file_sha256(source_path) != meta["sha256"]:
+            return None
+        # Same contents under a new mtime: remember it so the next check stays cheap
+        meta.update(mtime=stat.st_mtime, size=stat.st_size)
+        _write_meta(snapshot_paths(source_path, sheet_name)[1], meta)
+
+    return read_snapshot_frame(source_path, sheet_name, meta)
+
+
+def read_snapshot_table(source_path, sheet_name):
+    """
+    Memory-map the stored snapshot data as an Arrow table, or None if it cannot be read.
+    """
+    data_path = snapshot_paths(source_path, sheet_name)[0]
+    try:
+        return feather.read_table(data_path, memory_map=True)
+    except Exception:
+        return None
+
+
+def read_snapshot_frame(source_path, sheet_name, meta):
+    """
+    Read the stored snapshot data regardless of whether the workbook changed since.
+
+    The file is memory-mapped, but converting it to pandas copies the columns into process
+    memory: one copy per server process, which sessions then share as shallow views
+    (utils/dataset.py). Only the DuckDB engine queries the mapped file itself.
+    """
+    table = read_snapshot_table(source_path, sheet_name)
+    if table is None:
+        return None
+    df = table.to_pandas()
+    df.attrs["dataset_version"] = meta["sha256"][:12]
+    return df
+
+
+def write_snapshot(df, source_path, sheet_name, watermark=None, fingerprint=None):
+    """
+    Persist the cleaned, typed DataFrame as an uncompressed Feather file (memory-mappable).
+
+    `fingerprint` is the source_fingerprint() of the workbook taken before `df` was parsed from
+    it; hashing the file only now would stamp a workbook saved during the parse as up to date.
+
+    The data file is written under a content-specific name first, then the metadata is
+    switched over to it; a crash in between leaves the previous snapshot in place.
+    `watermark` records how far into the workbook the snapshot goes (see utils/delta.py).
+    """
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    key = snapshot_key(source_path, sheet_name)
+    old_data_path, meta_path = snapshot_paths(source_path, sheet_name)
+
+    if fingerprint is None:
+        fingerprint = source_fingerprint(source_path)
+    data_file = f"{key}-{fingerprint['sha256'][:12]}.feather"
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source": os.path.abspath(source_path),
+        "sheet": sheet_name,
+        "mtime": fingerprint["mtime"],
+        "size": fingerprint["size"],
+        "sha256": fingerprint["sha256"],
+        "rows": len(df),
+        "data_file": data_file,
+        "watermark": watermark,
+        "created_at": time.time(),
+    }
+
+    data_path = os.path.join(SNAPSHOT_DIR, data_file)
+    tmp_path = data_path + ".tmp"
+    df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, data_path)
+    _write_meta(meta_path, meta)
+
+    # Older data files may still be mapped by another session (Windows refuses to delete those)
+    if old_data_path != data_path:
+        try:
+            os.remove(old_data_path)
+        except OSError:
+            pass
+
+    df.attrs["dataset_version"] = meta["sha256"][:12]
+    return meta
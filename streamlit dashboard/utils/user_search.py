@@ -0,0 +1,106 @@
+import bisect
+import functools
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# With more KA users than this, the KA User filter becomes a server-side search instead of
+# one multiselect holding every user
+USER_SEARCH_MIN_USERS = int(os.environ.get("KA_USER_SEARCH_MIN_USERS", "1000"))
+
+# Search results offered per page
+USER_PAGE_SIZE = int(os.environ.get("KA_USER_PAGE_SIZE", "50"))
+
+
+class UserSearchIndex:
+    """
+    Prefix and substring search over Username and Full Name, built once per dataset.
+
+    Users whose Username, Full Name or a word of it starts with the query come first, then
+    users containing it anywhere; both groups keep the user order given to the constructor.
+    """
+
+    def __init__(self, users, full_names):
+        self.users = list(users)
+        self.full_names = full_names
+        tokens = []
+        for i, user in enumerate(self.users):
+            name = str(full_names.get(user, "")).lower()
+            for token in {str(user).lower(), name, *name.split()}:
+                if token:
+                    tokens.append((token, i))
+        tokens.sort()
+        self._tokens = [t for t, _ in tokens]
+        self._token_users = np.array([i for _, i in tokens], dtype=np.int64)
+        self._text = pd.Series([f"{str(u).lower()}\t{str(full_names.get(u, '')).lower()}" for u in self.users], dtype=object)
+        # Paging through the results of a query ranks it only once
+        self._ranked = functools.lru_cache(maxsize=256)(self._rank)
+
+    def __len__(self):
+        return len(self.users)
+
+    def label(self, user):
+        name = self.full_names.get(user)
+        return f"{user} · {name}" if name else str(user)
+
+    def search(self, query, page=0, page_size=USER_PAGE_SIZE):
+        """
+        Users on page `page` of the matches of `query`, and the total number of matches.
+        """
+        ranked = self._ranked(query.strip().lower())
+        start = page * page_size
+        return [self.users[i] for i in ranked[start:start + page_size]], len(ranked)
+
+    def _rank(self, query):
+        if not query:
+            return np.arange(len(self.users))
+        lo = bisect.bisect_left(self._tokens, query)
+        hi = bisect.bisect_left(self._tokens, query + "\uffff")
+        prefix = np.unique(self._token_users[lo:hi])
+        contains = np.flatnonzero(self._text.str.contains(query, regex=False).to_numpy())
+        return np.concatenate([prefix, np.setdiff1d(contains, prefix, assume_unique=True)])
+
+
+def build_user_search(df, users):
+    """
+    Search index over `users` (the KA User options), labelled with their first Full Name.
+    """
+    named = df.loc[df["Full Name"].notna(), ["Username", "Full Name"]]
+    named = named[~named["Username"].duplicated()]
+    full_names = dict(zip(named["Username"].astype(object), named["Full Name"].astype(object)))
+    return UserSearchIndex(users, full_names)
+
+
+def _turn_page(key, step):
+    st.session_state[f"{key}_page"] += step
+
+
+def user_search_selector(search, label="KA User", key="ka_users"):
+    """
+    KA User filter for large user lists: a search box and one page of matching users at a time,
+    so only selected users and the current page are sent to the browser. Selections are kept
+    across searches. Returns the selected usernames.
+    """
+    state = st.session_state
+    selected = state.setdefault(f"{key}_selected", [])
+    query = st.text_input(f"Search {label}", key=f"{key}_query", placeholder="Username or full name")
+    if state.get(f"{key}_last_query") != query:
+        state[f"{key}_last_query"] = query
+        state[f"{key}_page"] = 0
+    page = state.setdefault(f"{key}_page", 0)
+
+    matches, total = search.search(query, page)
+    chosen = set(selected)
+    options = selected + [user for user in matches if user not in chosen]
+    selected = st.multiselect(label, options, default=selected, format_func=search.label)
+    state[f"{key}_selected"] = selected
+
+    pages = max(1, math.ceil(total / USER_PAGE_SIZE))
+    prev_col, info_col, next_col = st.columns([1, 4, 1])
+    prev_col.button("◀", key=f"{key}_prev", disabled=page == 0, on_click=_turn_page, args=(key, -1))
+    next_col.button("▶", key=f"{key}_next", disabled=page + 1 >= pages, on_click=_turn_page, args=(key, 1))
+    info_col.caption(f"{total:,} matching users · page {page + 1} of {pages}")
+    return selected